@@ -0,0 +1,105 @@
+"""
+Agregados de Movimentações - Controle de Estoque
+Totais diários e mensais por produto, mantidos a cada movimentação
+
+Dashboard, relatório e exportação para BI leem estes totais em vez de agrupar
+todo o histórico de Entradas/Saídas a cada execução. Com o backend Excel, são
+uma projeção do diário (projecoes.py); com o SQLite, ficam nas tabelas
+agg_movimentacoes_diarias e agg_movimentacoes_mensais (banco_sqlite.py).
+
+Os totais por categoria são somados a partir dos totais por produto (uma linha
+por produto e período), com a categoria atual do cadastro: recategorizar um
+produto não exige reprocessar o histórico.
+"""
+import diario
+import historico
+import projecoes
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'backend': 'excel'}
+
+NOME = 'agregados'
+
+# Valores acumulados por produto em cada período, nesta ordem
+CAMPOS = ('quantidade_entradas', 'quantidade_saidas', 'valor_entradas',
+          'num_entradas', 'num_saidas')
+
+
+def estado_inicial():
+    return {'dias': {}, 'meses': {}}
+
+
+def aplicar(estado, registro):
+    """Soma a movimentação nos totais do dia e do mês do produto"""
+    dia = historico.dia_iso(registro['data'])
+    if registro['aba'] == 'Entradas':
+        valores = (registro['quantidade'], 0, diario.valor_total(registro) or 0, 1, 0)
+    else:
+        valores = (0, registro['quantidade'], 0, 0, 1)
+    for periodo, chave in (('dias', dia), ('meses', dia[:7])):
+        totais = estado[periodo].setdefault(chave, {}).setdefault(
+            registro['codigo'], [0] * len(CAMPOS))
+        for i, valor in enumerate(valores):
+            totais[i] += valor
+        totais[2] = round(totais[2], 2)
+
+
+def carregar():
+    """Estado dos agregados, em dia com o diário"""
+    diario.importar_planilha()  # planilhas anteriores ao diário: histórico passa a ser contado
+    return projecoes.atualizar(NOME, aplicar, estado_inicial)
+
+
+def tabela(periodo='mes', chaves=None):
+    """Totais por produto e período ('dia' ou 'mes') como DataFrame
+
+    Colunas: data_movimentacao (dia) ou ano e mes (mês), codigo_produto e CAMPOS.
+    `chaves` restringe a tabela aos pares (período, código) informados, com o
+    período em 'YYYY-MM-DD' ou 'YYYY-MM' (só no backend Excel).
+    """
+    import pandas as pd
+    if CONFIG.get('backend') == 'sqlite':
+        import banco_sqlite
+        return banco_sqlite.carregar_agregados(periodo)
+
+    totais_periodo = carregar()['dias' if periodo == 'dia' else 'meses']
+    if chaves is None:
+        itens = [(chave, codigo, totais)
+                 for chave, produtos in sorted(totais_periodo.items())
+                 for codigo, totais in produtos.items()]
+    else:
+        itens = [(chave, codigo, totais_periodo[chave][codigo]) for chave, codigo in sorted(chaves)]
+    if periodo == 'dia':
+        linhas = [(chave, codigo, *totais) for chave, codigo, totais in itens]
+        return pd.DataFrame(linhas, columns=['data_movimentacao', 'codigo_produto', *CAMPOS])
+    linhas = [(int(chave[:4]), int(chave[5:7]), codigo, *totais) for chave, codigo, totais in itens]
+    return pd.DataFrame(linhas, columns=['ano', 'mes', 'codigo_produto', *CAMPOS])
+
+
+def por_produto():
+    """Totais de todo o período por produto (índice: código, ordenado), como DataFrame"""
+    mensal = tabela('mes')
+    return mensal.groupby('codigo_produto')[list(CAMPOS)].sum()
+
+
+def por_categoria():
+    """Movimentações mensais por categoria (mesmas colunas de vw_movimentacoes_mensais)"""
+    import pandas as pd
+    import catalogo
+    mensal = tabela('mes')
+    categorias = {c: p.categoria for c, p in catalogo.obter_catalogo().items()}
+    mensal['categoria'] = mensal['codigo_produto'].map(categorias)
+    grupos = mensal.groupby(['ano', 'mes', 'categoria'], dropna=False)[list(CAMPOS)].sum().reset_index()
+
+    entradas = grupos[grupos['num_entradas'] > 0].assign(
+        tipo_movimentacao='Entrada', num_movimentacoes=grupos['num_entradas'],
+        quantidade_total=grupos['quantidade_entradas'], valor_total=grupos['valor_entradas'])
+    saidas = grupos[grupos['num_saidas'] > 0].assign(
+        tipo_movimentacao='Saída', num_movimentacoes=grupos['num_saidas'],
+        quantidade_total=-grupos['quantidade_saidas'], valor_total=None)
+    colunas = ['ano', 'mes', 'tipo_movimentacao', 'categoria',
+               'num_movimentacoes', 'quantidade_total', 'valor_total']
+    return pd.concat([entradas[colunas], saidas[colunas]], ignore_index=True).sort_values(
+        ['ano', 'mes', 'tipo_movimentacao', 'categoria'], ignore_index=True)
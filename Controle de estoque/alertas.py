@@ -0,0 +1,356 @@
+"""
+Alertas de Estoque Baixo - Controle de Estoque
+Avisa quando uma movimentação leva o saldo de um produto abaixo do 'Estoque Mínimo'
+
+Uso:
+    python3 alertas.py [--marcar-enviados]     # alertas pendentes na caixa de saída
+    python3 alertas.py --receptor [--porta 8767]  # webhook local que imprime os alertas
+    python3 alertas.py --despachar             # entrega alertas adiados já vencidos
+
+Toda gravação de movimentações (diario.registrar_lote e banco_sqlite) chama
+detectar() ainda dentro da trava do diário (ou da transação do SQLite). Para
+cada produto movimentado, o saldo depois da gravação é lido da projeção de
+saldos (ou de fato_estoque_atual) e o saldo anterior é ele menos a variação do
+lote: a verificação custa uma consulta por produto movimentado, sem percorrer o
+cadastro. Liberada a trava, notificar() filtra e entrega os alertas.
+
+Cruzar o mínimo para baixo gera um alerta 'critico'; voltar a ele, um
+'normalizado'. O estado de cada produto fica em 'indices/alertas.json' (só é
+lido quando há cruzamento ou alerta adiado vencido), de modo que:
+
+- o mesmo estado não é avisado duas vezes seguidas (deduplicação);
+- um produto que oscila em torno do mínimo não repete o mesmo tipo de alerta
+  antes de CONFIG['intervalo_repeticao_alerta'] segundos;
+- no máximo CONFIG['alertas_por_minuto'] alertas saem por minuto.
+
+Um alerta barrado pelo intervalo ou pelo limite não se perde: fica adiado e
+sai na primeira gravação (ou --despachar) depois do prazo, a menos que o
+produto volte antes ao estado já avisado.
+
+Os alertas vão para as saídas listadas em CONFIG['saidas_alerta']: 'log'
+(arquivo texto), 'webhook' (POST JSON; --receptor faz as vezes do serviço
+externo) e 'outbox' (tabela SQLite lida por outro processo). Outras saídas
+podem ser incluídas com registrar_saida(nome, funcao).
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'backend': 'excel', 'pasta_indices': 'indices', 'alertas_ativos': True,
+              'saidas_alerta': ['log', 'outbox'], 'arquivo_log_alertas': 'alertas.log',
+              'arquivo_outbox_alertas': 'alertas.db',
+              'alerta_webhook_url': 'http://127.0.0.1:8767/alertas',
+              'intervalo_repeticao_alerta': 3600, 'alertas_por_minuto': 30}
+
+ARQUIVO_ESTADO = 'alertas.json'
+
+SQL_OUTBOX = """
+CREATE TABLE IF NOT EXISTS outbox_alertas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    criado_em TEXT,
+    codigo_produto VARCHAR(20),
+    tipo VARCHAR(20),
+    saldo DECIMAL(10,2),
+    estoque_minimo DECIMAL(10,2),
+    dados TEXT,
+    enviado_em TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_pendentes ON outbox_alertas(enviado_em);
+"""
+
+
+# ==================== SAÍDAS ====================
+
+def _saida_log(alerta):
+    marca = '⚠️ ' if alerta['tipo'] == 'critico' else '✅'
+    linha = (f"{alerta['em']} {marca} {alerta['tipo'].upper()} {alerta['codigo']} "
+             f"{alerta['nome']}: saldo {alerta['saldo_anterior']:g} → {alerta['saldo']:g} "
+             f"(mínimo {alerta['estoque_minimo']:g})")
+    with open(CONFIG.get('arquivo_log_alertas', 'alertas.log'), 'a', encoding='utf-8') as f:
+        f.write(linha + '\n')
+
+
+def _saida_webhook(alerta):
+    from urllib.request import Request, urlopen
+    pedido = Request(CONFIG.get('alerta_webhook_url', 'http://127.0.0.1:8767/alertas'),
+                     data=json.dumps(alerta, ensure_ascii=False).encode('utf-8'),
+                     headers={'Content-Type': 'application/json'}, method='POST')
+    with urlopen(pedido, timeout=2):
+        pass
+
+
+def _conectar_outbox():
+    con = sqlite3.connect(CONFIG.get('arquivo_outbox_alertas', 'alertas.db'), timeout=30)
+    con.executescript(SQL_OUTBOX)
+    return con
+
+
+def _saida_outbox(alerta):
+    con = _conectar_outbox()
+    try:
+        with con:
+            con.execute(
+                """INSERT INTO outbox_alertas
+                   (criado_em, codigo_produto, tipo, saldo, estoque_minimo, dados)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (alerta['em'], alerta['codigo'], alerta['tipo'], alerta['saldo'],
+                 alerta['estoque_minimo'], json.dumps(alerta, ensure_ascii=False)))
+    finally:
+        con.close()
+
+
+# Saídas disponíveis: nome -> função(alerta)
+SAIDAS = {'log': _saida_log, 'webhook': _saida_webhook, 'outbox': _saida_outbox}
+
+
+def registrar_saida(nome, funcao):
+    """Inclui uma saída de alertas (use o nome em CONFIG['saidas_alerta'] para ativá-la)"""
+    SAIDAS[nome] = funcao
+
+
+# ==================== VERIFICAÇÃO ====================
+
+def variacoes(movimentos, seqs):
+    """Variação líquida do saldo e último seq de cada produto num lote [(aba, dados), ...]"""
+    import diario
+    total = {}
+    for (aba, dados), seq in zip(movimentos, seqs):
+        campos = dict(zip(diario.CAMPOS[aba], dados))
+        quantidade = campos['quantidade'] if aba == 'Entradas' else -campos['quantidade']
+        variacao, _ = total.get(campos['codigo'], (0, 0))
+        total[campos['codigo']] = (variacao + quantidade, seq)
+    return total
+
+
+def _saldo(codigo):
+    """Saldo atual do produto (consulta pela chave, sem somar o histórico)"""
+    if CONFIG.get('backend') == 'sqlite':
+        import banco_sqlite
+        return banco_sqlite.obter_saldo(codigo)
+    import saldos
+    return saldos.obter_saldo(codigo)
+
+
+def _origem():
+    """Identifica o diário (ou banco) atual: um diário recriado recomeça os seqs"""
+    arquivo = (CONFIG.get('arquivo_sqlite', 'estoque.db') if CONFIG.get('backend') == 'sqlite'
+               else CONFIG.get('arquivo_diario', 'movimentacoes.jsonl'))
+    try:
+        return os.stat(arquivo).st_ino
+    except OSError:
+        return 0
+
+
+def detectar(movimentos, seqs):
+    """Produtos do lote que cruzaram o estoque mínimo: lista de alertas ainda não filtrados
+
+    Chamada por quem grava, ainda dentro da trava do diário (ou da transação do
+    SQLite): o saldo lido é exatamente o de depois do lote, e o de antes é ele
+    menos a variação do lote, sem interferência de gravações simultâneas.
+    `seqs` são os números de sequência (ou ids) das movimentações, na ordem.
+    """
+    if not CONFIG.get('alertas_ativos', True) or not movimentos:
+        return []
+    try:
+        import catalogo
+        produtos = catalogo.obter_catalogo()
+        agora = datetime.now().isoformat(timespec='seconds')
+        origem = _origem()
+        cruzamentos = []
+        for codigo, (variacao, seq) in variacoes(movimentos, seqs).items():
+            produto = produtos.get(codigo)
+            minimo = produto.estoque_minimo if produto is not None else None
+            if not minimo or not variacao:
+                continue
+            depois = _saldo(codigo)
+            antes = depois - variacao
+            if antes >= minimo > depois:
+                tipo = 'critico'
+            elif antes < minimo <= depois:
+                tipo = 'normalizado'
+            else:
+                continue
+            cruzamentos.append({'tipo': tipo, 'codigo': codigo, 'nome': produto.nome,
+                                'fornecedor': produto.fornecedor, 'saldo_anterior': antes,
+                                'saldo': depois, 'estoque_minimo': minimo, 'em': agora,
+                                'seq': seq, 'origem': origem})
+        return cruzamentos
+    except Exception as e:
+        print(f"⚠️  Falha ao verificar alertas de estoque: {e}", file=sys.stderr)
+        return []
+
+
+# Quando vence o alerta adiado mais próximo (visto por este processo; None = nenhum)
+_vencimento = [None]
+
+
+def notificar(cruzamentos):
+    """Filtra os cruzamentos detectados, entrega os alertas e retorna os entregues
+
+    Chamada depois de liberar a trava/transação. Também entrega alertas adiados
+    cujo prazo já venceu. Erros aqui nunca desfazem nem impedem a movimentação.
+    """
+    vencido = _vencimento[0] is not None and time.time() >= _vencimento[0]
+    if not cruzamentos and not vencido:
+        return []
+    try:
+        alertas = _filtrar(cruzamentos)
+        for alerta in alertas:
+            _emitir(alerta)
+        return alertas
+    except Exception as e:
+        print(f"⚠️  Falha ao enviar alertas de estoque: {e}", file=sys.stderr)
+        return []
+
+
+def _arquivo_estado():
+    return os.path.join(CONFIG.get('pasta_indices', 'indices'), ARQUIVO_ESTADO)
+
+
+def _filtrar(cruzamentos):
+    """Aplica deduplicação, intervalo de repetição e limite por minuto (estado compartilhado)
+
+    Cada produto guarda o último estado avisado e o seq da movimentação mais
+    recente já considerada (cruzamentos mais antigos, vindos de outro processo,
+    são ignorados). Um alerta barrado pelo intervalo ou pelo limite por minuto
+    fica pendente, e só o mais recente de cada produto: sai quando o prazo
+    vencer, ou é descartado se o produto voltar ao estado já avisado.
+    """
+    import travas
+    arquivo = _arquivo_estado()
+    os.makedirs(os.path.dirname(arquivo) or '.', exist_ok=True)
+    intervalo = CONFIG.get('intervalo_repeticao_alerta', 3600)
+    limite = CONFIG.get('alertas_por_minuto', 30)
+
+    with travas.travar(arquivo):
+        try:
+            with open(arquivo, encoding='utf-8') as f:
+                estado = json.load(f)
+        except (FileNotFoundError, ValueError):
+            estado = {}
+        produtos = estado.setdefault('produtos', {})
+        pendentes = estado.setdefault('pendentes', {})
+        agora = time.time()
+        recentes = [t for t in estado.get('enviados', []) if agora - t < 60]
+
+        for alerta in cruzamentos:
+            atual = produtos.setdefault(alerta['codigo'], {'estado': 'normalizado', 'seq': 0})
+            if alerta['seq'] > atual.get('seq', 0) or alerta['origem'] != atual.get('origem'):
+                atual.update(seq=alerta['seq'], origem=alerta['origem'])
+                pendentes[alerta['codigo']] = alerta
+
+        alertas, vencimentos = [], []
+        for codigo, alerta in sorted(pendentes.items(), key=lambda item: item[1]['em']):
+            atual = produtos[codigo]
+            if atual['estado'] == alerta['tipo']:
+                del pendentes[codigo]  # estado já avisado: nada de novo
+            elif agora - atual.get(alerta['tipo'], 0) < intervalo:
+                vencimentos.append(atual[alerta['tipo']] + intervalo)  # produto oscilando
+            elif len(recentes) >= limite:
+                vencimentos.append(recentes[0] + 60)
+            else:
+                atual['estado'] = alerta['tipo']
+                atual[alerta['tipo']] = agora
+                recentes.append(agora)
+                alertas.append(pendentes.pop(codigo))
+
+        estado['enviados'] = recentes
+        estado['vencimento'] = _vencimento[0] = min(vencimentos, default=None)
+        temporario = f"{arquivo}.{os.getpid()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(estado, f, ensure_ascii=False)
+        os.replace(temporario, arquivo)
+    return alertas
+
+
+def _emitir(alerta):
+    """Entrega o alerta a cada saída configurada (a falha de uma não afeta as outras)"""
+    for nome in CONFIG.get('saidas_alerta', ['log', 'outbox']):
+        try:
+            SAIDAS[nome](alerta)
+        except Exception as e:
+            print(f"⚠️  Alerta {alerta['codigo']} não entregue em '{nome}': {e}", file=sys.stderr)
+
+
+# ==================== CAIXA DE SAÍDA ====================
+
+def pendentes(limite=100):
+    """Alertas da caixa de saída ainda não enviados: [(id, alerta), ...] em ordem"""
+    con = _conectar_outbox()
+    try:
+        linhas = con.execute("""SELECT id, dados FROM outbox_alertas WHERE enviado_em IS NULL
+                                ORDER BY id LIMIT ?""", (limite,)).fetchall()
+    finally:
+        con.close()
+    return [(id_alerta, json.loads(dados)) for id_alerta, dados in linhas]
+
+
+def marcar_enviados(ids):
+    """Marca alertas da caixa de saída como enviados"""
+    con = _conectar_outbox()
+    try:
+        with con:
+            con.executemany("UPDATE outbox_alertas SET enviado_em = ? WHERE id = ?",
+                            [(datetime.now().isoformat(timespec='seconds'), i) for i in ids])
+    finally:
+        con.close()
+
+
+def receptor(porta):
+    """Webhook local para testes: imprime cada alerta recebido por POST"""
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class Receptor(BaseHTTPRequestHandler):
+        def do_POST(self):
+            alerta = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            print(f"📨 {alerta['tipo'].upper()} {alerta['codigo']} {alerta['nome']}: "
+                  f"saldo {alerta['saldo']:g} (mínimo {alerta['estoque_minimo']:g})", flush=True)
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    print(f"\n📡 Recebendo alertas em http://127.0.0.1:{porta}/alertas (Ctrl+C para sair)\n")
+    HTTPServer(('127.0.0.1', porta), Receptor).serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alertas de estoque abaixo do mínimo")
+    parser.add_argument('--receptor', action='store_true', help="inicia o webhook local de teste")
+    parser.add_argument('--porta', type=int, default=8767)
+    parser.add_argument('--marcar-enviados', action='store_true',
+                        help="marca os alertas listados como enviados")
+    parser.add_argument('--despachar', action='store_true',
+                        help="entrega os alertas adiados cujo prazo já venceu")
+    args = parser.parse_args()
+
+    if args.despachar:
+        _vencimento[0] = 0
+        entregues = notificar([])
+        print(f"\n📤 {len(entregues)} alerta(s) adiado(s) entregue(s)")
+
+    if args.receptor:
+        try:
+            receptor(args.porta)
+        except KeyboardInterrupt:
+            print("\n👋 Receptor encerrado.\n")
+        raise SystemExit(0)
+
+    lista = pendentes()
+    print(f"\n🔔 {len(lista)} alerta(s) pendente(s) na caixa de saída\n")
+    for id_alerta, alerta in lista:
+        marca = '⚠️ ' if alerta['tipo'] == 'critico' else '✅'
+        print(f"  {id_alerta:>5} {alerta['em']} {marca} {alerta['codigo']:<8} "
+              f"{str(alerta['nome'])[:30]:<30} saldo {alerta['saldo']:g} (mín. {alerta['estoque_minimo']:g})")
+    if lista and args.marcar_enviados:
+        marcar_enviados([id_alerta for id_alerta, _ in lista])
+        print(f"\n✅ {len(lista)} alerta(s) marcado(s) como enviado(s)")
+    print()
@@ -1,79 +1,237 @@
 """
 Análise de Dados e Dashboard para Controle de Estoque
 Gera visualizações e relatórios para BI
+
+Uso:
+    python3 analise_dashboard.py [--headless] [--categorias] [--localizacoes]
+                                 [--top N] [--processos N] [--forcar]
+
+Em modo headless (ou sem tela), o dashboard é só salvo, sem janela.
+--categorias e --localizacoes geram também um dashboard por 'Tipo de Produto'
+e por 'Localização', desenhados em paralelo em vários processos; cada gráfico
+mostra no máximo os N maiores itens (--top).
+
+As imagens ficam num cache endereçado pela impressão digital dos dados
+desenhados (indices/figuras/): um dashboard só é redesenhado quando os seus
+dados mudam.
 """
 
+import argparse
+import hashlib
+import json
+import os
+import sys
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
-# Configurar estilo dos gráficos
-plt.style.use('seaborn-v0_8-darkgrid')
-sns.set_palette("husl")
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'arquivo_dashboard': 'dashboard_estoque.png', 'pasta_dashboards': 'dashboards',
+              'pasta_indices': 'indices', 'dpi_dashboard': 300,
+              'estilo_grafico': 'seaborn-v0_8-darkgrid', 'paleta_cores': 'husl', 'top_dashboard': 20}
+
+COLUNA_STATUS = "Status (Ex.: 'Repor' / 'OK')"
+
+# Rótulo do gráfico 5 conforme a coluna agrupada
+ROTULOS_AGRUPAMENTO = {'Tipo de Produto': 'Categoria', 'Localização': 'Localização'}
+
+# Cache de imagens dos dashboards (em CONFIG['pasta_indices']), uma por impressão digital
+PASTA_FIGURAS = 'figuras'
+
+# Mude quando o desenho dos gráficos mudar: invalida as imagens já geradas
+VERSAO_DASHBOARD = 1
+
+# Estilo e paleta são aplicados na primeira vez que um gráfico é desenhado
+_estilo_aplicado = False
 
 def carregar_dados(arquivo="Controle_Estoque.xlsx"):
     """Carrega os dados da planilha"""
     try:
-        abas = ['Base', 'Entradas', 'Saídas', 'Estoque Atual', 'Estoque Crítico']
-        return [pd.read_excel(arquivo, sheet_name=aba) for aba in abas]
+        # Materializa na planilha as movimentações pendentes do diário
+        import diario
+        diario.sincronizar_planilha(arquivo)
+    except PermissionError:
+        print("⚠️  Planilha aberta: movimentações recentes do diário não incluídas")
+    except FileNotFoundError:
+        pass
+
+    try:
+        # Todas as abas em uma única leitura (reaproveitada enquanto a planilha não mudar)
+        import planilha
+        abas = planilha.carregar(arquivo, planilha.ABAS)
+        return [abas[aba] for aba in planilha.ABAS]
     except FileNotFoundError:
         print("❌ Arquivo não encontrado! Execute: python3 gerar_planilha.py")
         return [None] * 5
 
 
-def gerar_dashboard(base, entradas, saidas, estoque, critico):
-    """Gera um dashboard completo com visualizações"""
-    
-    # Criar figura com múltiplos gráficos
-    fig = plt.figure(figsize=(16, 10))
-    fig.suptitle('📊 DASHBOARD - CONTROLE DE ESTOQUE', fontsize=20, fontweight='bold', y=0.98)
-    
-    # Configurar para não mostrar warnings de valores vazios
-    import warnings
-    warnings.filterwarnings('ignore')
-    
-    # ===== GRÁFICO 1: Estoque Atual por Produto =====
-    ax1 = plt.subplot(2, 3, 1)
-    
-    # Merge para pegar nomes dos produtos
+def _aplicar_estilo():
+    """Estilo e paleta dos gráficos (uma vez por processo)"""
+    global _estilo_aplicado
+    if _estilo_aplicado:
+        return
+    import matplotlib
+    import seaborn as sns
+    matplotlib.style.use(CONFIG.get('estilo_grafico', 'seaborn-v0_8-darkgrid'))
+    sns.set_palette(CONFIG.get('paleta_cores', 'husl'))
+    _estilo_aplicado = True
+
+
+def _maiores(serie, top):
+    """Os `top` maiores valores de `serie` (todos, na ordem original, se top for None/0)"""
+    if top and len(serie) > top:
+        return serie.sort_values(ascending=False, kind='stable').head(top)
+    return serie
+
+
+def _paineis(base, estoque, critico, totais_produto, titulo, agrupar_por='Tipo de Produto',
+             top=None):
+    """Dados dos seis gráficos, já reduzidos ao que é desenhado
+
+    Só listas e números: o resultado é pequeno para enviar a outro processo e
+    serializável em JSON para a impressão digital (impressao_paineis). Com `top`,
+    cada gráfico mostra só os `top` maiores itens (na pizza de valor, o restante
+    vira uma fatia 'Outros').
+    """
+    # Merge para pegar nomes e valores dos produtos
     estoque_nomes = pd.merge(
-        estoque, 
-        base[['Código', 'Nome do Produto']], 
-        left_on='Produto / Material', 
+        estoque[['Produto / Material', 'Saldo Atual']],
+        base[['Código', 'Nome do Produto', 'Valor Unitário (R$)']],
+        left_on='Produto / Material',
         right_on='Código'
     )
+    nomes = estoque_nomes['Nome do Produto'].astype(str)
+    saldos = _maiores(pd.Series(estoque_nomes['Saldo Atual'].values, index=nomes), top)
+    valor_total = pd.Series(
+        (estoque_nomes['Saldo Atual'] * estoque_nomes['Valor Unitário (R$)']).values, index=nomes)
+    valores = _maiores(valor_total, top)
+    if len(valores) < len(valor_total):
+        valores[f'Outros ({len(valor_total) - len(valores)})'] = valor_total.sum() - valores.sum()
+    
+    movimentados = _maiores(totais_produto['quantidade_entradas'] + totais_produto['quantidade_saidas'], top)
+    totais_produto = totais_produto.loc[movimentados.index]
     
-    cores = plt.cm.viridis(range(len(estoque_nomes)))
-    ax1.barh(estoque_nomes['Nome do Produto'], estoque_nomes['Saldo Atual'], color=cores)
+    # Contar quantos estão OK vs REPOR
+    status_count = critico[COLUNA_STATUS].str.contains('REPOR', na=False).value_counts()
+    grupos = base[agrupar_por].value_counts().head(top or None)
+    
+    return {
+        'titulo': titulo,
+        'produtos': saldos.index.tolist(),
+        'saldos': saldos.tolist(),
+        'produtos_valor': valores.index.tolist(),
+        'valores': valores.tolist(),
+        'ok': int(status_count.get(False, 0)),
+        'criticos': int(status_count.get(True, 0)),
+        'codigos': totais_produto.index.astype(str).tolist(),
+        'entradas': totais_produto['quantidade_entradas'].tolist(),
+        'saidas': totais_produto['quantidade_saidas'].tolist(),
+        'agrupamento': agrupar_por,
+        'grupos': [str(g) for g in grupos.index],
+        'contagens': grupos.tolist(),
+    }
+
+
+def impressao_paineis(paineis):
+    """Impressão digital dos dados de um dashboard: mesma impressão, mesma imagem"""
+    conteudo = json.dumps([VERSAO_DASHBOARD, CONFIG.get('dpi_dashboard', 300),
+                           CONFIG.get('estilo_grafico'), CONFIG.get('paleta_cores'), paineis],
+                          sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def _pasta_figuras():
+    return os.path.join(CONFIG.get('pasta_indices', 'indices'), PASTA_FIGURAS)
+
+
+def _figura_em_cache(impressao):
+    """Caminho da imagem no cache, endereçada pela impressão digital dos dados"""
+    return os.path.join(_pasta_figuras(), f'{impressao}.png')
+
+
+def _publicar(figura, arquivo):
+    """Coloca a imagem do cache em `arquivo` (link, sem cópia, quando possível)
+
+    Retorna False se `arquivo` já era essa imagem.
+    """
+    try:
+        if os.path.samefile(figura, arquivo):
+            return False
+    except OSError:
+        pass
+    import shutil
+    temporario = f"{arquivo}.{os.getpid()}.tmp"
+    try:
+        os.link(figura, temporario)
+    except OSError:
+        shutil.copyfile(figura, temporario)  # sistema de arquivos sem links (ou outro disco)
+    os.replace(temporario, arquivo)
+    return True
+
+
+def limpar_cache_figuras(dias=None):
+    """Remove do cache as imagens não usadas há mais de `dias` dias"""
+    dias = dias if dias is not None else CONFIG.get('dias_cache_figuras', 30)
+    limite = datetime.now().timestamp() - dias * 86400
+    removidas = 0
+    try:
+        entradas = list(os.scandir(_pasta_figuras()))
+    except FileNotFoundError:
+        return 0
+    for entrada in entradas:
+        if entrada.name.endswith('.png') and entrada.stat().st_mtime < limite:
+            try:
+                os.remove(entrada.path)
+                removidas += 1
+            except OSError:
+                pass
+    return removidas
+
+
+def desenhar_dashboard(paineis, arquivo, mostrar=False):
+    """Desenha os seis gráficos de `paineis` e salva em `arquivo`
+
+    Sem `mostrar`, usa só a API de objetos do matplotlib (Figure, renderizador
+    Agg): não precisa de tela nem do estado global do pyplot e pode rodar em
+    paralelo em vários processos.
+    """
+    _aplicar_estilo()
+    from matplotlib import colormaps
+    if mostrar:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(16, 10))
+    else:
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(16, 10))
+    fig.suptitle(paineis['titulo'], fontsize=20, fontweight='bold', y=0.98)
+    (ax1, ax2, ax3), (ax4, ax5, ax6) = fig.subplots(2, 3)
+    
+    # ===== GRÁFICO 1: Estoque Atual por Produto =====
+    saldos = pd.Series(paineis['saldos'], dtype=float)
+    cores = colormaps['viridis'](range(len(saldos)))
+    ax1.barh(paineis['produtos'], saldos, color=cores)
     ax1.set_xlabel('Quantidade', fontweight='bold')
     ax1.set_title('Estoque Atual por Produto', fontweight='bold', pad=10)
     ax1.grid(axis='x', alpha=0.3)
     
     # Ajustar limites do eixo X baseado nos dados
-    max_estoque = estoque_nomes['Saldo Atual'].max()
+    max_estoque = saldos.max()
     if pd.notna(max_estoque) and max_estoque > 0:
         ax1.set_xlim(0, max_estoque * 1.15)  # 15% de margem
     else:
         ax1.set_xlim(0, 10)  # Valor padrão quando não há dados
     
     # ===== GRÁFICO 2: Valor Total em Estoque =====
-    ax2 = plt.subplot(2, 3, 2)
-    
-    # Calcular valor total (saldo * valor unitário)
-    estoque_valor = pd.merge(
-        estoque_nomes,
-        base[['Código', 'Valor Unitário (R$)']],
-        on='Código'
-    )
-    estoque_valor['Valor Total'] = estoque_valor['Saldo Atual'] * estoque_valor['Valor Unitário (R$)']
+    valores = pd.Series(paineis['valores'], dtype=float)
     
     # Verificar se há valores para plotar
-    if estoque_valor['Valor Total'].sum() > 0:
-        ax2.pie(estoque_valor['Valor Total'], 
-                labels=estoque_valor['Nome do Produto'], 
+    if valores.sum() > 0:
+        ax2.pie(valores, 
+                labels=paineis['produtos_valor'], 
                 autopct='%1.1f%%',
                 startangle=90)
     else:
@@ -83,15 +241,11 @@ def gerar_dashboard(base, entradas, saidas, estoque, critico):
     ax2.set_title('Distribuição de Valor em Estoque (R$)', fontweight='bold', pad=10)
     
     # ===== GRÁFICO 3: Status do Estoque (Crítico/OK) =====
-    ax3 = plt.subplot(2, 3, 3)
-    
-    # Contar quantos estão OK vs REPOR
-    status_count = critico['Status (Ex.: \'Repor\' / \'OK\')'].str.contains('REPOR', na=False).value_counts()
     labels_status = ['✓ OK', '⚠️ Crítico']
     colors_status = ['#90EE90', '#FFB6C1']
     
-    ok_count = status_count.get(False, 0)
-    critico_count = status_count.get(True, 0)
+    ok_count = paineis['ok']
+    critico_count = paineis['criticos']
     
     if ok_count + critico_count > 0:
         ax3.pie([ok_count, critico_count], 
@@ -107,23 +261,16 @@ def gerar_dashboard(base, entradas, saidas, estoque, critico):
     ax3.set_title('Status de Estoque', fontweight='bold', pad=10)
     
     # ===== GRÁFICO 4: Entradas vs Saídas por Produto =====
-    ax4 = plt.subplot(2, 3, 4)
-    
-    # Agrupar entradas e saídas por produto
-    entradas_total = entradas.groupby('Produto / Material')['Quantidade'].sum()
-    saidas_total = saidas.groupby('Produto / Material')['Quantidade Retirada'].sum()
-    
-    # Criar dataframe comparativo
     comparacao = pd.DataFrame({
-        'Entradas': entradas_total,
-        'Saídas': saidas_total
-    }).fillna(0)
+        'Entradas': paineis['entradas'],
+        'Saídas': paineis['saidas']
+    }, index=paineis['codigos'], dtype=float)
     
-    x = range(len(comparacao))
+    x = np.arange(len(comparacao))
     width = 0.35
     
-    ax4.bar([i - width/2 for i in x], comparacao['Entradas'], width, label='Entradas', color='#4CAF50')
-    ax4.bar([i + width/2 for i in x], comparacao['Saídas'], width, label='Saídas', color='#F44336')
+    ax4.bar(x - width/2, comparacao['Entradas'], width, label='Entradas', color='#4CAF50')
+    ax4.bar(x + width/2, comparacao['Saídas'], width, label='Saídas', color='#F44336')
     
     ax4.set_xlabel('Produtos', fontweight='bold')
     ax4.set_ylabel('Quantidade', fontweight='bold')
@@ -138,36 +285,30 @@ def gerar_dashboard(base, entradas, saidas, estoque, critico):
     if pd.notna(max_movimentacao) and max_movimentacao > 0:
         ax4.set_ylim(0, max_movimentacao * 1.15)  # 15% de margem
     
-    # ===== GRÁFICO 5: Produtos por Categoria =====
-    ax5 = plt.subplot(2, 3, 5)
-    
-    categoria_count = base['Tipo de Produto'].value_counts()
-    cores_cat = plt.cm.Set3(range(len(categoria_count)))
+    # ===== GRÁFICO 5: Produtos por Categoria (ou Localização) =====
+    rotulo = ROTULOS_AGRUPAMENTO.get(paineis['agrupamento'], paineis['agrupamento'])
+    contagens = pd.Series(paineis['contagens'], index=paineis['grupos'], dtype=float)
+    cores_cat = colormaps['Set3'](range(len(contagens)))
     
-    ax5.bar(categoria_count.index, categoria_count.values, color=cores_cat)
-    ax5.set_xlabel('Categoria', fontweight='bold')
+    ax5.bar(contagens.index, contagens.values, color=cores_cat)
+    ax5.set_xlabel(rotulo, fontweight='bold')
     ax5.set_ylabel('Quantidade de Produtos', fontweight='bold')
-    ax5.set_title('Produtos por Categoria', fontweight='bold', pad=10)
+    ax5.set_title(f'Produtos por {rotulo}', fontweight='bold', pad=10)
     ax5.tick_params(axis='x', rotation=45)
     ax5.grid(axis='y', alpha=0.3)
     
     # Ajustar limites do eixo Y baseado nos dados
-    max_categoria = categoria_count.max()
+    max_categoria = contagens.max()
     if pd.notna(max_categoria) and max_categoria > 0:
         ax5.set_ylim(0, max_categoria * 1.2)  # 20% de margem
     
     # ===== GRÁFICO 6: Top 5 Produtos Mais Movimentados =====
-    ax6 = plt.subplot(2, 3, 6)
-    
-    # Calcular total de movimentação (entradas + saídas)
-    entradas_produto = entradas.groupby('Produto / Material')['Quantidade'].sum()
-    saidas_produto = saidas.groupby('Produto / Material')['Quantidade Retirada'].sum()
-    
+    # Calcular total de movimentação (entradas + saídas), reaproveitando o gráfico 4
     movimentacao = pd.DataFrame({
-        'Total': entradas_produto.add(saidas_produto, fill_value=0)
+        'Total': comparacao['Entradas'] + comparacao['Saídas']
     }).sort_values('Total', ascending=False).head(5)
     
-    cores_top = plt.cm.Oranges(range(len(movimentacao), 0, -1))
+    cores_top = colormaps['Oranges'](range(len(movimentacao), 0, -1))
     ax6.barh(movimentacao.index, movimentacao['Total'], color=cores_top)
     ax6.set_xlabel('Quantidade Movimentada', fontweight='bold')
     ax6.set_title('Top 5 Produtos Mais Movimentados', fontweight='bold', pad=10)
@@ -178,10 +319,121 @@ def gerar_dashboard(base, entradas, saidas, estoque, critico):
     if pd.notna(max_movimentacao_top) and max_movimentacao_top > 0:
         ax6.set_xlim(0, max_movimentacao_top * 1.15)  # 15% de margem
     
-    plt.tight_layout()
-    plt.savefig('dashboard_estoque.png', dpi=300, bbox_inches='tight')
-    print("\n✅ Dashboard salvo como 'dashboard_estoque.png'")
-    plt.show()
+    fig.tight_layout()
+    temporario = f"{arquivo}.{os.getpid()}.tmp"  # a imagem aparece inteira ou não aparece
+    fig.savefig(temporario, format='png', dpi=CONFIG.get('dpi_dashboard', 300), bbox_inches='tight')
+    os.replace(temporario, arquivo)
+    if mostrar:
+        plt.show()
+        plt.close(fig)
+    return arquivo
+
+
+def _desenhar_tarefa(tarefa):
+    """Executada nos processos do pool: desenha um dashboard sem tela"""
+    paineis, arquivo = tarefa
+    return desenhar_dashboard(paineis, arquivo)
+
+
+def _obter_figura(paineis, mostrar=False, forcar=False):
+    """Imagem do cache para `paineis`, desenhando-a só se ainda não existir
+
+    Retorna (caminho no cache, se foi desenhada agora).
+    """
+    figura = _figura_em_cache(impressao_paineis(paineis))
+    if os.path.exists(figura) and not (mostrar or forcar):
+        os.utime(figura)  # usada agora: não sai na limpeza do cache
+        return figura, False
+    os.makedirs(_pasta_figuras(), exist_ok=True)
+    desenhar_dashboard(paineis, figura, mostrar)
+    return figura, True
+
+
+def gerar_dashboard(base, entradas, saidas, estoque, critico, arquivo=None, mostrar=True,
+                    forcar=False, top=None):
+    """Gera um dashboard completo com visualizações
+
+    mostrar=False (modo headless): só salva a imagem, sem janela. A imagem vem
+    do cache de figuras quando os dados já foram desenhados antes (forcar=True
+    redesenha). top: máximo de produtos por gráfico (padrão: CONFIG['top_dashboard']).
+    """
+    arquivo = arquivo or CONFIG.get('arquivo_dashboard', 'dashboard_estoque.png')
+    top = top if top is not None else CONFIG.get('top_dashboard')
+    
+    # Totais por produto já agregados a cada movimentação (agregados.py), sem agrupar o histórico
+    import agregados
+    paineis = _paineis(base, estoque, critico, agregados.por_produto(),
+                       '📊 DASHBOARD - CONTROLE DE ESTOQUE', top=top)
+    figura, desenhada = _obter_figura(paineis, mostrar, forcar)
+    if not _publicar(figura, arquivo) and not desenhada:
+        print(f"\n✅ Dashboard '{arquivo}' já está atualizado (dados sem mudança)")
+        return arquivo
+    print(f"\n✅ Dashboard salvo como '{arquivo}'")
+    return arquivo
+
+
+def _nome_arquivo(texto):
+    """Texto livre (categoria, localização) como parte de nome de arquivo"""
+    import re
+    import unicodedata
+    ascii_ = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', ascii_.lower()).strip('_') or 'sem_nome'
+
+
+def gerar_dashboards_por_grupo(base, estoque, critico, coluna='Tipo de Produto', pasta=None,
+                               processos=None, forcar=False, top=None):
+    """Um dashboard por valor de `coluna` da Base ('Tipo de Produto' ou 'Localização')
+
+    As imagens ficam em `pasta`/<coluna>/. Só os grupos cujos dados mudaram são
+    desenhados (os demais vêm do cache de figuras), em paralelo em vários
+    processos. Retorna (desenhados, vindos do cache).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import agregados
+    pasta = os.path.join(pasta or CONFIG.get('pasta_dashboards', 'dashboards'), _nome_arquivo(coluna))
+    os.makedirs(pasta, exist_ok=True)
+    top = top if top is not None else CONFIG.get('top_dashboard')
+    outra = 'Localização' if coluna == 'Tipo de Produto' else 'Tipo de Produto'
+    
+    # Cada aba é separada por grupo uma única vez (não uma filtragem por grupo)
+    grupo = dict(zip(base['Código'], base[coluna]))
+    nome_grupo = dict(zip(base['Nome do Produto'], base[coluna]))
+    totais = agregados.por_produto()
+    estoques = dict(tuple(estoque.groupby(estoque['Produto / Material'].map(grupo))))
+    criticos = dict(tuple(critico.groupby(critico['Nome do Produto'].map(nome_grupo))))
+    movimentados = dict(tuple(totais.groupby(totais.index.map(grupo))))
+    
+    publicacoes, tarefas = {}, {}
+    for nome, produtos in base.groupby(coluna):
+        paineis = _paineis(produtos,
+                           estoques.get(nome, estoque.iloc[:0]),
+                           criticos.get(nome, critico.iloc[:0]),
+                           movimentados.get(nome, totais.iloc[:0]),
+                           f'📊 DASHBOARD - {str(nome).upper()}', agrupar_por=outra, top=top)
+        figura = _figura_em_cache(impressao_paineis(paineis))
+        publicacoes[os.path.join(pasta, f'dashboard_{_nome_arquivo(nome)}.png')] = figura
+        if forcar or not os.path.exists(figura):
+            tarefas[figura] = paineis  # grupos com os mesmos dados: uma imagem só
+        else:
+            os.utime(figura)
+    
+    if tarefas:
+        os.makedirs(_pasta_figuras(), exist_ok=True)
+        pendentes = [(paineis, figura) for figura, paineis in tarefas.items()]
+        if len(pendentes) == 1:
+            _desenhar_tarefa(pendentes[0])
+        else:
+            with ProcessPoolExecutor(max_workers=processos or CONFIG.get('processos_dashboard') or None,
+                                     initializer=_aplicar_estilo) as pool:
+                list(pool.map(_desenhar_tarefa, pendentes))
+    
+    for arquivo, figura in publicacoes.items():
+        _publicar(figura, arquivo)
+    # Grupos que deixaram de existir na Base
+    for entrada in os.scandir(pasta):
+        if entrada.name.startswith('dashboard_') and entrada.path not in publicacoes:
+            os.remove(entrada.path)
+    return len(tarefas), len(publicacoes) - len(tarefas)
 
 
 def gerar_relatorio(base, entradas, saidas, estoque, critico):
@@ -195,28 +447,29 @@ def gerar_relatorio(base, entradas, saidas, estoque, critico):
     total_produtos = len(base)
     print(f"\n📦 Total de Produtos Cadastrados: {total_produtos}")
     
-    # Valor total em estoque
-    estoque_com_valor = pd.merge(
-        estoque,
-        base[['Código', 'Valor Unitário (R$)']],
-        left_on='Produto / Material',
-        right_on='Código'
-    )
-    estoque_com_valor['Valor Total'] = estoque_com_valor['Saldo Atual'] * estoque_com_valor['Valor Unitário (R$)']
-    valor_total = estoque_com_valor['Valor Total'].sum()
+    # Valor total em estoque, pelo custo das compras (custos.py mantém custo médio e camadas FIFO)
+    import custos
+    saldos_atuais = dict(zip(estoque['Produto / Material'], estoque['Saldo Atual']))
+    precos = dict(zip(base['Código'], base['Valor Unitário (R$)']))
+    valor = custos.avaliar_estoque(saldos_atuais, precos)
     
-    print(f"💰 Valor Total em Estoque: R$ {valor_total:,.2f}")
+    print(f"💰 Valor Total em Estoque: R$ {valor['medio']:,.2f} (custo médio) | "
+          f"R$ {valor['fifo']:,.2f} (FIFO)")
+    if valor['sem_custo']:
+        print(f"   {valor['sem_custo']:,.0f} unidades sem entrada registrada avaliadas pelo valor do cadastro")
     
     # Produtos críticos (abaixo do mínimo)
-    produtos_criticos = critico[critico['Status (Ex.: \'Repor\' / \'OK\')'].str.contains('REPOR', na=False)]
+    produtos_criticos = critico[critico[COLUNA_STATUS].str.contains('REPOR', na=False)]
     num_criticos = len(produtos_criticos)
     
     print(f"⚠️  Produtos em Estoque Crítico: {num_criticos}")
     
     if num_criticos > 0:
         print("\n   Produtos que precisam reposição:")
-        for idx, row in produtos_criticos.iterrows():
-            print(f"   • {row['Nome do Produto']}: {row['Estoque Atual']:.0f} (mínimo: {row['Estoque Mínimo']:.0f})")
+        for nome, atual, minimo in zip(produtos_criticos['Nome do Produto'],
+                                       produtos_criticos['Estoque Atual'],
+                                       produtos_criticos['Estoque Mínimo']):
+            print(f"   • {nome}: {atual:.0f} (mínimo: {minimo:.0f})")
     
     # Total de movimentações
     total_entradas = len(entradas)
@@ -228,9 +481,9 @@ def gerar_relatorio(base, entradas, saidas, estoque, critico):
     
     # Produto mais movimentado
     if total_entradas > 0 or total_saidas > 0:
-        entradas_por_produto = entradas.groupby('Produto / Material')['Quantidade'].sum()
-        saidas_por_produto = saidas.groupby('Produto / Material')['Quantidade Retirada'].sum()
-        movimentacao_total = entradas_por_produto.add(saidas_por_produto, fill_value=0)
+        import agregados
+        totais_produto = agregados.por_produto()
+        movimentacao_total = totais_produto['quantidade_entradas'] + totais_produto['quantidade_saidas']
         
         if len(movimentacao_total) > 0 and movimentacao_total.max() > 0:
             produto_top = movimentacao_total.idxmax()
@@ -286,7 +539,30 @@ def exportar_para_csv(base, entradas, saidas, estoque, critico):
     print("   Pronto para Power BI, Tableau ou Looker!")
 
 
+def _tem_tela():
+    """Há onde abrir a janela do gráfico?"""
+    if os.name == 'nt' or sys.platform == 'darwin':
+        return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relatório, dashboard e exportação CSV do estoque")
+    parser.add_argument('--headless', action='store_true',
+                        help="só salva as imagens, sem abrir janela (servidores, agendamentos)")
+    parser.add_argument('--categorias', action='store_true',
+                        help="gera também um dashboard por categoria em CONFIG['pasta_dashboards']")
+    parser.add_argument('--localizacoes', action='store_true',
+                        help="gera também um dashboard por localização em CONFIG['pasta_dashboards']")
+    parser.add_argument('--top', type=int,
+                        help="máximo de itens por gráfico (padrão: CONFIG['top_dashboard']; 0 = todos)")
+    parser.add_argument('--processos', type=int,
+                        help="processos para desenhar os dashboards por grupo (padrão: um por CPU)")
+    parser.add_argument('--forcar', action='store_true',
+                        help="redesenha mesmo os dashboards cujos dados não mudaram")
+    args = parser.parse_args()
+    mostrar = not args.headless and _tem_tela()
+    
     print("\n🔄 Carregando dados da planilha...")
     
     base, entradas, saidas, estoque, critico = carregar_dados()
@@ -299,7 +575,18 @@ if __name__ == "__main__":
         
         # Gerar dashboard
         print("📊 Gerando dashboard visual...")
-        gerar_dashboard(base, entradas, saidas, estoque, critico)
+        gerar_dashboard(base, entradas, saidas, estoque, critico, mostrar=mostrar,
+                        forcar=args.forcar, top=args.top)
+        
+        grupos = [('Tipo de Produto', 'categoria')] * args.categorias + \
+                 [('Localização', 'localização')] * args.localizacoes
+        for coluna, descricao in grupos:
+            print(f"\n📊 Gerando dashboards por {descricao}...")
+            desenhados, em_cache = gerar_dashboards_por_grupo(base, estoque, critico, coluna,
+                                                              processos=args.processos,
+                                                              forcar=args.forcar, top=args.top)
+            print(f"✅ {desenhados} dashboards desenhados, {em_cache} sem mudança (cache)")
+        limpar_cache_figuras()
         
         # Exportar para CSV
         print("\n📁 Exportando dados para CSV...")
@@ -0,0 +1,630 @@
+"""
+Armazenamento em SQLite - Controle de Estoque
+Implementa o modelo estrela de exportar_para_BI.gerar_modelo_estrela_sql em um banco local
+
+Ativado com CONFIG['backend'] = 'sqlite'. Consultas e inserções usam índices,
+sem precisar abrir e interpretar todas as abas da planilha a cada operação.
+
+Uso:
+    python3 banco_sqlite.py                  # importa planilha e diário para o banco
+    python3 banco_sqlite.py --fechar-meses   # grava fechamentos mensais pendentes
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'arquivo_excel': 'Controle_Estoque.xlsx', 'arquivo_sqlite': 'estoque.db'}
+
+# Modelo estrela (mesmas tabelas, colunas e índices de modelo_estrela.sql, em dialeto SQLite)
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS dim_produtos (
+    codigo_produto VARCHAR(20) PRIMARY KEY,
+    nome_produto VARCHAR(200),
+    descricao TEXT,
+    categoria VARCHAR(100),
+    estoque_minimo DECIMAL(10,2),
+    valor_unitario DECIMAL(10,2),
+    fornecedor VARCHAR(200),
+    localizacao VARCHAR(50)
+);
+
+CREATE TABLE IF NOT EXISTS dim_fornecedores (
+    id_fornecedor INTEGER PRIMARY KEY,
+    nome_fornecedor VARCHAR(200) UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS dim_categorias (
+    id_categoria INTEGER PRIMARY KEY,
+    nome_categoria VARCHAR(100) UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS dim_tempo (
+    data_completa DATE PRIMARY KEY,
+    ano INT,
+    mes INT,
+    mes_nome VARCHAR(20),
+    dia INT,
+    dia_semana VARCHAR(20),
+    trimestre INT,
+    semana_ano INT
+);
+
+CREATE TABLE IF NOT EXISTS fato_movimentacoes (
+    id_movimentacao INTEGER PRIMARY KEY AUTOINCREMENT,
+    data_movimentacao DATE,
+    codigo_produto VARCHAR(20),
+    quantidade_movimento DECIMAL(10,2),
+    tipo_movimentacao VARCHAR(20),
+    documento VARCHAR(200),
+    valor_unitario DECIMAL(10,2),
+    valor_total DECIMAL(10,2),
+    ano INT,
+    mes INT,
+    FOREIGN KEY (codigo_produto) REFERENCES dim_produtos(codigo_produto),
+    FOREIGN KEY (data_movimentacao) REFERENCES dim_tempo(data_completa)
+);
+
+CREATE TABLE IF NOT EXISTS fato_estoque_atual (
+    codigo_produto VARCHAR(20) PRIMARY KEY,
+    data_referencia DATE,
+    estoque_inicial DECIMAL(10,2),
+    total_entradas DECIMAL(10,2),
+    total_saidas DECIMAL(10,2),
+    saldo_atual DECIMAL(10,2),
+    valor_total_estoque DECIMAL(10,2),
+    status_estoque VARCHAR(20),
+    deficit_estoque DECIMAL(10,2),
+    valor_total_entradas DECIMAL(10,2),
+    FOREIGN KEY (codigo_produto) REFERENCES dim_produtos(codigo_produto)
+);
+
+-- Fechamentos mensais: entradas/saídas acumuladas até o fim de cada mês (historico.py)
+CREATE TABLE IF NOT EXISTS fato_estoque_mensal (
+    ano_mes CHAR(7),
+    codigo_produto VARCHAR(20),
+    total_entradas DECIMAL(10,2),
+    total_saidas DECIMAL(10,2),
+    PRIMARY KEY (ano_mes, codigo_produto)
+);
+
+-- Agregados por produto, atualizados a cada movimentação (agregados.py)
+CREATE TABLE IF NOT EXISTS agg_movimentacoes_diarias (
+    data_movimentacao DATE,
+    codigo_produto VARCHAR(20),
+    quantidade_entradas DECIMAL(10,2),
+    quantidade_saidas DECIMAL(10,2),
+    valor_entradas DECIMAL(10,2),
+    num_entradas INT,
+    num_saidas INT,
+    PRIMARY KEY (data_movimentacao, codigo_produto)
+);
+
+CREATE TABLE IF NOT EXISTS agg_movimentacoes_mensais (
+    ano INT,
+    mes INT,
+    codigo_produto VARCHAR(20),
+    quantidade_entradas DECIMAL(10,2),
+    quantidade_saidas DECIMAL(10,2),
+    valor_entradas DECIMAL(10,2),
+    num_entradas INT,
+    num_saidas INT,
+    PRIMARY KEY (ano, mes, codigo_produto)
+);
+
+CREATE INDEX IF NOT EXISTS idx_mov_data ON fato_movimentacoes(data_movimentacao);
+CREATE INDEX IF NOT EXISTS idx_mov_produto ON fato_movimentacoes(codigo_produto);
+CREATE INDEX IF NOT EXISTS idx_mov_tipo ON fato_movimentacoes(tipo_movimentacao);
+CREATE INDEX IF NOT EXISTS idx_estoque_status ON fato_estoque_atual(status_estoque);
+
+CREATE VIEW IF NOT EXISTS vw_movimentacoes_mensais AS
+SELECT a.ano, a.mes, 'Entrada' AS tipo_movimentacao, p.categoria,
+       SUM(a.num_entradas) AS num_movimentacoes,
+       SUM(a.quantidade_entradas) AS quantidade_total,
+       SUM(a.valor_entradas) AS valor_total
+FROM agg_movimentacoes_mensais a
+JOIN dim_produtos p ON a.codigo_produto = p.codigo_produto
+WHERE a.num_entradas > 0
+GROUP BY a.ano, a.mes, p.categoria
+UNION ALL
+SELECT a.ano, a.mes, 'Saída', p.categoria,
+       SUM(a.num_saidas), -SUM(a.quantidade_saidas), NULL
+FROM agg_movimentacoes_mensais a
+JOIN dim_produtos p ON a.codigo_produto = p.codigo_produto
+WHERE a.num_saidas > 0
+GROUP BY a.ano, a.mes, p.categoria;
+"""
+
+# Colunas da aba 'Base' <-> colunas de dim_produtos
+COLUNAS_BASE = {
+    'Código': 'codigo_produto',
+    'Nome do Produto': 'nome_produto',
+    'Descrição': 'descricao',
+    'Tipo de Produto': 'categoria',
+    'Estoque Mínimo': 'estoque_minimo',
+    'Valor Unitário (R$)': 'valor_unitario',
+    'Fornecedor': 'fornecedor',
+    'Localização': 'localizacao',
+}
+
+# Conexões abertas, uma por thread (o sqlite3 não compartilha conexões entre threads);
+# num pool de threads fixo (servico.py), cada thread reaproveita sempre a mesma
+_local = threading.local()
+
+
+def conectar(arquivo=None):
+    """Abre (uma vez por thread) o banco em modo WAL e cria o esquema se preciso"""
+    arquivo = arquivo or CONFIG.get('arquivo_sqlite', 'estoque.db')
+    conexoes = _local.__dict__.setdefault('conexoes', {})
+    con = conexoes.get(arquivo)
+    if con is None:
+        # IMMEDIATE: cada transação de escrita já começa com a trava de escrita do banco;
+        # terminais concorrentes esperam (busy timeout) em vez de falhar com "database is locked"
+        con = sqlite3.connect(arquivo, timeout=CONFIG.get('tempo_limite_trava', 30),
+                              isolation_level='IMMEDIATE')
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA foreign_keys=ON")
+        con.executescript(ESQUEMA)
+        colunas = {linha[1] for linha in con.execute("PRAGMA table_info(fato_estoque_atual)")}
+        if 'valor_total_entradas' not in colunas:
+            con.execute("ALTER TABLE fato_estoque_atual ADD COLUMN valor_total_entradas DECIMAL(10,2)")
+        # Bancos criados antes do saldo/valor materializado: preenche uma única vez
+        if con.execute("""SELECT 1 FROM fato_estoque_atual
+                          WHERE saldo_atual IS NULL OR valor_total_entradas IS NULL
+                          LIMIT 1""").fetchone():
+            recalcular_estoque(con)
+        # Bancos criados antes dos agregados
+        if (con.execute("SELECT 1 FROM fato_movimentacoes LIMIT 1").fetchone()
+                and not con.execute("SELECT 1 FROM agg_movimentacoes_mensais LIMIT 1").fetchone()):
+            recalcular_agregados(con)
+        conexoes[arquivo] = con
+    return con
+
+
+def _data_iso(data):
+    """Converte a data da movimentação para YYYY-MM-DD (DD/MM/YYYY, ISO ou datetime)"""
+    import historico
+    return historico.dia_iso(data)
+
+
+def _registrar_tempo(con, data_iso):
+    d = datetime.strptime(data_iso, '%Y-%m-%d')
+    con.execute(
+        "INSERT OR IGNORE INTO dim_tempo VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (data_iso, d.year, d.month, d.strftime('%B'), d.day, d.strftime('%A'),
+         (d.month - 1) // 3 + 1, d.isocalendar()[1])
+    )
+
+
+def carregar_produtos(arquivo=None):
+    """Retorna o cadastro como DataFrame com as mesmas colunas da aba 'Base'"""
+    import pandas as pd
+    colunas = ', '.join(f'{col} AS "{nome}"' for nome, col in COLUNAS_BASE.items())
+    return pd.read_sql_query(
+        f"SELECT {colunas} FROM dim_produtos ORDER BY rowid", conectar(arquivo)
+    )
+
+
+def carregar_estoque(arquivo=None):
+    """Retorna o estoque atual com as mesmas colunas da aba 'Estoque Atual'"""
+    import pandas as pd
+    return pd.read_sql_query(
+        """SELECT codigo_produto AS "Produto / Material",
+                  estoque_inicial AS "Estoque Inicial",
+                  total_entradas AS "Total de Entradas",
+                  total_saidas AS "Total de Saídas",
+                  saldo_atual AS "Saldo Atual"
+           FROM fato_estoque_atual ORDER BY rowid""",
+        conectar(arquivo)
+    )
+
+
+def obter_produto(codigo, arquivo=None):
+    """Busca um produto pelo código (chave primária); None se não existir"""
+    cur = conectar(arquivo).execute(
+        f"SELECT {', '.join(COLUNAS_BASE.values())} FROM dim_produtos WHERE codigo_produto = ?",
+        (codigo,)
+    )
+    linha = cur.fetchone()
+    return dict(zip(COLUNAS_BASE, linha)) if linha else None
+
+
+def cadastrar_produto(codigo, nome, descricao, categoria, estoque_minimo, valor_unitario,
+                      fornecedor, localizacao, arquivo=None):
+    """Insere um produto em dim_produtos (e nas dimensões auxiliares)"""
+    con = conectar(arquivo)
+    with con:
+        _inserir_produto(con, codigo, nome, descricao, categoria, estoque_minimo, valor_unitario,
+                         fornecedor, localizacao)
+    return codigo
+
+
+def _inserir_produto(con, codigo, nome, descricao, categoria, estoque_minimo, valor_unitario,
+                     fornecedor, localizacao, estoque_inicial=0):
+    """Grava o produto, as dimensões auxiliares e a linha de estoque (sem commit)"""
+    con.execute(
+        "INSERT INTO dim_produtos VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (codigo, nome, descricao, categoria, estoque_minimo, valor_unitario,
+         fornecedor, localizacao)
+    )
+    con.execute("INSERT OR IGNORE INTO dim_fornecedores (nome_fornecedor) VALUES (?)",
+                (fornecedor,))
+    con.execute("INSERT OR IGNORE INTO dim_categorias (nome_categoria) VALUES (?)",
+                (categoria,))
+    con.execute(
+        """INSERT OR IGNORE INTO fato_estoque_atual
+           (codigo_produto, data_referencia, estoque_inicial, total_entradas, total_saidas,
+            saldo_atual, valor_total_entradas) VALUES (?, ?, ?, 0, 0, ?, 0)""",
+        (codigo, datetime.now().strftime('%Y-%m-%d'), estoque_inicial, estoque_inicial)
+    )
+    con.execute(_ATUALIZAR_DERIVADOS + " WHERE codigo_produto = ?", (codigo,))
+
+
+# Soma uma movimentação ao saldo materializado do produto (:qtd < 0 para saídas)
+_ATUALIZAR_SALDO = """
+UPDATE fato_estoque_atual SET
+    data_referencia = MAX(COALESCE(data_referencia, :data), :data),
+    total_entradas = total_entradas + MAX(:qtd, 0),
+    total_saidas = total_saidas + MAX(-:qtd, 0),
+    saldo_atual = saldo_atual + :qtd,
+    valor_total_entradas = COALESCE(valor_total_entradas, 0) + :valor
+WHERE codigo_produto = :codigo
+"""
+
+# Valor, status e déficit a partir do saldo e do cadastro do produto
+_ATUALIZAR_DERIVADOS = """
+UPDATE fato_estoque_atual SET
+    valor_total_estoque = saldo_atual * (
+        SELECT valor_unitario FROM dim_produtos p
+        WHERE p.codigo_produto = fato_estoque_atual.codigo_produto),
+    status_estoque = CASE WHEN saldo_atual < (
+        SELECT COALESCE(estoque_minimo, 0) FROM dim_produtos p
+        WHERE p.codigo_produto = fato_estoque_atual.codigo_produto)
+        THEN 'Crítico' ELSE 'Normal' END,
+    deficit_estoque = MAX(0, (
+        SELECT COALESCE(estoque_minimo, 0) FROM dim_produtos p
+        WHERE p.codigo_produto = fato_estoque_atual.codigo_produto) - saldo_atual)
+"""
+
+
+# Produto ainda ausente dos fechamentos a partir de :mes ganha linha zerada
+_INCLUIR_NOS_FECHAMENTOS = """
+INSERT OR IGNORE INTO fato_estoque_mensal (ano_mes, codigo_produto, total_entradas, total_saidas)
+SELECT DISTINCT ano_mes, :codigo, 0, 0 FROM fato_estoque_mensal WHERE ano_mes >= :mes
+"""
+
+_AJUSTAR_FECHAMENTOS = """
+UPDATE fato_estoque_mensal SET
+    total_entradas = total_entradas + MAX(:qtd, 0),
+    total_saidas = total_saidas + MAX(-:qtd, 0)
+WHERE ano_mes >= :mes AND codigo_produto = :codigo
+"""
+
+# Fechamento = fechamento anterior + movimentações entre [:inicio, :fim)
+_FECHAR_MES = """
+INSERT INTO fato_estoque_mensal (ano_mes, codigo_produto, total_entradas, total_saidas)
+SELECT :mes, codigo_produto, SUM(entradas), SUM(saidas) FROM (
+    SELECT codigo_produto, total_entradas AS entradas, total_saidas AS saidas
+    FROM fato_estoque_mensal WHERE ano_mes = :anterior
+    UNION ALL
+    SELECT codigo_produto, MAX(quantidade_movimento, 0), MAX(-quantidade_movimento, 0)
+    FROM fato_movimentacoes
+    WHERE data_movimentacao >= :inicio AND data_movimentacao < :fim
+) GROUP BY codigo_produto
+"""
+
+
+# Soma uma movimentação no agregado do dia/mês do produto (cria a linha se preciso)
+_SOMAR_AGREGADO = """
+    quantidade_entradas = quantidade_entradas + excluded.quantidade_entradas,
+    quantidade_saidas = quantidade_saidas + excluded.quantidade_saidas,
+    valor_entradas = ROUND(valor_entradas + excluded.valor_entradas, 2),
+    num_entradas = num_entradas + excluded.num_entradas,
+    num_saidas = num_saidas + excluded.num_saidas
+"""
+_ACUMULAR_DIA = """
+INSERT INTO agg_movimentacoes_diarias VALUES (:data, :codigo, :qe, :qs, :ve, :ne, :ns)
+ON CONFLICT (data_movimentacao, codigo_produto) DO UPDATE SET""" + _SOMAR_AGREGADO
+_ACUMULAR_MES = """
+INSERT INTO agg_movimentacoes_mensais VALUES (:ano, :mes, :codigo, :qe, :qs, :ve, :ne, :ns)
+ON CONFLICT (ano, mes, codigo_produto) DO UPDATE SET""" + _SOMAR_AGREGADO
+
+
+def recalcular_agregados(con):
+    """Refaz os agregados diários e mensais a partir das movimentações (manutenção)"""
+    somas = """SUM(MAX(quantidade_movimento, 0)), SUM(MAX(-quantidade_movimento, 0)),
+               ROUND(COALESCE(SUM(CASE WHEN quantidade_movimento > 0 THEN valor_total END), 0), 2),
+               SUM(quantidade_movimento > 0), SUM(quantidade_movimento < 0)"""
+    with con:
+        con.execute("DELETE FROM agg_movimentacoes_diarias")
+        con.execute("DELETE FROM agg_movimentacoes_mensais")
+        con.execute(f"""INSERT INTO agg_movimentacoes_diarias
+                        SELECT data_movimentacao, codigo_produto, {somas}
+                        FROM fato_movimentacoes GROUP BY data_movimentacao, codigo_produto""")
+        con.execute(f"""INSERT INTO agg_movimentacoes_mensais
+                        SELECT ano, mes, codigo_produto, {somas}
+                        FROM fato_movimentacoes GROUP BY ano, mes, codigo_produto""")
+
+
+def carregar_agregados(periodo='mes', arquivo=None, desde=None, ate=None):
+    """Agregados por produto ('dia' ou 'mes') como DataFrame, com as colunas da tabela
+
+    Para 'dia', desde/ate (YYYY-MM-DD, inclusivos) limitam o período pela chave primária.
+    """
+    import pandas as pd
+    if periodo == 'dia':
+        consulta = """SELECT * FROM agg_movimentacoes_diarias
+                      WHERE data_movimentacao >= ? AND data_movimentacao <= ?
+                      ORDER BY data_movimentacao, codigo_produto"""
+        return pd.read_sql_query(consulta, conectar(arquivo),
+                                 params=(desde or '0000-00-00', ate or '9999-99-99'))
+    consulta = "SELECT * FROM agg_movimentacoes_mensais ORDER BY ano, mes, codigo_produto"
+    return pd.read_sql_query(consulta, conectar(arquivo))
+
+
+def recalcular_estoque(con):
+    """Recalcula fato_estoque_atual inteira a partir das movimentações (manutenção)"""
+    with con:
+        con.execute("""
+            UPDATE fato_estoque_atual SET
+                total_entradas = (SELECT COALESCE(SUM(quantidade_movimento), 0)
+                                  FROM fato_movimentacoes m
+                                  WHERE m.codigo_produto = fato_estoque_atual.codigo_produto
+                                    AND m.quantidade_movimento > 0),
+                total_saidas = (SELECT COALESCE(-SUM(quantidade_movimento), 0)
+                                FROM fato_movimentacoes m
+                                WHERE m.codigo_produto = fato_estoque_atual.codigo_produto
+                                  AND m.quantidade_movimento < 0),
+                valor_total_entradas = (SELECT COALESCE(SUM(valor_total), 0)
+                                        FROM fato_movimentacoes m
+                                        WHERE m.codigo_produto = fato_estoque_atual.codigo_produto
+                                          AND m.quantidade_movimento > 0)
+        """)
+        con.execute("""
+            UPDATE fato_estoque_atual
+            SET saldo_atual = COALESCE(estoque_inicial, 0) + total_entradas - total_saidas
+        """)
+        con.execute(_ATUALIZAR_DERIVADOS)
+
+
+def _inserir_movimento(con, aba, dados):
+    """Grava uma linha de Entradas/Saídas em fato_movimentacoes (sem commit)"""
+    if aba == 'Entradas':
+        data, documento, codigo, qtd, valor = dados[:5]
+        valor_total = round(qtd * valor, 2) if valor is not None else None
+        tipo = 'Entrada'
+    elif aba == 'Saídas':
+        data, codigo, qtd, documento = dados[:4]
+        qtd, valor, valor_total = -qtd, None, None
+        tipo = 'Saída'
+    else:
+        raise ValueError(f"Aba '{aba}' não é de movimentação")
+
+    data_iso = _data_iso(data)
+    _registrar_tempo(con, data_iso)
+    agregado = {'codigo': codigo, 'qe': max(qtd, 0), 'qs': max(-qtd, 0),
+                've': valor_total or 0, 'ne': int(qtd > 0), 'ns': int(qtd < 0)}
+    cur = con.execute(
+        """INSERT INTO fato_movimentacoes
+           (data_movimentacao, codigo_produto, quantidade_movimento, tipo_movimentacao,
+            documento, valor_unitario, valor_total, ano, mes)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (data_iso, codigo, qtd, tipo, documento, valor, valor_total,
+         int(data_iso[:4]), int(data_iso[5:7]))
+    )
+    # Saldo atualizado na mesma transação: leitura O(1), sem somar o histórico
+    con.execute(_ATUALIZAR_SALDO, {'data': data_iso, 'qtd': qtd, 'valor': valor_total or 0,
+                                   'codigo': codigo})
+    con.execute(_ACUMULAR_DIA, {**agregado, 'data': data_iso})
+    con.execute(_ACUMULAR_MES, {**agregado, 'ano': int(data_iso[:4]), 'mes': int(data_iso[5:7])})
+    # Data retroativa: soma nos fechamentos mensais já gravados a partir desse mês
+    parametros = {'mes': data_iso[:7], 'qtd': qtd, 'codigo': codigo}
+    con.execute(_INCLUIR_NOS_FECHAMENTOS, parametros)
+    con.execute(_AJUSTAR_FECHAMENTOS, parametros)
+    con.execute(_ATUALIZAR_DERIVADOS + " WHERE codigo_produto = ?", (codigo,))
+    return cur.lastrowid
+
+
+def registrar_movimento(aba, dados, arquivo=None):
+    """Registra uma linha de Entradas/Saídas (mesmo formato de salvar_na_planilha)"""
+    return registrar_lote([(aba, dados)], arquivo)[0]
+
+
+def registrar_lote(movimentos, arquivo=None):
+    """Registra várias movimentações [(aba, dados), ...] em uma única transação"""
+    con = conectar(arquivo)
+    cruzamentos = []
+    mes_novo = _ha_mes_novo(con, movimentos)
+    with con:
+        ids = [_inserir_movimento(con, aba, dados) for aba, dados in movimentos]
+        if mes_novo:
+            _fechar_meses(con)  # na gravação: consultas de histórico só leem
+        if arquivo is None:
+            # Saldos lidos na própria transação: nenhuma outra gravação entre antes e depois
+            import alertas
+            cruzamentos = alertas.detectar(movimentos, ids)
+    if arquivo is None:
+        alertas.notificar(cruzamentos)
+    return ids
+
+
+def obter_saldo(codigo, arquivo=None):
+    """Saldo atual do produto (lido de fato_estoque_atual pela chave primária)"""
+    linha = conectar(arquivo).execute(
+        "SELECT saldo_atual FROM fato_estoque_atual WHERE codigo_produto = ?", (codigo,)
+    ).fetchone()
+    return linha[0] if linha else 0
+
+
+def obter_totais(codigo, arquivo=None):
+    """(total de entradas, total de saídas, saldo) do produto"""
+    linha = conectar(arquivo).execute(
+        """SELECT total_entradas, total_saidas, saldo_atual
+           FROM fato_estoque_atual WHERE codigo_produto = ?""", (codigo,)
+    ).fetchone()
+    return tuple(linha) if linha else (0, 0, 0)
+
+
+def obter_valores(codigo, arquivo=None):
+    """(quantidade comprada, valor comprado, custo médio de compra) do produto"""
+    linha = conectar(arquivo).execute(
+        """SELECT total_entradas, valor_total_entradas
+           FROM fato_estoque_atual WHERE codigo_produto = ?""", (codigo,)
+    ).fetchone()
+    quantidade, valor = linha if linha else (0, 0)
+    return quantidade, valor, round(valor / quantidade, 4) if quantidade else 0
+
+
+def _inicio_mes_seguinte(ano_mes):
+    """'2026-01' -> '2026-02-01' (None -> data anterior a qualquer movimentação)"""
+    if ano_mes is None:
+        return '0000-00-00'
+    ano, mes = int(ano_mes[:4]), int(ano_mes[5:7])
+    return f"{ano + mes // 12:04d}-{mes % 12 + 1:02d}-01"
+
+
+def _fechamento_anterior(con, ano_mes):
+    return con.execute("SELECT MAX(ano_mes) FROM fato_estoque_mensal WHERE ano_mes < ?",
+                       (ano_mes,)).fetchone()[0]
+
+
+def _ha_mes_novo(con, movimentos):
+    """Algum mês do lote ainda não tem movimentação no banco?
+
+    Só um mês novo encerra outro (ou, retroativo, precisa do próprio fechamento).
+    """
+    for mes in {_data_iso(dados[0])[:7] for _, dados in movimentos}:
+        if not con.execute("""SELECT 1 FROM dim_tempo
+                              WHERE data_completa >= ? AND data_completa < ? LIMIT 1""",
+                           (f"{mes}-01", _inicio_mes_seguinte(mes))).fetchone():
+            return True
+    return False
+
+
+def _fechar_meses(con):
+    """Grava, na transação em curso, os fechamentos mensais que faltam (sem commit)"""
+    meses = [m for (m,) in con.execute(
+        "SELECT DISTINCT substr(data_completa, 1, 7) FROM dim_tempo ORDER BY 1")]
+    fechados = {m for (m,) in con.execute("SELECT DISTINCT ano_mes FROM fato_estoque_mensal")}
+    pendentes = [m for m in meses[:-1] if m not in fechados]
+    for mes in pendentes:
+        anterior = _fechamento_anterior(con, mes)
+        con.execute(_FECHAR_MES, {'mes': mes, 'anterior': anterior,
+                                  'inicio': _inicio_mes_seguinte(anterior),
+                                  'fim': _inicio_mes_seguinte(mes)})
+    return len(pendentes)
+
+
+def fechar_meses(arquivo=None):
+    """Grava o fechamento dos meses já encerrados que ainda não têm um
+
+    Um mês está encerrado quando há movimentação em data posterior a ele.
+    Cada fechamento parte do anterior e soma só as movimentações do intervalo.
+    registrar_lote e importar_planilha já fecham os meses ao gravar; esta função
+    serve de manutenção (bancos gravados antes disso).
+    """
+    con = conectar(arquivo)
+    with con:
+        return _fechar_meses(con)
+
+
+def totais_em(data_iso, codigo=None, arquivo=None):
+    """Dicionário codigo -> [entradas, saídas] acumuladas até o fim do dia (YYYY-MM-DD)
+
+    Parte do fechamento mensal anterior e soma só as movimentações desde então.
+    Só leitura: não disputa a trava de escrita com quem registra movimentações
+    (sem o fechamento de um mês, a consulta parte de um fechamento anterior).
+    """
+    con = conectar(arquivo)
+    anterior = _fechamento_anterior(con, data_iso[:7])
+    cur = con.execute(
+        """SELECT codigo_produto, SUM(entradas), SUM(saidas) FROM (
+               SELECT codigo_produto, total_entradas AS entradas, total_saidas AS saidas
+               FROM fato_estoque_mensal
+               WHERE ano_mes = :anterior AND (:codigo IS NULL OR codigo_produto = :codigo)
+               UNION ALL
+               SELECT codigo_produto, MAX(quantidade_movimento, 0), MAX(-quantidade_movimento, 0)
+               FROM fato_movimentacoes
+               WHERE data_movimentacao >= :inicio AND data_movimentacao <= :dia
+                 AND (:codigo IS NULL OR codigo_produto = :codigo)
+           ) GROUP BY codigo_produto""",
+        {'anterior': anterior, 'inicio': _inicio_mes_seguinte(anterior), 'dia': data_iso,
+         'codigo': codigo}
+    )
+    return {c: [entradas, saidas] for c, entradas, saidas in cur}
+
+
+def listar_criticos(arquivo=None):
+    """Produtos abaixo do estoque mínimo (pelo índice de status_estoque)"""
+    cur = conectar(arquivo).execute(
+        """SELECT e.codigo_produto, p.nome_produto, e.saldo_atual, p.estoque_minimo,
+                  e.deficit_estoque
+           FROM fato_estoque_atual e JOIN dim_produtos p USING (codigo_produto)
+           WHERE e.status_estoque = 'Crítico' ORDER BY e.rowid"""
+    )
+    return [dict(zip(('codigo', 'nome', 'saldo', 'estoque_minimo', 'deficit'), linha))
+            for linha in cur]
+
+
+def importar_planilha(arquivo=None, arquivo_sqlite=None):
+    """Copia cadastro e movimentações da planilha/diário para um banco vazio"""
+    import openpyxl
+    import diario
+    arquivo = arquivo or CONFIG['arquivo_excel']
+    con = conectar(arquivo_sqlite)
+    if con.execute("SELECT COUNT(*) FROM dim_produtos").fetchone()[0]:
+        raise RuntimeError("O banco já possui produtos cadastrados")
+
+    wb = openpyxl.load_workbook(arquivo, read_only=True)
+    produtos = [linha[:len(COLUNAS_BASE)] for linha in wb['Base'].iter_rows(min_row=2, values_only=True)
+                if linha and linha[0] is not None]
+    iniciais = {}
+    if 'Estoque Atual' in wb.sheetnames:
+        for linha in wb['Estoque Atual'].iter_rows(min_row=2, max_col=2, values_only=True):
+            if linha and linha[0] is not None and isinstance(linha[1], (int, float)):
+                iniciais[linha[0]] = linha[1]
+
+    # O diário é o registro oficial; sem ele, usa as abas da planilha
+    if os.path.exists(CONFIG.get('arquivo_diario', 'movimentacoes.jsonl')):
+        movimentos = [(r['aba'], diario.linha_planilha(r)) for r, _ in diario.ler()]
+    else:
+        movimentos = [(aba, linha) for aba in diario.CAMPOS
+                      for linha in wb[aba].iter_rows(min_row=2, values_only=True)
+                      if linha and linha[0] is not None]
+    wb.close()
+
+    # Uma única transação: um erro no meio não deixa o banco importado pela metade
+    with con:
+        for produto in produtos:
+            _inserir_produto(con, *produto, estoque_inicial=iniciais.get(produto[0], 0))
+        for aba, dados in movimentos:
+            _inserir_movimento(con, aba, dados)
+        _fechar_meses(con)
+    return len(produtos), len(movimentos)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banco SQLite do controle de estoque")
+    parser.add_argument('--fechar-meses', action='store_true',
+                        help="grava os fechamentos mensais pendentes (manutenção)")
+    args = parser.parse_args()
+
+    if args.fechar_meses:
+        print(f"✅ {fechar_meses()} fechamento(s) mensal(is) gravado(s)")
+        raise SystemExit(0)
+
+    print("\n🔄 Importando planilha para o banco SQLite...")
+    try:
+        n_produtos, n_movimentos = importar_planilha()
+        print(f"✅ {n_produtos} produtos e {n_movimentos} movimentações importados "
+              f"para '{CONFIG.get('arquivo_sqlite', 'estoque.db')}'")
+        print("💡 Para usar o banco, defina 'backend': 'sqlite' em config.py")
+    except FileNotFoundError:
+        print(f"❌ Arquivo '{CONFIG['arquivo_excel']}' não encontrado!")
+    except (RuntimeError, ValueError, sqlite3.Error) as e:
+        print(f"❌ Erro ao importar: {e}")
@@ -0,0 +1,155 @@
+"""
+Benchmark da Exportação para BI - Controle de Estoque
+Mede a preparação do modelo estrela em um catálogo sintético grande
+
+Uso:
+    python3 benchmark_bi.py [--produtos 100000] [--movimentacoes 500000]
+
+Compara o cálculo de Status_Estoque/Deficit_Estoque linha a linha
+(DataFrame.apply, implementação anterior) com a função vetorizada de
+exportar_para_BI.py (_status_deficit), e confere que os resultados são iguais.
+Em seguida mede escrita, leitura e tamanho de fato_movimentacoes em CSV,
+Parquet e Feather (os dois últimos só com pyarrow instalado).
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from exportar_para_BI import (FORMATOS_BI, _adicionar_dimensoes_tempo, _exportar_tabela,
+                              _preparar_cadastro, _preparar_entradas, _preparar_saidas,
+                              _status_deficit)
+
+
+def gerar_catalogo(n, semente=42):
+    """Abas 'Base' e 'Estoque Atual' sintéticas com `n` produtos"""
+    rng = np.random.default_rng(semente)
+    codigos = [f"P{i:06d}" for i in range(1, n + 1)]
+    base = pd.DataFrame({
+        'Código': codigos,
+        'Nome do Produto': [f"Produto {i}" for i in range(1, n + 1)],
+        'Descrição': 'Item sintético',
+        'Tipo de Produto': rng.choice(['Fixação', 'Pintura', 'Acabamento', 'Adesivos'], n),
+        'Estoque Mínimo': rng.integers(0, 200, n),
+        'Valor Unitário (R$)': rng.integers(1, 50000, n) / 100,
+        'Fornecedor': rng.choice([f"Fornecedor {i}" for i in range(50)], n),
+        'Localização': rng.choice(['A1', 'A2', 'B1', 'B3', 'C2'], n),
+    })
+    entradas = rng.integers(0, 1000, n)
+    saidas = rng.integers(0, 800, n)
+    estoque = pd.DataFrame({
+        'Produto / Material': codigos,
+        'Estoque Inicial': 0,
+        'Total de Entradas': entradas,
+        'Total de Saídas': saidas,
+        'Saldo Atual': entradas - saidas,
+    })
+    return base, estoque
+
+
+def gerar_movimentacoes(n, codigos, semente=42):
+    """Tabela fato de movimentações sintética (metade entradas, metade saídas)"""
+    rng = np.random.default_rng(semente)
+    metade = n // 2
+    datas = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 730, n), unit='D')
+    datas = datas.strftime('%d/%m/%Y')
+    entradas = pd.DataFrame({
+        'Data da Entrada': datas[:metade],
+        'Documento (Nota Fiscal / Nº de Compra)': [f"NF-{i}" for i in range(metade)],
+        'Produto / Material': rng.choice(codigos, metade),
+        'Quantidade': rng.integers(1, 500, metade),
+        'Valor Unitário de Compra (R$)': rng.integers(1, 50000, metade) / 100,
+    })
+    saidas = pd.DataFrame({
+        'Data da Saída': datas[metade:],
+        'Produto / Material': rng.choice(codigos, n - metade),
+        'Quantidade Retirada': rng.integers(1, 100, n - metade),
+        'Motivo da Saída': rng.choice(['Uso em produção', 'Venda', 'Perda'], n - metade),
+    })
+    movimentacoes = pd.concat([_preparar_entradas(entradas), _preparar_saidas(saidas)],
+                              ignore_index=True)
+    return _adicionar_dimensoes_tempo(movimentacoes)
+
+
+def ler_tabela(arquivo, formato):
+    """Leitura como faria um consumidor (Feather por memory-map)"""
+    if formato == 'csv':
+        return pd.read_csv(arquivo, sep=';', decimal=',', encoding='utf-8-sig', low_memory=False)
+    if formato == 'parquet':
+        return pd.read_parquet(arquivo)
+    import pyarrow.feather as feather
+    return feather.read_table(arquivo, memory_map=True).to_pandas()
+
+
+def comparar_formatos(movimentacoes):
+    """Tempo de escrita/leitura e tamanho de cada formato de saída"""
+    try:
+        import pyarrow  # noqa: F401
+        formatos = list(FORMATOS_BI)
+    except ImportError:
+        print("⚠️  pyarrow não instalado: comparando apenas CSV")
+        formatos = ['csv']
+
+    print(f"\n{'Formato':<10} {'Escrita (ms)':>14} {'Leitura (ms)':>14} {'Tamanho (MB)':>14}")
+    print("-" * 56)
+    with tempfile.TemporaryDirectory() as pasta:
+        for formato in formatos:
+            arquivo = f"{pasta}/fato_movimentacoes.{FORMATOS_BI[formato]}"
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, t_escrita = cronometrar(_exportar_tabela, movimentacoes, pasta,
+                                           'fato_movimentacoes', formato)
+            _, t_leitura = cronometrar(ler_tabela, arquivo, formato)
+            tamanho = os.path.getsize(arquivo) / 1024 ** 2
+            print(f"{formato:<10} {t_escrita * 1000:>14.1f} {t_leitura * 1000:>14.1f} {tamanho:>14.2f}")
+
+
+def status_deficit_linha_a_linha(fato_estoque):
+    """Implementação anterior: uma chamada Python por produto"""
+    status = fato_estoque.apply(
+        lambda row: 'Crítico' if row['Saldo_Atual'] < row['Estoque_Minimo'] else 'Normal',
+        axis=1
+    )
+    deficit = fato_estoque.apply(
+        lambda row: max(0, row['Estoque_Minimo'] - row['Saldo_Atual']),
+        axis=1
+    )
+    return status, deficit
+
+
+def cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da preparação de dados para BI")
+    parser.add_argument('--produtos', type=int, default=100000, help="tamanho do catálogo sintético")
+    parser.add_argument('--movimentacoes', type=int, default=500000,
+                        help="linhas da tabela fato usada na comparação de formatos")
+    args = parser.parse_args()
+
+    print(f"\n🔄 Gerando catálogo sintético com {args.produtos:,} produtos...")
+    base, estoque = gerar_catalogo(args.produtos)
+
+    tabelas, t_total = cronometrar(_preparar_cadastro, base, estoque)
+    fato = tabelas['fato_estoque_atual']
+    (status, deficit), t_linhas = cronometrar(status_deficit_linha_a_linha, fato)
+    (status_vetor, deficit_vetor), t_vetor = cronometrar(_status_deficit, fato)
+
+    iguais = (status.tolist() == status_vetor.tolist() == fato['Status_Estoque'].tolist()
+              and deficit.tolist() == deficit_vetor.tolist() == fato['Deficit_Estoque'].tolist())
+
+    print(f"\n⏱️  Status/Déficit linha a linha (apply): {t_linhas * 1000:10.1f} ms")
+    print(f"⏱️  Status/Déficit vetorizado:            {t_vetor * 1000:10.1f} ms")
+    print(f"🚀 Ganho: {t_linhas / t_vetor:,.0f}x")
+    print(f"\n⏱️  Preparação completa (dimensões + fato): {t_total * 1000:.1f} ms")
+    print("✅ Resultados idênticos" if iguais else "❌ Resultados diferentes!")
+
+    print(f"\n🔄 Gerando {args.movimentacoes:,} movimentações sintéticas...")
+    comparar_formatos(gerar_movimentacoes(args.movimentacoes, base['Código'].to_numpy()))
@@ -0,0 +1,108 @@
+"""
+Benchmark de Inicialização - Controle de Estoque
+Mede o tempo até o primeiro prompt dos terminais de registro
+
+Uso:
+    python3 benchmark_inicio.py [--repeticoes 5] [--alvo 150]
+
+Para cada terminal (registrar_entrada.py, registrar_saida.py), abre o script
+em um processo novo e mede o tempo até aparecer o prompt 'Opção:' do menu.
+Com `python -X importtime`, lista os imports mais caros e avisa se alguma
+biblioteca pesada (pandas, openpyxl, matplotlib...) é carregada antes do menu.
+Por fim, mede a leitura do catálogo num processo novo (cache em disco).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Script -> opção do menu que encerra o terminal
+FERRAMENTAS = {'registrar_entrada.py': '4', 'registrar_saida.py': '3'}
+
+# Bibliotecas que não devem ser importadas só para mostrar o menu
+PESADAS = ('pandas', 'numpy', 'openpyxl', 'matplotlib', 'seaborn', 'pyarrow')
+
+PROMPT = 'Opção:'.encode('utf-8')
+
+
+def _ambiente():
+    # Sem terminal de verdade: 'clear' não tem o que limpar
+    return {**os.environ, 'TERM': os.environ.get('TERM', 'dumb'), 'PYTHONIOENCODING': 'utf-8'}
+
+
+def tempo_ate_prompt(script, saida):
+    """Segundos entre iniciar `script` e o prompt do menu aparecer"""
+    inicio = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-u', script], stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=_ambiente())
+    lido = b''
+    while PROMPT not in lido:
+        bloco = os.read(proc.stdout.fileno(), 4096)
+        if not bloco:
+            proc.wait()
+            raise RuntimeError(f"{script} terminou sem mostrar o menu")
+        lido += bloco
+    duracao = time.perf_counter() - inicio
+    proc.communicate(f"{saida}\n".encode())
+    return duracao
+
+
+def imports(modulo):
+    """[(cumulativo em ms, nível, nome), ...] dos imports feitos por `import modulo`
+
+    Lê o relatório de `python -X importtime`, em que cada import aparece depois
+    dos que ele provocou, recuado dois espaços por nível.
+    """
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                               capture_output=True, text=True, env=_ambiente())
+    linhas = []
+    for linha in reversed(resultado.stderr.splitlines()):
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, cumulativo, nome = linha.split('|')
+        nome = nome.rstrip()
+        nivel = (len(nome) - len(nome.lstrip()) - 1) // 2
+        if nivel == 0 and linhas:
+            break  # fim dos imports do módulo
+        if linhas or nome.strip() == modulo:
+            linhas.append((int(cumulativo) / 1000, nivel, nome.strip()))
+    return linhas
+
+
+def tempo_catalogo():
+    """Segundos para ler o catálogo num processo novo, e se pandas foi importado"""
+    codigo = ("import sys, time; t = time.perf_counter(); import utils; "
+              "p = utils.carregar_catalogo(); "
+              "print(time.perf_counter() - t, len(p or {}), 'pandas' in sys.modules)")
+    saida = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True,
+                           env=_ambiente()).stdout.split()
+    return float(saida[-3]), int(saida[-2]), saida[-1] == 'True'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização dos terminais")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--alvo', type=float, default=150, help="tempo máximo até o menu (ms)")
+    args = parser.parse_args()
+
+    print(f"\n⏱️  Tempo até o primeiro prompt (mediana de {args.repeticoes}, alvo {args.alvo:.0f} ms)\n")
+    for script, saida in FERRAMENTAS.items():
+        tempos = [tempo_ate_prompt(script, saida) * 1000 for _ in range(args.repeticoes)]
+        mediana = statistics.median(tempos)
+        marca = '✅' if mediana <= args.alvo else '⚠️ '
+        print(f"{marca} {script:<22} {mediana:>7.1f} ms   (mín. {min(tempos):.1f} ms)")
+
+        linhas = imports(script[:-3])
+        diretos = sorted((ms, nome) for ms, nivel, nome in linhas if nivel == 1)[::-1]
+        print(f"     imports: {linhas[0][0]:.1f} ms; mais caros: "
+              + ", ".join(f"{nome} {ms:.1f} ms" for ms, nome in diretos[:5]))
+        carregadas = sorted({nome.split('.')[0] for _, _, nome in linhas} & set(PESADAS))
+        if carregadas:
+            print(f"     ⚠️  carrega {', '.join(carregadas)} antes do menu")
+
+    tempo_catalogo()  # monta o cache em disco, se ainda não existir
+    segundos, produtos, com_pandas = tempo_catalogo()
+    print(f"\n📦 Catálogo num processo novo: {produtos} produtos em {segundos * 1000:.1f} ms"
+          f"{' (importou pandas)' if com_pandas else ' (cache em disco, sem pandas)'}\n")
@@ -0,0 +1,202 @@
+"""
+Busca de Produtos - Controle de Estoque
+Índice de trigramas sobre código, nome, descrição e fornecedor do cadastro
+
+Uso:
+    python3 busca.py parafuso sextavado [--limite 10]
+
+Os textos são normalizados (minúsculas, sem acentos) e cada palavra é indexada
+pelos seus trigramas, com dois espaços antes: 'pa' e 'par' casam com o início
+de 'parafuso', e um erro de digitação ainda deixa a maioria dos trigramas em
+comum. Cada trigrama aponta para os produtos que o contêm (array compacto), e
+uma busca só percorre as listas dos trigramas da consulta.
+
+Trigramas presentes em boa parte do cadastro (o 'p' inicial de todos os
+códigos P001, P002...) não distinguem produtos e ficam fora da contagem,
+a menos que a consulta só tenha trigramas assim.
+
+O índice é montado a partir do catálogo (catalogo.py) e guardado em disco
+('indices/busca.pkl') até o cadastro mudar; um produto novo
+(catalogo.adicionar) entra no índice sem reconstruí-lo.
+"""
+import argparse
+import os
+import pickle
+import re
+import time
+import unicodedata
+from array import array
+
+import catalogo
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'pasta_indices': 'indices'}
+
+ARQUIVO_CACHE = 'busca.pkl'
+
+# Peso de cada campo no ranking (o código vale mais que o nome, que vale mais que a descrição)
+CAMPOS = (('codigo', 4), ('nome', 3), ('fornecedor', 2), ('descricao', 1))
+PESOS = tuple(peso for _, peso in CAMPOS)
+
+# Fração mínima dos trigramas da consulta que um produto precisa conter
+COBERTURA_MINIMA = 0.6
+
+# Trigramas presentes em mais que esta fração dos produtos são ignorados na busca
+FRACAO_COMUM = 0.5
+
+_NAO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+# Estado: catálogo indexado, produtos por posição e trigrama -> array de (posição << 2 | campo)
+_indice = {'produtos': None, 'tamanho': 0, 'lista': [], 'gramas': {}}
+
+
+def normalizar(texto):
+    """Texto em minúsculas, sem acentos, só letras e dígitos separados por espaço"""
+    if texto is None:
+        return ''
+    sem_acento = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode()
+    return _NAO_ALFANUMERICO.sub(' ', sem_acento.lower()).strip()
+
+
+def trigramas(palavra):
+    """Trigramas de uma palavra normalizada, com dois espaços antes (prefixos curtos casam)"""
+    marcada = '  ' + palavra
+    return {marcada[i:i + 3] for i in range(len(palavra))}
+
+
+def _indexar(produto):
+    """Inclui um produto no índice (cada trigrama conta uma vez, pelo campo de maior peso)"""
+    posicao = len(_indice['lista'])
+    _indice['lista'].append(produto)
+    melhores = {}
+    for campo, (atributo, _) in enumerate(CAMPOS):
+        for palavra in normalizar(getattr(produto, atributo)).split():
+            for grama in trigramas(palavra):
+                if grama not in melhores:  # CAMPOS em ordem decrescente de peso
+                    melhores[grama] = campo
+    gramas = _indice['gramas']
+    for grama, campo in melhores.items():
+        lista = gramas.get(grama)
+        if lista is None:
+            lista = gramas[grama] = array('I')
+        lista.append(posicao << 2 | campo)
+
+
+def _arquivo_cache():
+    return os.path.join(CONFIG.get('pasta_indices', 'indices'), ARQUIVO_CACHE)
+
+
+def _ler_cache_disco(produtos):
+    """Índice gravado por outro processo, se foi montado com este mesmo cadastro"""
+    try:
+        with open(_arquivo_cache(), 'rb') as f:
+            dados = pickle.load(f)
+        if dados['impressao'] == catalogo.impressao_digital() and len(dados['codigos']) == len(produtos):
+            return [produtos[codigo] for codigo in dados['codigos']], dados['gramas']
+    except Exception:
+        pass  # ausente, corrompido ou gravado por outra versão: índice é remontado
+    return None
+
+
+def _gravar_cache_disco():
+    arquivo = _arquivo_cache()
+    try:
+        os.makedirs(os.path.dirname(arquivo) or '.', exist_ok=True)
+        temporario = f"{arquivo}.{os.getpid()}.tmp"  # processos simultâneos não colidem
+        with open(temporario, 'wb') as f:
+            pickle.dump({'impressao': catalogo.impressao_digital(),
+                         'codigos': [p.codigo for p in _indice['lista']],
+                         'gramas': _indice['gramas']}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, arquivo)
+    except OSError:
+        pass  # cache em disco é opcional
+
+
+def construir(produtos=None):
+    """Monta o índice do zero a partir do catálogo"""
+    produtos = catalogo.obter_catalogo() if produtos is None else produtos
+    _indice.update(produtos=produtos, lista=[], gramas={})
+    for produto in produtos.values():
+        _indexar(produto)
+    _indice['tamanho'] = len(produtos)
+
+
+def _atualizar():
+    """Carrega ou reconstrói o índice se o catálogo foi recarregado; inclui produtos novos"""
+    produtos = catalogo.obter_catalogo()
+    if produtos is not _indice['produtos'] or len(produtos) < _indice['tamanho']:
+        gravado = _ler_cache_disco(produtos)
+        if gravado is None:
+            construir(produtos)
+            _gravar_cache_disco()
+        else:
+            _indice.update(produtos=produtos, tamanho=len(produtos),
+                           lista=gravado[0], gramas=gravado[1])
+    elif len(produtos) > _indice['tamanho']:
+        # Produtos incluídos no mesmo catálogo (catalogo.adicionar): entram no fim
+        for produto in list(produtos.values())[_indice['tamanho']:]:
+            _indexar(produto)
+        _indice['tamanho'] = len(produtos)
+        _gravar_cache_disco()
+
+
+def adicionar(produto):
+    """Inclui um produto recém-cadastrado no índice, se ele já estiver montado"""
+    if _indice['produtos'] is not None and _indice['produtos'].get(produto.codigo) is produto:
+        if len(_indice['produtos']) > _indice['tamanho']:
+            _indexar(produto)
+            _indice['tamanho'] += 1
+            _gravar_cache_disco()
+
+
+def buscar(texto, limite=10):
+    """Produtos mais parecidos com `texto`: [(Produto, pontuação 0-1), ...] em ordem decrescente"""
+    _atualizar()
+    consulta = set()
+    for palavra in normalizar(texto).split():
+        consulta |= trigramas(palavra)
+    if not consulta:
+        return []
+
+    gramas = _indice['gramas']
+    comum = FRACAO_COMUM * _indice['tamanho']
+    distintivos = {g for g in consulta if len(gramas.get(g, ())) <= comum}
+    consulta = distintivos or consulta
+
+    # Um único acumulador por produto: trigramas encontrados << 16 | soma dos pesos
+    acumulado = {}
+    somar = [(1 << 16) + peso for peso in PESOS]
+    for grama in consulta:
+        for valor in gramas.get(grama, ()):
+            posicao = valor >> 2
+            acumulado[posicao] = acumulado.get(posicao, 0) + somar[valor & 3]
+
+    minimo = int(COBERTURA_MINIMA * len(consulta) + 0.999) << 16
+    maximo = PESOS[0] * len(consulta)
+    lista = _indice['lista']
+    candidatos = [((a >> 16) / len(consulta), (a & 0xFFFF) / maximo, p)
+                  for p, a in acumulado.items() if a >= minimo]
+    candidatos.sort(key=lambda c: (-c[0], -c[1], str(lista[c[2]].codigo)))
+    return [(lista[p], round((cobertura + peso) / 2, 3)) for cobertura, peso, p in candidatos[:limite]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca produtos por código, nome, descrição ou fornecedor")
+    parser.add_argument('termos', nargs='+', help="texto a buscar")
+    parser.add_argument('--limite', type=int, default=10)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    _atualizar()
+    montagem = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    resultados = buscar(' '.join(args.termos), args.limite)
+    duracao = time.perf_counter() - inicio
+
+    print(f"\n🔎 '{' '.join(args.termos)}': {len(resultados)} resultado(s) em {duracao * 1000:.1f} ms "
+          f"(índice de {_indice['tamanho']} produtos montado em {montagem * 1000:.0f} ms)\n")
+    for produto, pontuacao in resultados:
+        print(f"  {produto.codigo:<10} {str(produto.nome)[:35]:<35} {str(produto.fornecedor)[:20]:<20} {pontuacao:.2f}")
+    print()
@@ -0,0 +1,192 @@
+"""
+Catálogo de Produtos em Memória - Controle de Estoque
+Cache do cadastro ('Base' ou dim_produtos) indexado pelo código do produto
+
+O cadastro é lido uma vez e só é recarregado quando o arquivo de origem muda
+(mtime ou tamanho). Consultas por código são buscas em dicionário, O(1).
+
+Além da memória, o catálogo fica em disco ('indices/catalogo.json', JSON puro):
+um processo novo (um terminal de registro, por exemplo) o lê em milissegundos,
+sem importar pandas nem openpyxl, enquanto a origem não mudar.
+
+Junto com o cadastro vem o 'Estoque Inicial' de cada produto (coluna B da aba
+'Estoque Atual', ou fato_estoque_atual no SQLite), que o diário não registra:
+os saldos somam esse valor às entradas e saídas.
+"""
+import json
+import os
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'arquivo_excel': 'Controle_Estoque.xlsx', 'pasta_indices': 'indices'}
+
+ARQUIVO_CACHE = 'catalogo.json'
+
+# Colunas da aba 'Base', na ordem da planilha
+COLUNAS = ('Código', 'Nome do Produto', 'Descrição', 'Tipo de Produto',
+           'Estoque Mínimo', 'Valor Unitário (R$)', 'Fornecedor', 'Localização')
+
+
+class Produto:
+    """Registro compacto de um produto do cadastro"""
+    __slots__ = ('codigo', 'nome', 'descricao', 'categoria', 'estoque_minimo',
+                 'valor_unitario', 'fornecedor', 'localizacao')
+
+    def __init__(self, codigo, nome, descricao, categoria, estoque_minimo,
+                 valor_unitario, fornecedor, localizacao):
+        self.codigo = codigo
+        self.nome = nome
+        self.descricao = descricao
+        self.categoria = categoria
+        self.estoque_minimo = estoque_minimo
+        self.valor_unitario = valor_unitario
+        self.fornecedor = fornecedor
+        self.localizacao = localizacao
+
+    def valores(self):
+        """Valores na ordem das colunas da aba 'Base'"""
+        return tuple(getattr(self, campo) for campo in self.__slots__)
+
+    def __repr__(self):
+        return f"Produto({self.codigo!r}, {self.nome!r})"
+
+
+# Estado do cache: impressão digital da origem, produtos por código (ordem do cadastro)
+# e estoque inicial por código
+_cache = {'impressao': None, 'produtos': {}, 'iniciais': {}}
+
+
+def _arquivos_origem():
+    if CONFIG.get('backend') == 'sqlite':
+        banco = CONFIG.get('arquivo_sqlite', 'estoque.db')
+        return (banco, banco + '-wal')
+    return (CONFIG['arquivo_excel'],)
+
+
+def impressao_digital():
+    """(mtime, tamanho) dos arquivos de origem; muda sempre que o cadastro é gravado"""
+    digital = []
+    for arquivo in _arquivos_origem():
+        try:
+            st = os.stat(arquivo)
+            digital.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            digital.append(None)
+    return tuple(digital)
+
+
+def _numero(valor):
+    return valor if isinstance(valor, (int, float)) and valor == valor else 0
+
+
+def _ler_origem():
+    """Lê o cadastro completo e o estoque inicial da origem configurada"""
+    if CONFIG.get('backend') == 'sqlite':
+        import banco_sqlite
+        con = banco_sqlite.conectar()
+        cur = con.execute(
+            f"SELECT {', '.join(banco_sqlite.COLUNAS_BASE.values())} FROM dim_produtos ORDER BY rowid"
+        )
+        produtos = [Produto(*linha) for linha in cur]
+        iniciais = {codigo: _numero(inicial) for codigo, inicial in con.execute(
+            "SELECT codigo_produto, estoque_inicial FROM fato_estoque_atual")}
+        return produtos, iniciais
+
+    import planilha
+    arquivo = CONFIG['arquivo_excel']
+    try:
+        abas = planilha.carregar(arquivo, ['Base', 'Estoque Atual'])
+    except KeyError:
+        abas = planilha.carregar(arquivo, ['Base'])  # planilha sem a aba 'Estoque Atual'
+    base = abas['Base'].iloc[:, :len(COLUNAS)]
+    base = base.astype(object).where(base.notna(), None)
+    produtos = [Produto(*linha) for linha in base.itertuples(index=False) if linha[0] is not None]
+    iniciais = {}
+    if 'Estoque Atual' in abas:
+        for codigo, inicial in abas['Estoque Atual'].iloc[:, :2].itertuples(index=False):
+            if codigo is not None and codigo == codigo and _numero(inicial):
+                iniciais[codigo] = _numero(inicial)
+    return produtos, iniciais
+
+
+def _arquivo_cache():
+    return os.path.join(CONFIG.get('pasta_indices', 'indices'), ARQUIVO_CACHE)
+
+
+def _ler_cache_disco(impressao):
+    """Produtos gravados em disco por outro processo, se a origem não mudou desde então"""
+    try:
+        with open(_arquivo_cache(), encoding='utf-8') as f:
+            dados = json.load(f)
+        if (dados['origem'] == [os.path.abspath(a) for a in _arquivos_origem()]
+                and [tuple(d) if d else None for d in dados['impressao']] == list(impressao)):
+            return [Produto(*valores) for valores in dados['produtos']], dados['iniciais']
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _gravar_cache_disco():
+    arquivo = _arquivo_cache()
+    try:
+        os.makedirs(os.path.dirname(arquivo) or '.', exist_ok=True)
+        temporario = f"{arquivo}.{os.getpid()}.tmp"  # processos simultâneos não colidem
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({'origem': [os.path.abspath(a) for a in _arquivos_origem()],
+                       'impressao': _cache['impressao'],
+                       'produtos': [p.valores() for p in _cache['produtos'].values()],
+                       'iniciais': _cache['iniciais']},
+                      f, ensure_ascii=False, default=str)
+        os.replace(temporario, arquivo)
+    except OSError:
+        pass  # cache em disco é opcional
+
+
+def obter_catalogo():
+    """Dicionário codigo -> Produto, recarregado só se a origem tiver mudado"""
+    impressao = impressao_digital()
+    if impressao != _cache['impressao']:
+        lido = _ler_cache_disco(impressao)
+        lido_da_origem = lido is None
+        if lido_da_origem:
+            lido = _ler_origem()
+        produtos, iniciais = lido
+        _cache['produtos'] = {p.codigo: p for p in produtos}
+        _cache['iniciais'] = iniciais
+        _cache['impressao'] = impressao
+        if lido_da_origem:
+            _gravar_cache_disco()
+    return _cache['produtos']
+
+
+def estoques_iniciais():
+    """Dicionário codigo -> 'Estoque Inicial' (só os produtos com valor diferente de zero)"""
+    obter_catalogo()
+    return _cache['iniciais']
+
+
+def estoque_inicial(codigo):
+    """'Estoque Inicial' do produto (0 se não houver)"""
+    return estoques_iniciais().get(codigo, 0)
+
+
+def buscar(codigo):
+    """Produto com o código informado, ou None"""
+    return obter_catalogo().get(codigo)
+
+
+def adicionar(produto):
+    """Inclui no cache um produto recém-gravado na origem, sem reler o cadastro"""
+    produtos = obter_catalogo() if _cache['impressao'] is None else _cache['produtos']
+    produtos[produto.codigo] = produto
+    _cache['impressao'] = impressao_digital()
+    _gravar_cache_disco()
+    import busca
+    busca.adicionar(produto)  # índice de busca, se já montado, sem reconstruir
+
+
+def para_dataframe():
+    """Catálogo como DataFrame com as colunas da aba 'Base'"""
+    import pandas as pd
+    return pd.DataFrame([p.valores() for p in obter_catalogo().values()], columns=list(COLUNAS))
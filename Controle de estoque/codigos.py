@@ -0,0 +1,124 @@
+"""
+Códigos de Produto - Controle de Estoque
+Próximo código livre (P001, P002...) em tempo constante, sem varrer o cadastro
+
+Uso:
+    python3 codigos.py [--reservar N] [--prefixo P]
+
+O último número usado de cada prefixo fica em 'indices/codigos.json'. Cada
+alocação trava esse arquivo, incrementa o número e grava (escrita atômica):
+dois terminais cadastrando ao mesmo tempo nunca recebem o mesmo código, e o
+custo não depende do tamanho do cadastro. O cadastro só é percorrido uma vez,
+na primeira alocação de um prefixo, para continuar a partir do maior código
+existente. Um código já cadastrado (digitado à mão na planilha) é pulado.
+
+Prefixo e largura mínima vêm de CONFIG['prefixo_codigo'] e
+CONFIG['largura_codigo']; passado o limite da largura, o número apenas cresce
+(P999, P1000...). Importações em lote reservam um bloco de códigos de uma vez.
+"""
+import argparse
+import json
+import os
+import re
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'pasta_indices': 'indices', 'prefixo_codigo': 'P', 'largura_codigo': 3}
+
+ARQUIVO = 'codigos.json'
+
+
+def _arquivo():
+    return os.path.join(CONFIG.get('pasta_indices', 'indices'), ARQUIVO)
+
+
+def _prefixo(prefixo):
+    return CONFIG.get('prefixo_codigo', 'P') if prefixo is None else prefixo
+
+
+def formatar(numero, prefixo=None):
+    """Código do produto para um número: formatar(7) -> 'P007'"""
+    return f"{_prefixo(prefixo)}{numero:0{CONFIG.get('largura_codigo', 3)}d}"
+
+
+def _ler(arquivo):
+    """Dicionário prefixo -> último número alocado"""
+    try:
+        with open(arquivo, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _gravar(arquivo, ultimos):
+    temporario = f"{arquivo}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(ultimos, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, arquivo)
+
+
+def _maior_no_cadastro(prefixo, cadastrados):
+    """Maior número entre os códigos '<prefixo><dígitos>' do cadastro (0 se não houver)"""
+    padrao = re.compile(re.escape(prefixo) + r'(\d+)$')
+    numeros = [int(m.group(1)) for m in map(padrao.match, map(str, cadastrados)) if m]
+    return max(numeros, default=0)
+
+
+def reservar(quantidade=1, prefixo=None):
+    """Aloca `quantidade` códigos novos (lista, em ordem) com uma única gravação
+
+    Levanta TimeoutError se outro processo segurar a trava além do tempo limite.
+    """
+    import catalogo
+    import travas
+    prefixo = _prefixo(prefixo)
+    cadastrados = catalogo.obter_catalogo()
+    arquivo = _arquivo()
+    os.makedirs(os.path.dirname(arquivo) or '.', exist_ok=True)
+
+    with travas.travar(arquivo):
+        ultimos = _ler(arquivo)
+        ultimo = ultimos.get(prefixo)
+        if ultimo is None:
+            ultimo = _maior_no_cadastro(prefixo, cadastrados)  # só na primeira vez do prefixo
+        codigos = []
+        while len(codigos) < quantidade:
+            ultimo += 1
+            codigo = formatar(ultimo, prefixo)
+            if codigo not in cadastrados:
+                codigos.append(codigo)
+        ultimos[prefixo] = ultimo
+        _gravar(arquivo, ultimos)
+    return codigos
+
+
+def proximo(prefixo=None):
+    """Aloca e retorna um código novo"""
+    return reservar(1, prefixo)[0]
+
+
+def ultimo_alocado(prefixo=None):
+    """Último número alocado do prefixo (None se nenhum código foi alocado ainda)"""
+    return _ler(_arquivo()).get(_prefixo(prefixo))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alocação de códigos de produto")
+    parser.add_argument('--reservar', type=int, default=0,
+                        help="aloca N códigos de uma vez (para importações em lote)")
+    parser.add_argument('--prefixo', help=f"prefixo dos códigos (padrão: {_prefixo(None)})")
+    args = parser.parse_args()
+
+    if args.reservar > 0:
+        codigos = reservar(args.reservar, args.prefixo)
+        print(f"\n✅ {len(codigos)} código(s) reservado(s): {codigos[0]} a {codigos[-1]}\n")
+    else:
+        ultimo = ultimo_alocado(args.prefixo)
+        if ultimo is None:
+            print(f"\n🏷️  Prefixo '{_prefixo(args.prefixo)}': nenhum código alocado ainda "
+                  "(a primeira alocação continua do maior código cadastrado)\n")
+        else:
+            print(f"\n🏷️  Prefixo '{_prefixo(args.prefixo)}': último alocado {formatar(ultimo, args.prefixo)}\n")
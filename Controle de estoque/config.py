@@ -4,14 +4,64 @@ Configurações centralizadas do sistema de controle de estoque
 
 # Configurações de arquivos
 CONFIG = {
+    # Armazenamento: 'excel' (planilha + diário) ou 'sqlite' (banco_sqlite.py)
+    'backend': 'excel',
+    'arquivo_sqlite': 'estoque.db',
+    
     # Arquivos principais
     'arquivo_excel': 'Controle_Estoque.xlsx',
     'arquivo_dashboard': 'dashboard_estoque.png',
     'arquivo_sql': 'modelo_estrela.sql',
+    'arquivo_diario': 'movimentacoes.jsonl',  # Registro oficial das movimentações
     
     # Pastas
     'pasta_csv': 'dados_csv',
     'pasta_power_bi': 'dados_power_bi',
+    'pasta_indices': 'indices',  # Checkpoints dos saldos e demais projeções do diário
+    'pasta_dashboards': 'dashboards',  # Dashboards por categoria/localização (analise_dashboard.py)
+    
+    # Vários terminais: espera máxima (s) por uma trava de arquivo ou pelo banco SQLite
+    'tempo_limite_trava': 30,
+    
+    # Códigos de produto gerados automaticamente (codigos.py): prefixo e largura mínima do número
+    'prefixo_codigo': 'P',
+    'largura_codigo': 3,
+    
+    # Listagem de produtos nos terminais: linhas por página
+    'itens_por_pagina': 50,
+    
+    # Reposição (reposicao.py): janela de consumo, prazo de entrega e cobertura desejada (dias)
+    'janela_consumo_dias': 90,
+    'prazo_entrega_dias': 7,
+    'prazo_entrega_fornecedor': {},  # fornecedor -> prazo próprio, ex.: {'Tintas Color': 15}
+    'dias_cobertura_alvo': 30,
+    'nivel_servico_z': 1.65,  # estoque de segurança: 1.65 ≈ 95% de atendimento no prazo
+    
+    # Alertas de estoque abaixo do mínimo (alertas.py), verificados a cada movimentação
+    'alertas_ativos': True,
+    'saidas_alerta': ['log', 'outbox'],  # também: 'webhook'
+    'arquivo_log_alertas': 'alertas.log',
+    'arquivo_outbox_alertas': 'alertas.db',
+    'alerta_webhook_url': 'http://127.0.0.1:8767/alertas',
+    'intervalo_repeticao_alerta': 3600,  # s até repetir o mesmo tipo de alerta de um produto
+    'alertas_por_minuto': 30,
+    
+    # Serviço HTTP/JSON (servico.py)
+    'servico_host': '127.0.0.1',
+    'servico_porta': 8765,
+    'servico_threads': 8,
+    
+    # Ingestão de leituras (ingestao.py): porta TCP padrão e maior lote por gravação
+    'ingestao_porta': 8766,
+    'ingestao_lote_maximo': 500,
+    
+    # Projeções do diário: regrava o checkpoint a cada N movimentações aplicadas
+    'intervalo_checkpoint': 1000,
+    
+    # Exportação para BI: 'csv' (padrão), 'parquet' ou 'feather' (estes exigem pyarrow)
+    'formato_bi': 'csv',
+    # Exportação para BI em blocos (--blocos): linhas de movimentação por bloco
+    'bi_tamanho_bloco': 50000,
     
     # Encoding e formatação
     'encoding': 'utf-8-sig',
@@ -21,5 +71,11 @@ CONFIG = {
     # Gráficos
     'dpi_dashboard': 300,
     'estilo_grafico': 'seaborn-v0_8-darkgrid',
-    'paleta_cores': 'husl'
+    'paleta_cores': 'husl',
+    # Máximo de itens por gráfico do dashboard (None = todos)
+    'top_dashboard': 20,
+    # Processos que desenham os dashboards por grupo (None = um por CPU)
+    'processos_dashboard': None,
+    # Imagens do cache de dashboards não usadas há mais de N dias são apagadas
+    'dias_cache_figuras': 30
 }
@@ -0,0 +1,161 @@
+"""
+Custos de Estoque - Controle de Estoque
+Custo médio ponderado móvel e camadas FIFO por produto, a partir das movimentações
+
+O custo vem dos valores unitários de compra das entradas, não do valor do
+cadastro. Cada movimentação atualiza o estado do produto em O(1) (custo médio)
+e O(camadas consumidas) no FIFO, amortizado O(1) por entrada. Com o backend
+Excel, o estado é uma projeção do diário (projecoes.py, checkpoint em
+'indices/custos.json'); com o SQLite, é mantido em memória a partir de
+fato_movimentacoes, lendo só as linhas novas a cada consulta.
+
+A ordem de aplicação é a ordem de registro das movimentações.
+"""
+import projecoes
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'backend': 'excel', 'arquivo_excel': 'Controle_Estoque.xlsx'}
+
+NOME = 'custos'
+
+# Camadas FIFO já consumidas no início da lista antes de compactá-la
+_COMPACTAR_APOS = 64
+
+# Estado do backend SQLite: último id_movimentacao aplicado e estado por produto
+_sqlite = {'arquivo': None, 'id': 0, 'estado': {}}
+
+
+def _novo_produto():
+    # quantidade: saldo das movimentações; falta: saídas sem camada FIFO para consumir
+    return {'quantidade': 0, 'custo_medio': 0.0, 'valor_fifo': 0.0, 'falta': 0,
+            'camadas': [], 'inicio': 0}
+
+
+def _custo_unitario(registro):
+    valor = registro.get('valor_unitario')
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return valor
+    total = registro.get('valor_total')
+    if isinstance(total, (int, float)) and registro['quantidade']:
+        return total / registro['quantidade']
+    return 0.0
+
+
+def aplicar(estado, registro):
+    """Atualiza custo médio e camadas FIFO do produto com uma movimentação"""
+    p = estado.get(registro['codigo'])
+    if p is None:
+        p = estado[registro['codigo']] = _novo_produto()
+    quantidade = registro['quantidade']
+
+    if registro['aba'] == 'Entradas':
+        custo = _custo_unitario(registro)
+        anterior = p['quantidade']
+        p['quantidade'] += quantidade
+        if anterior <= 0 or p['quantidade'] <= 0:
+            p['custo_medio'] = custo  # sem saldo anterior com custo: vale o da compra
+        else:
+            p['custo_medio'] = (anterior * p['custo_medio'] + quantidade * custo) / p['quantidade']
+
+        # Saídas a descoberto são cobertas primeiro; o resto vira uma nova camada
+        coberta = min(p['falta'], quantidade)
+        p['falta'] -= coberta
+        if quantidade > coberta:
+            p['camadas'].append([quantidade - coberta, custo])
+            p['valor_fifo'] += (quantidade - coberta) * custo
+        return
+
+    p['quantidade'] -= quantidade
+    camadas = p['camadas']
+    while quantidade and p['inicio'] < len(camadas):
+        camada = camadas[p['inicio']]
+        retirada = min(quantidade, camada[0])
+        camada[0] -= retirada
+        p['valor_fifo'] -= retirada * camada[1]
+        quantidade -= retirada
+        if not camada[0]:
+            p['inicio'] += 1
+    p['falta'] += quantidade
+    if p['inicio'] >= len(camadas):
+        camadas.clear()
+        p['inicio'], p['valor_fifo'] = 0, 0.0  # sem camadas: zera o resíduo de arredondamento
+    elif p['inicio'] >= _COMPACTAR_APOS and p['inicio'] * 2 >= len(camadas):
+        del camadas[:p['inicio']]
+        p['inicio'] = 0
+
+
+def _carregar_sqlite():
+    import banco_sqlite
+    arquivo = CONFIG.get('arquivo_sqlite', 'estoque.db')
+    if _sqlite['arquivo'] != arquivo:
+        _sqlite.update(arquivo=arquivo, id=0, estado={})
+    cur = banco_sqlite.conectar(arquivo).execute(
+        """SELECT id_movimentacao, codigo_produto, quantidade_movimento,
+                  valor_unitario, valor_total
+           FROM fato_movimentacoes WHERE id_movimentacao > ? ORDER BY id_movimentacao""",
+        (_sqlite['id'],)
+    )
+    for id_mov, codigo, quantidade, valor, total in cur:
+        aplicar(_sqlite['estado'], {
+            'aba': 'Entradas' if quantidade > 0 else 'Saídas', 'codigo': codigo,
+            'quantidade': abs(quantidade), 'valor_unitario': valor, 'valor_total': total})
+        _sqlite['id'] = id_mov
+    return _sqlite['estado']
+
+
+def carregar():
+    """Dicionário codigo -> estado de custo, em dia com as movimentações"""
+    if CONFIG.get('backend') == 'sqlite':
+        return _carregar_sqlite()
+    import diario
+    diario.importar_planilha()  # planilhas anteriores ao diário: histórico passa a ser contado
+    return projecoes.atualizar(NOME, aplicar)
+
+
+def avaliar(codigo):
+    """Quantidade, custo médio e valor do produto pelos dois métodos"""
+    p = carregar().get(codigo) or _novo_produto()
+    return {'quantidade': p['quantidade'], 'custo_medio': round(p['custo_medio'], 4),
+            'valor_medio': round(p['quantidade'] * p['custo_medio'], 2),
+            'valor_fifo': round(p['valor_fifo'], 2)}
+
+
+def avaliar_estoque(saldos=None, precos=None):
+    """Valor total do estoque: {'medio': R$, 'fifo': R$, 'sem_custo': quantidade}
+
+    saldos: codigo -> saldo atual, quando ele inclui quantidades que não passaram
+    pelas movimentações (o 'Estoque Inicial' da planilha). Essa diferença não tem
+    custo de compra e é avaliada por `precos` (codigo -> valor do cadastro).
+    """
+    estado = carregar()
+    precos = precos or {}
+    total = {'medio': 0.0, 'fifo': 0.0, 'sem_custo': 0}
+    for codigo in (estado if saldos is None else saldos):
+        p = estado.get(codigo) or _novo_produto()
+        total['medio'] += p['quantidade'] * p['custo_medio']
+        total['fifo'] += p['valor_fifo']
+        if saldos is not None:
+            diferenca = (saldos[codigo] or 0) - p['quantidade']
+            if diferenca:
+                preco = precos.get(codigo) or 0
+                total['medio'] += diferenca * preco
+                total['fifo'] += diferenca * preco
+                total['sem_custo'] += diferenca
+    total['medio'], total['fifo'] = round(total['medio'], 2), round(total['fifo'], 2)
+    return total
+
+
+if __name__ == "__main__":
+    import catalogo
+    print("\n💰 Valorização do estoque pelo custo de compra\n")
+    print(f"{'Cód':<8} {'Nome':<30} {'Qtd':>8} {'Custo Médio':>12} {'Valor (Médio)':>14} {'Valor (FIFO)':>14}")
+    print("-" * 90)
+    for codigo, produto in catalogo.obter_catalogo().items():
+        a = avaliar(codigo)
+        print(f"{codigo:<8} {str(produto.nome)[:30]:<30} {a['quantidade']:>8} "
+              f"{a['custo_medio']:>12,.2f} {a['valor_medio']:>14,.2f} {a['valor_fifo']:>14,.2f}")
+    total = avaliar_estoque()
+    print("-" * 90)
+    print(f"Total: R$ {total['medio']:,.2f} (custo médio) | R$ {total['fifo']:,.2f} (FIFO)\n")
@@ -0,0 +1,400 @@
+"""
+Diário de Movimentações - Controle de Estoque
+Registro append-only de entradas e saídas (um JSON por linha, com número de sequência)
+
+O diário é o registro oficial das movimentações. As abas 'Entradas' e 'Saídas'
+da planilha são uma visão gerada a partir dele sob demanda (sincronizar_planilha),
+assim cada registro custa uma escrita no fim do arquivo, e não um load/save do Excel.
+"""
+import json
+import os
+from datetime import date, datetime
+
+import travas
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'arquivo_excel': 'Controle_Estoque.xlsx', 'arquivo_diario': 'movimentacoes.jsonl'}
+
+# Campos de cada aba de movimentação, na mesma ordem das colunas da planilha
+CAMPOS = {
+    'Entradas': ('data', 'documento', 'codigo', 'quantidade', 'valor_unitario', 'valor_total'),
+    'Saídas': ('data', 'codigo', 'quantidade', 'motivo'),
+}
+
+# Aba oculta onde a planilha guarda até onde o diário já foi materializado
+ABA_CONTROLE = '_diario'
+
+# Cópia do controle fora da planilha (em CONFIG['pasta_indices']): sem nada novo
+# no diário, sincronizar_planilha nem abre a planilha
+ARQUIVO_SINCRONIA = 'sincronia_planilha.json'
+
+# Bloco lido do fim do arquivo para achar o último registro
+_BLOCO_CAUDA = 4096
+
+
+def _arquivo_diario(arquivo=None):
+    return arquivo or CONFIG.get('arquivo_diario', 'movimentacoes.jsonl')
+
+
+def _ultima_linha(f, tamanho):
+    """Retorna a última linha completa do arquivo lendo apenas o final dele"""
+    inicio = tamanho
+    while inicio > 0:
+        inicio = max(0, inicio - _BLOCO_CAUDA)
+        f.seek(inicio)
+        # O último pedaço não termina em '\n': é vazio ou uma escrita interrompida
+        completas = f.read(tamanho - inicio).split(b'\n')[:-1]
+        if len(completas) > 1 or (completas and inicio == 0):
+            return completas[-1]
+    return b''
+
+
+def ultimo_seq(arquivo=None):
+    """Número de sequência do último registro (0 se o diário estiver vazio)"""
+    arquivo = _arquivo_diario(arquivo)
+    if not os.path.exists(arquivo):
+        return 0
+    with open(arquivo, 'rb') as f:
+        tamanho = f.seek(0, os.SEEK_END)
+        linha = _ultima_linha(f, tamanho)
+    return json.loads(linha)['seq'] if linha.strip() else 0
+
+
+def _descartar_cauda_incompleta(f):
+    """Remove uma última linha sem '\\n' (escrita interrompida por queda de energia)"""
+    tamanho = f.seek(0, os.SEEK_END)
+    if tamanho == 0:
+        return
+    f.seek(tamanho - 1)
+    if f.read(1) == b'\n':
+        return
+    inicio = max(0, tamanho - _BLOCO_CAUDA)
+    f.seek(inicio)
+    corte = f.read().rfind(b'\n')
+    f.truncate(inicio + corte + 1 if corte >= 0 else inicio)
+
+
+def _sincronizar_pasta(arquivo):
+    """Garante que a criação do arquivo sobreviva a uma queda (POSIX)"""
+    if os.name == 'nt':
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(arquivo)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def valor_total(registro):
+    """Valor total de uma entrada (quantidade × valor unitário), calculado na gravação
+
+    Registros antigos podem trazer uma fórmula ('=D5*E5') no lugar do valor; nesse
+    caso, e se o valor faltar, o total é recalculado a partir da própria linha.
+    """
+    total = registro.get('valor_total')
+    if isinstance(total, (int, float)) and not isinstance(total, bool):
+        return total
+    quantidade, valor = registro.get('quantidade'), registro.get('valor_unitario')
+    if not isinstance(quantidade, (int, float)) or not isinstance(valor, (int, float)):
+        return None
+    return round(quantidade * valor, 2)
+
+
+def montar_registro(aba, dados):
+    """Converte uma linha da planilha (lista de valores) em registro do diário"""
+    if aba not in CAMPOS:
+        raise ValueError(f"Aba '{aba}' não é de movimentação")
+    registro = {'aba': aba}
+    registro.update(zip(CAMPOS[aba], dados))
+    if isinstance(registro.get('data'), date):
+        # Células de data do Excel: mesmo formato DD/MM/YYYY dos registros digitados
+        registro['data'] = registro['data'].strftime('%d/%m/%Y')
+    if aba == 'Entradas':
+        registro['valor_total'] = valor_total(registro)
+    return registro
+
+
+def linha_planilha(registro):
+    """Converte um registro do diário na linha correspondente da planilha"""
+    linha = [registro.get(campo) for campo in CAMPOS[registro['aba']]]
+    if registro['aba'] == 'Entradas':
+        linha[-1] = valor_total(registro)
+    return linha
+
+
+def registrar(aba, dados, arquivo=None):
+    """Acrescenta uma movimentação ao diário (fsync) e retorna o registro gravado"""
+    return registrar_lote([(aba, dados)], arquivo)[0]
+
+
+def registrar_lote(movimentos, arquivo=None):
+    """Acrescenta várias movimentações [(aba, dados), ...] com uma única escrita e fsync
+
+    Retorna a lista de registros gravados, já com os números de sequência.
+    """
+    arquivo = _arquivo_diario(arquivo)
+    registros = [montar_registro(aba, dados) for aba, dados in movimentos]
+    if not registros:
+        return []
+
+    # Trava: ler o último seq e acrescentar precisa ser atômico entre terminais
+    with travas.travar(arquivo):
+        novo = not os.path.exists(arquivo)
+        if novo:
+            importar_planilha(arquivo_diario=arquivo)
+            novo = not os.path.exists(arquivo)
+
+        with open(arquivo, 'a+b') as f:
+            _descartar_cauda_incompleta(f)
+            tamanho = f.seek(0, os.SEEK_END)
+            linha = _ultima_linha(f, tamanho)
+            seq = json.loads(linha)['seq'] if linha.strip() else 0
+
+            agora = datetime.now().isoformat(timespec='seconds')
+            registros = [{'seq': seq + i, **registro, 'registrado_em': agora}
+                         for i, registro in enumerate(registros, start=1)]
+            f.write(b''.join(json.dumps(r, ensure_ascii=False).encode('utf-8') + b'\n'
+                             for r in registros))
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Produtos que cruzaram o estoque mínimo, ainda sob a trava: saldo exato do lote
+        alertar = arquivo == _arquivo_diario()
+        if alertar:
+            import alertas
+            cruzamentos = alertas.detectar(movimentos, [r['seq'] for r in registros])
+
+    if novo:
+        _sincronizar_pasta(arquivo)
+    if alertar:
+        alertas.notificar(cruzamentos)
+    return registros
+
+
+def ler(arquivo=None, offset=0):
+    """Percorre os registros do diário a partir de um offset em bytes
+
+    Gera tuplas (registro, offset_seguinte), permitindo retomar a leitura depois.
+    """
+    arquivo = _arquivo_diario(arquivo)
+    if not os.path.exists(arquivo):
+        return
+    with open(arquivo, 'rb') as f:
+        f.seek(offset)
+        for linha in f:
+            if not linha.endswith(b'\n'):
+                break  # escrita em andamento/interrompida
+            offset += len(linha)
+            if linha.strip():
+                yield json.loads(linha), offset
+
+
+def importar_planilha(arquivo=None, arquivo_diario=None):
+    """Cria o diário a partir das movimentações já existentes na planilha
+
+    Executado uma única vez, quando o diário ainda não existe (uma planilha sem
+    movimentações gera um diário vazio). As linhas importadas ficam marcadas
+    como já materializadas na planilha.
+    """
+    arquivo = arquivo or CONFIG['arquivo_excel']
+    arquivo_diario = _arquivo_diario(arquivo_diario)
+    if os.path.exists(arquivo_diario) or not os.path.exists(arquivo):
+        return 0
+
+    with travas.travar(arquivo_diario), travas.travar(arquivo):
+        if os.path.exists(arquivo_diario):
+            return 0  # outro terminal importou enquanto esperávamos
+        return _importar_planilha(arquivo, arquivo_diario)
+
+
+def _importar_planilha(arquivo, arquivo_diario):
+    import openpyxl
+    wb = openpyxl.load_workbook(arquivo)
+    agora = datetime.now().isoformat(timespec='seconds')
+    linhas = []
+    for aba in CAMPOS:
+        if aba not in wb.sheetnames:
+            continue
+        for valores in wb[aba].iter_rows(min_row=2, values_only=True):
+            if all(v is None for v in valores):
+                continue
+            registro = montar_registro(aba, valores[:len(CAMPOS[aba])])
+            registro = {'seq': len(linhas) + 1, **registro, 'registrado_em': agora}
+            linhas.append(json.dumps(registro, ensure_ascii=False))
+
+    temporario = arquivo_diario + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(''.join(linha + '\n' for linha in linhas))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, arquivo_diario)
+    _sincronizar_pasta(arquivo_diario)
+    if not linhas:
+        return 0
+
+    _corrigir_totais_entradas(wb)
+    _atualizar_abas_estoque(wb)
+    _gravar_controle(wb, len(linhas), os.path.getsize(arquivo_diario))
+    wb.save(arquivo)
+    return len(linhas)
+
+
+def _ler_controle(wb):
+    """Retorna (seq, offset) já materializados na planilha"""
+    if ABA_CONTROLE not in wb.sheetnames:
+        return 0, 0
+    ws = wb[ABA_CONTROLE]
+    return int(ws['A2'].value or 0), int(ws['B2'].value or 0)
+
+
+def _gravar_controle(wb, seq, offset):
+    if ABA_CONTROLE in wb.sheetnames:
+        ws = wb[ABA_CONTROLE]
+    else:
+        ws = wb.create_sheet(ABA_CONTROLE)
+        ws.sheet_state = 'hidden'
+        ws.append(['Último seq materializado', 'Offset no diário'])
+    ws['A2'] = seq
+    ws['B2'] = offset
+
+
+def _arquivo_sincronia():
+    return os.path.join(CONFIG.get('pasta_indices', 'indices'), ARQUIVO_SINCRONIA)
+
+
+def _marca_sincronia(arquivo, arquivo_diario, offset):
+    """Estado da planilha e do diário materializado até `offset`
+
+    A planilha entra pela data de modificação e tamanho: editada ou trocada por
+    fora, a marca deixa de valer e a sincronização completa volta a rodar.
+    """
+    planilha = os.stat(arquivo)
+    return {'planilha': os.path.abspath(arquivo), 'modificada': planilha.st_mtime_ns,
+            'tamanho': planilha.st_size, 'diario': os.path.abspath(arquivo_diario),
+            'inode': os.stat(arquivo_diario).st_ino, 'offset': offset}
+
+
+def _ler_sincronia():
+    try:
+        with open(_arquivo_sincronia(), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_sincronia(marca):
+    arquivo = _arquivo_sincronia()
+    os.makedirs(os.path.dirname(arquivo) or '.', exist_ok=True)
+    temporario = f"{arquivo}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(marca, f)
+    os.replace(temporario, arquivo)
+
+
+def _corrigir_totais_entradas(wb):
+    """Grava como valor o total das linhas da aba 'Entradas' sem total ou com fórmula
+
+    Versões antigas gravavam '=D{qtd+2}*E{qtd+2}', usando a quantidade como número
+    da linha. Retorna quantas células foram corrigidas.
+    """
+    if 'Entradas' not in wb.sheetnames:
+        return 0
+    corrigidas = 0
+    for n, (_, _, _, quantidade, valor, total) in enumerate(
+            wb['Entradas'].iter_rows(min_row=2, max_col=6, values_only=True), start=2):
+        formula = isinstance(total, str) and total.startswith('=')
+        if not formula and total is not None:
+            continue
+        novo = valor_total({'quantidade': quantidade, 'valor_unitario': valor})
+        if formula or novo is not None:
+            wb['Entradas'].cell(row=n, column=6, value=novo)
+            corrigidas += 1
+    return corrigidas
+
+
+def _atualizar_abas_estoque(wb):
+    """Regrava 'Estoque Atual' e 'Estoque Crítico' com valores calculados pelos saldos
+
+    Os valores ficam gravados nas células (sem SUMIF/VLOOKUP), então quem lê a
+    planilha com pandas/openpyxl obtém os saldos sem depender do Excel recalcular.
+    """
+    import saldos
+    totais = saldos.carregar()
+    ws_estoque, ws_critico = wb['Estoque Atual'], wb['Estoque Crítico']
+
+    iniciais = {}
+    for codigo, inicial in ws_estoque.iter_rows(min_row=2, max_col=2, values_only=True):
+        if codigo is not None:
+            iniciais[codigo] = inicial if isinstance(inicial, (int, float)) else 0
+
+    ws_estoque.delete_rows(2, ws_estoque.max_row)
+    ws_critico.delete_rows(2, ws_critico.max_row)
+    for linha in wb['Base'].iter_rows(min_row=2, max_col=5, values_only=True):
+        codigo, nome, _, _, minimo = linha
+        if codigo is None:
+            continue
+        inicial = iniciais.get(codigo, 0)
+        entradas, saidas = totais.get(codigo, (0, 0))
+        saldo = inicial + entradas - saidas
+        ws_estoque.append([codigo, inicial, entradas, saidas, saldo])
+        ws_critico.append([nome, saldo, minimo, saldos.status(saldo, minimo)])
+
+
+def sincronizar_planilha(arquivo=None, arquivo_diario=None):
+    """Acrescenta na planilha as movimentações do diário ainda não materializadas
+
+    Também regrava as abas de estoque com os saldos atuais. Retorna a quantidade
+    de linhas gravadas (a planilha só é salva se houver alguma). Uma planilha
+    anterior ao diário é importada antes, e já sai com as abas de estoque em dia.
+    """
+    arquivo = arquivo or CONFIG['arquivo_excel']
+    arquivo_diario = _arquivo_diario(arquivo_diario)
+    importar_planilha(arquivo, arquivo_diario)
+    if not os.path.exists(arquivo_diario):
+        return 0
+
+    with travas.travar(arquivo):
+        return _sincronizar_planilha(arquivo, arquivo_diario)
+
+
+def _sincronizar_planilha(arquivo, arquivo_diario):
+    import openpyxl
+    tamanho = os.path.getsize(arquivo_diario)
+    if _ler_sincronia() == _marca_sincronia(arquivo, arquivo_diario, tamanho):
+        return 0  # diário todo já materializado e planilha intocada
+
+    wb = openpyxl.load_workbook(arquivo)
+    primeira_vez = ABA_CONTROLE not in wb.sheetnames
+    seq_visao, offset = _ler_controle(wb)
+    if offset > tamanho:
+        seq_visao, offset = 0, 0  # diário recriado: reconstrói a visão
+
+    gravadas = 0
+    for registro, proximo_offset in ler(arquivo_diario, offset):
+        offset = proximo_offset
+        if registro['seq'] <= seq_visao:
+            continue
+        wb[registro['aba']].append(linha_planilha(registro))
+        seq_visao = registro['seq']
+        gravadas += 1
+
+    if _corrigir_totais_entradas(wb) or gravadas or primeira_vez:
+        _atualizar_abas_estoque(wb)
+        _gravar_controle(wb, seq_visao, offset)
+        wb.save(arquivo)
+    _gravar_sincronia(_marca_sincronia(arquivo, arquivo_diario, offset))
+    return gravadas
+
+
+if __name__ == "__main__":
+    print("\n🔄 Atualizando planilha a partir do diário de movimentações...")
+    try:
+        n = sincronizar_planilha()
+        print(f"✅ {n} movimentação(ões) gravada(s) em '{CONFIG['arquivo_excel']}'")
+    except FileNotFoundError:
+        print(f"❌ Arquivo '{CONFIG['arquivo_excel']}' não encontrado!")
+        print("💡 Execute: python3 gerar_planilha.py")
+    except PermissionError:
+        print(f"❌ Arquivo '{CONFIG['arquivo_excel']}' está aberto! Feche e tente novamente.")
@@ -3,24 +3,58 @@ Exemplo de integração com Power BI ou outros sistemas de BI
 Exporta dados em formatos otimizados para análise
 """
 
+import csv
+import hashlib
+import io
+import json
+import os
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-def preparar_dados_para_bi(arquivo="Controle_Estoque.xlsx"):
-    """
-    Prepara e enriquece os dados para análise em ferramentas de BI
-    """
-    
-    # Ler dados
-    base = pd.read_excel(arquivo, sheet_name='Base')
-    entradas = pd.read_excel(arquivo, sheet_name='Entradas')
-    saidas = pd.read_excel(arquivo, sheet_name='Saídas')
-    estoque = pd.read_excel(arquivo, sheet_name='Estoque Atual')
-    
-    # ===== TABELA FATO: MOVIMENTAÇÕES =====
-    # Combinar entradas e saídas em uma única tabela
-    
-    # Preparar entradas
+import planilha
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'formato_bi': 'csv', 'bi_tamanho_bloco': 50000}
+
+# Colunas da tabela fato de movimentações (antes das dimensões de tempo)
+COLUNAS_MOVIMENTACOES = ['Data_Movimentacao', 'Codigo_Produto', 'Quantidade_Movimento',
+                         'Tipo_Movimentacao', 'Documento', 'Valor_Unitario']
+
+# Colunas de tempo derivadas da data (inteiras, ou float quando há data inválida)
+COLUNAS_TEMPO_NUMERICAS = ['Ano', 'Mes', 'Dia', 'Trimestre']
+
+# Formatos de saída (CONFIG['formato_bi']) -> extensão dos arquivos
+FORMATOS_BI = {'csv': 'csv', 'parquet': 'parquet', 'feather': 'feather'}
+
+# Colunas tipadas nos formatos colunares (as demais de texto viram string)
+COLUNAS_NUMERICAS = {'Quantidade_Movimento', 'Valor_Unitario', 'Estoque_Minimo', 'Estoque_Inicial',
+                     'Total_Entradas', 'Total_Saidas', 'Saldo_Atual', 'Valor_Total_Estoque',
+                     'Deficit_Estoque'}
+COLUNAS_DATA = {'Data_Movimentacao', 'Data_Referencia'}
+
+# Agregados por produto (agregados.py) -> nomes das colunas no BI
+COLUNAS_AGREGADOS = {
+    'data_movimentacao': 'Data_Movimentacao', 'ano': 'Ano', 'mes': 'Mes',
+    'codigo_produto': 'Codigo_Produto',
+    'quantidade_entradas': 'Quantidade_Entradas', 'quantidade_saidas': 'Quantidade_Saidas',
+    'valor_entradas': 'Valor_Entradas', 'num_entradas': 'Num_Entradas', 'num_saidas': 'Num_Saidas',
+}
+
+
+def _sincronizar_diario(arquivo):
+    """Materializa na planilha as movimentações pendentes do diário"""
+    import diario
+    try:
+        diario.sincronizar_planilha(arquivo)
+    except PermissionError:
+        print("⚠️  Planilha aberta: movimentações recentes do diário não incluídas")
+
+
+def _preparar_entradas(entradas):
+    """Aba Entradas no formato da tabela fato de movimentações"""
     entradas_prep = entradas.copy()
     entradas_prep['Tipo_Movimentacao'] = 'Entrada'
     entradas_prep['Quantidade_Movimento'] = entradas_prep['Quantidade']
@@ -30,8 +64,11 @@ def preparar_dados_para_bi(arquivo="Controle_Estoque.xlsx"):
         'Documento (Nota Fiscal / Nº de Compra)': 'Documento',
         'Valor Unitário de Compra (R$)': 'Valor_Unitario'
     })
-    
-    # Preparar saídas
+    return entradas_prep[COLUNAS_MOVIMENTACOES]
+
+
+def _preparar_saidas(saidas):
+    """Aba Saídas no formato da tabela fato de movimentações"""
     saidas_prep = saidas.copy()
     saidas_prep['Tipo_Movimentacao'] = 'Saída'
     saidas_prep['Quantidade_Movimento'] = -saidas_prep['Quantidade Retirada']
@@ -41,27 +78,50 @@ def preparar_dados_para_bi(arquivo="Controle_Estoque.xlsx"):
         'Produto / Material': 'Codigo_Produto',
         'Data da Saída': 'Data_Movimentacao'
     })
-    
-    # Combinar
-    colunas_comuns = ['Data_Movimentacao', 'Codigo_Produto', 'Quantidade_Movimento', 
-                      'Tipo_Movimentacao', 'Documento', 'Valor_Unitario']
-    
-    movimentacoes = pd.concat([
-        entradas_prep[colunas_comuns],
-        saidas_prep[colunas_comuns]
-    ], ignore_index=True)
-    
-    # Converter data para datetime
+    return saidas_prep[COLUNAS_MOVIMENTACOES]
+
+
+def _adicionar_dimensoes_tempo(movimentacoes):
+    """Converte a data e adiciona ano, mês, dia, dia da semana e trimestre"""
     movimentacoes['Data_Movimentacao'] = pd.to_datetime(movimentacoes['Data_Movimentacao'], 
                                                           format='%d/%m/%Y', errors='coerce')
     
-    # Adicionar dimensões de tempo
     movimentacoes['Ano'] = movimentacoes['Data_Movimentacao'].dt.year
     movimentacoes['Mes'] = movimentacoes['Data_Movimentacao'].dt.month
     movimentacoes['Mes_Nome'] = movimentacoes['Data_Movimentacao'].dt.strftime('%B')
     movimentacoes['Dia'] = movimentacoes['Data_Movimentacao'].dt.day
     movimentacoes['Dia_Semana'] = movimentacoes['Data_Movimentacao'].dt.day_name()
     movimentacoes['Trimestre'] = movimentacoes['Data_Movimentacao'].dt.quarter
+    return movimentacoes
+
+
+def _preparar_fornecedores_categorias(base):
+    """Dimensões de fornecedores e categorias (valores distintos do cadastro)"""
+    
+    # ===== TABELA DIMENSÃO: FORNECEDORES =====
+    dim_fornecedores = base[['Fornecedor']].drop_duplicates().reset_index(drop=True)
+    dim_fornecedores['ID_Fornecedor'] = dim_fornecedores.index + 1
+    
+    # ===== TABELA DIMENSÃO: CATEGORIAS =====
+    dim_categorias = base[['Tipo de Produto']].drop_duplicates().reset_index(drop=True)
+    dim_categorias = dim_categorias.rename(columns={'Tipo de Produto': 'Categoria'})
+    dim_categorias['ID_Categoria'] = dim_categorias.index + 1
+    
+    return dim_fornecedores, dim_categorias
+
+
+def _status_deficit(fato_estoque):
+    """(Status_Estoque, Deficit_Estoque) de cada produto, a partir de Saldo_Atual e Estoque_Minimo
+
+    Vetorizado: uma operação por coluna em vez de uma chamada Python por produto.
+    """
+    status = np.where(fato_estoque['Saldo_Atual'] < fato_estoque['Estoque_Minimo'], 'Crítico', 'Normal')
+    deficit = (fato_estoque['Estoque_Minimo'] - fato_estoque['Saldo_Atual']).clip(lower=0).fillna(0)
+    return status, deficit
+
+
+def _preparar_cadastro(base, estoque):
+    """Dimensões (produtos, fornecedores, categorias) e fato de estoque atual"""
     
     # ===== TABELA DIMENSÃO: PRODUTOS =====
     dim_produtos = base.copy()
@@ -76,14 +136,7 @@ def preparar_dados_para_bi(arquivo="Controle_Estoque.xlsx"):
         'Localização': 'Localizacao'
     })
     
-    # ===== TABELA DIMENSÃO: FORNECEDORES =====
-    dim_fornecedores = base[['Fornecedor']].drop_duplicates().reset_index(drop=True)
-    dim_fornecedores['ID_Fornecedor'] = dim_fornecedores.index + 1
-    
-    # ===== TABELA DIMENSÃO: CATEGORIAS =====
-    dim_categorias = base[['Tipo de Produto']].drop_duplicates().reset_index(drop=True)
-    dim_categorias = dim_categorias.rename(columns={'Tipo de Produto': 'Categoria'})
-    dim_categorias['ID_Categoria'] = dim_categorias.index + 1
+    dim_fornecedores, dim_categorias = _preparar_fornecedores_categorias(base)
     
     # ===== TABELA FATO: ESTOQUE ATUAL =====
     fato_estoque = estoque.copy()
@@ -108,17 +161,9 @@ def preparar_dados_para_bi(arquivo="Controle_Estoque.xlsx"):
     
     # Calcular métricas adicionais
     fato_estoque['Valor_Total_Estoque'] = fato_estoque['Saldo_Atual'] * fato_estoque['Valor_Unitario']
-    fato_estoque['Status_Estoque'] = fato_estoque.apply(
-        lambda row: 'Crítico' if row['Saldo_Atual'] < row['Estoque_Minimo'] else 'Normal',
-        axis=1
-    )
-    fato_estoque['Deficit_Estoque'] = fato_estoque.apply(
-        lambda row: max(0, row['Estoque_Minimo'] - row['Saldo_Atual']),
-        axis=1
-    )
+    fato_estoque['Status_Estoque'], fato_estoque['Deficit_Estoque'] = _status_deficit(fato_estoque)
     
     return {
-        'fato_movimentacoes': movimentacoes,
         'fato_estoque_atual': fato_estoque,
         'dim_produtos': dim_produtos,
         'dim_fornecedores': dim_fornecedores,
@@ -126,20 +171,439 @@ def preparar_dados_para_bi(arquivo="Controle_Estoque.xlsx"):
     }
 
 
-def exportar_para_power_bi(dados, pasta_saida='dados_power_bi'):
+def _preparar_agregados(dias=None, meses=None):
+    """Tabelas de totais diários e mensais por produto, já mantidas a cada movimentação
+
+    `dias`/`meses` restringem cada tabela aos pares (período, código) informados.
+    """
+    import agregados
+    return {f'agg_movimentacoes_{nome}':
+            agregados.tabela(periodo, chaves).rename(columns=COLUNAS_AGREGADOS)
+            for periodo, nome, chaves in (('dia', 'diarias', dias), ('mes', 'mensais', meses))}
+
+
+def preparar_dados_para_bi(arquivo="Controle_Estoque.xlsx"):
+    """
+    Prepara e enriquece os dados para análise em ferramentas de BI
+    """
+    
+    _sincronizar_diario(arquivo)
+    
+    # Ler dados (uma única leitura da planilha, compartilhada via cache)
+    abas = planilha.carregar(arquivo, ['Base', 'Entradas', 'Saídas', 'Estoque Atual'])
+    base, entradas, saidas, estoque = abas.values()
+    
+    # ===== TABELA FATO: MOVIMENTAÇÕES =====
+    # Combinar entradas e saídas em uma única tabela
+    movimentacoes = pd.concat([
+        _preparar_entradas(entradas),
+        _preparar_saidas(saidas)
+    ], ignore_index=True)
+    movimentacoes = _adicionar_dimensoes_tempo(movimentacoes)
+    
+    return {'fato_movimentacoes': movimentacoes, **_preparar_cadastro(base, estoque),
+            **_preparar_agregados()}
+
+
+def _formato_bi(formato=None):
+    """Formato de saída escolhido; sem pyarrow, os colunares voltam para CSV"""
+    formato = (formato or CONFIG.get('formato_bi', 'csv')).lower()
+    if formato not in FORMATOS_BI:
+        raise ValueError(f"Formato '{formato}' inválido (use: {', '.join(FORMATOS_BI)})")
+    if formato != 'csv':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print(f"⚠️  Formato '{formato}' requer pyarrow (pip3 install pyarrow); exportando em CSV")
+            return 'csv'
+    return formato
+
+
+def _tipar_para_colunar(df):
+    """Ajusta colunas sem tipo definido para o Arrow: números, datas e texto (None vira nulo)"""
+    df = df.copy()
+    for coluna in df.columns:
+        tipo = df[coluna].dtype
+        if coluna in COLUNAS_NUMERICAS and not pd.api.types.is_numeric_dtype(tipo):
+            df[coluna] = pd.to_numeric(df[coluna], errors='coerce').astype('float64')
+        elif coluna in COLUNAS_DATA and not pd.api.types.is_datetime64_any_dtype(tipo):
+            df[coluna] = pd.to_datetime(df[coluna], errors='coerce')
+        elif tipo == object:
+            df[coluna] = df[coluna].astype('string')
+    return df
+
+
+def _gravar_colunar(blocos, destino, formato):
+    """Grava DataFrames (um ou vários blocos) em um único arquivo Parquet ou Feather"""
+    import pyarrow as pa
+    esquema, escritor, total = None, None, 0
+    try:
+        for df in blocos:
+            tabela = pa.Table.from_pandas(_tipar_para_colunar(df), preserve_index=False)
+            if escritor is None:
+                esquema = tabela.schema
+                if formato == 'parquet':
+                    import pyarrow.parquet as pq
+                    escritor = pq.ParquetWriter(destino, esquema, compression='zstd')
+                else:
+                    # Feather sem compressão: pode ser lido por memory-map, sem cópia
+                    escritor = pa.ipc.new_file(destino, esquema)
+            escritor.write_table(tabela.cast(esquema))
+            total += len(df)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return total
+
+
+def _exportar_tabela(df, pasta_saida, nome, formato='csv'):
+    arquivo = f"{pasta_saida}/{nome}.{FORMATOS_BI[formato]}"
+    if formato == 'csv':
+        df.to_csv(arquivo, index=False, encoding='utf-8-sig', sep=';', decimal=',')
+    else:
+        _gravar_colunar([df], arquivo, formato)
+    print(f"✅ {arquivo} criado")
+
+
+def exportar_para_power_bi(dados, pasta_saida='dados_power_bi', formato=None):
     """
     Exporta dados em formato otimizado para Power BI
+    
+    formato: 'csv' (padrão), 'parquet' ou 'feather'; se omitido, usa CONFIG['formato_bi']
     """
     import os
     os.makedirs(pasta_saida, exist_ok=True)
+    formato = _formato_bi(formato)
     
     for nome, df in dados.items():
-        arquivo = f"{pasta_saida}/{nome}.csv"
-        df.to_csv(arquivo, index=False, encoding='utf-8-sig', sep=';', decimal=',')
-        print(f"✅ {arquivo} criado")
+        _exportar_tabela(df, pasta_saida, nome, formato)
+    
+    print(f"\n📊 Dados prontos para importar no Power BI!")
+    print(f"   Pasta: {pasta_saida}/")
+
+
+# ===== EXPORTAÇÃO EM FLUXO (HISTÓRICO GRANDE) =====
+
+def _combinar_tipo(atual, novo):
+    """Tipo que a coluna teria se os dois blocos fossem lidos juntos"""
+    if atual is None or atual == novo:
+        return novo
+    numericos = all(pd.api.types.is_numeric_dtype(t) and not pd.api.types.is_bool_dtype(t)
+                    for t in (atual, novo))
+    return pd.api.types.pandas_dtype('float64') if numericos else pd.api.types.pandas_dtype(object)
+
+
+def _inspecionar_aba(arquivo, aba, coluna_data, tamanho_bloco):
+    """1ª passada: tipos das colunas na aba inteira, sem mantê-la em memória"""
+    tipos, prototipo, colunas, com_vazios = {}, None, None, set()
+    datas_invalidas = horarios = False
+    for bloco in planilha.ler_em_blocos(arquivo, aba, tamanho_bloco):
+        colunas = list(bloco.columns)
+        for coluna in colunas:
+            if bloco[coluna].isna().any():
+                com_vazios.add(coluna)
+            if bloco[coluna].notna().any():
+                tipos[coluna] = _combinar_tipo(tipos.get(coluna), bloco[coluna].dtype)
+        completas = bloco.dropna()
+        if prototipo is None or (prototipo.isna().any(axis=None) and not completas.empty):
+            prototipo = (completas if not completas.empty else bloco).head(1)
+        datas = pd.to_datetime(bloco[coluna_data], format='%d/%m/%Y', errors='coerce')
+        datas_invalidas |= bool(datas.isna().any())
+        horarios |= bool((datas.dropna() != datas.dropna().dt.normalize()).any())
+
+    if prototipo is None:
+        # Aba sem linhas: colunas object, vazias (como no pd.read_excel)
+        return None, planilha.carregar(arquivo, [aba])[aba], False, False
+    # Coluna sem nenhum valor na aba inteira: pd.read_excel a lê como float (NaN)
+    tipos = {c: tipos.get(c, pd.api.types.pandas_dtype('float64')) for c in colunas}
+    # Células vazias em qualquer bloco tornam a coluna inteira float (NaN) ou object
+    for coluna in com_vazios:
+        if pd.api.types.is_integer_dtype(tipos[coluna]):
+            tipos[coluna] = pd.api.types.pandas_dtype('float64')
+        elif pd.api.types.is_bool_dtype(tipos[coluna]):
+            tipos[coluna] = pd.api.types.pandas_dtype(object)
+    return tipos, prototipo.astype(tipos), datas_invalidas, horarios
+
+
+def _movimentacoes_em_blocos(arquivo, tamanho_bloco):
+    """Gera a tabela fato de movimentações em blocos, como (DataFrame, formato de data)
+
+    Uma primeira passada determina os tipos de cada coluna na aba inteira, então
+    todos os blocos têm os mesmos tipos da tabela montada por preparar_dados_para_bi.
+    Sem movimentações, gera um único bloco vazio (só as colunas).
+    """
+    abas = {'Entradas': ('Data da Entrada', _preparar_entradas),
+            'Saídas': ('Data da Saída', _preparar_saidas)}
+    inspecao = {aba: _inspecionar_aba(arquivo, aba, coluna, tamanho_bloco)
+                for aba, (coluna, _) in abas.items()}
+    
+    # Tipos da tabela combinada = concat dos protótipos (1 linha de cada aba)
+    tipos_saida = pd.concat([preparar(inspecao[aba][1]) for aba, (_, preparar) in abas.items()],
+                            ignore_index=True).dtypes
+    datas_invalidas = any(i[2] for i in inspecao.values())
+    formato_data = '%Y-%m-%d %H:%M:%S' if any(i[3] for i in inspecao.values()) else None
+    
+    vazio = True
+    for aba, (_, preparar) in abas.items():
+        tipos_aba = inspecao[aba][0]
+        if tipos_aba is None:
+            continue
+        for bloco in planilha.ler_em_blocos(arquivo, aba, tamanho_bloco):
+            movimentacoes = preparar(bloco.astype(tipos_aba)).astype(tipos_saida)
+            movimentacoes = _adicionar_dimensoes_tempo(movimentacoes)
+            if datas_invalidas:
+                movimentacoes[COLUNAS_TEMPO_NUMERICAS] = \
+                    movimentacoes[COLUNAS_TEMPO_NUMERICAS].astype('float64')
+            vazio = False
+            yield movimentacoes, formato_data
+    if vazio:
+        movimentacoes = pd.concat([preparar(inspecao[aba][1]) for aba, (_, preparar) in abas.items()],
+                                  ignore_index=True)
+        yield _adicionar_dimensoes_tempo(movimentacoes), None
+
+
+def exportar_movimentacoes_em_blocos(arquivo, destino, tamanho_bloco=50000, formato='csv'):
+    """Grava a tabela fato de movimentações lendo Entradas/Saídas em blocos de tamanho fixo
+
+    O uso de memória depende só de `tamanho_bloco`, não do tamanho do histórico.
+    Em CSV, o arquivo é idêntico (byte a byte) ao de preparar_dados_para_bi.
+    Retorna o número de movimentações gravadas.
+    """
+    blocos = _movimentacoes_em_blocos(arquivo, tamanho_bloco)
+    if formato != 'csv':
+        return _gravar_colunar((movimentacoes for movimentacoes, _ in blocos), destino, formato)
+    
+    total, primeiro = 0, True
+    with open(destino, 'w', encoding='utf-8-sig', newline='') as f:
+        for movimentacoes, formato_data in blocos:
+            movimentacoes.to_csv(f, header=primeiro, index=False, sep=';', decimal=',',
+                                 date_format=formato_data)
+            total += len(movimentacoes)
+            primeiro = False
+    return total
+
+
+def exportar_para_power_bi_em_blocos(arquivo="Controle_Estoque.xlsx", pasta_saida='dados_power_bi',
+                                     tamanho_bloco=None, formato=None):
+    """
+    Exporta para o Power BI processando as movimentações em blocos (memória constante)
+    """
+    tamanho_bloco = tamanho_bloco or CONFIG.get('bi_tamanho_bloco', 50000)
+    formato = _formato_bi(formato)
+    os.makedirs(pasta_saida, exist_ok=True)
+    
+    _sincronizar_diario(arquivo)
+    
+    destino = f"{pasta_saida}/fato_movimentacoes.{FORMATOS_BI[formato]}"
+    total = exportar_movimentacoes_em_blocos(arquivo, destino, tamanho_bloco, formato)
+    print(f"✅ {destino} criado ({total} movimentações)")
+    
+    # Cadastro e estoque têm uma linha por produto: independem do histórico
+    abas = planilha.carregar(arquivo, ['Base', 'Estoque Atual'])
+    tabelas = {**_preparar_cadastro(abas['Base'], abas['Estoque Atual']), **_preparar_agregados()}
+    for nome, df in tabelas.items():
+        _exportar_tabela(df, pasta_saida, nome, formato)
     
     print(f"\n📊 Dados prontos para importar no Power BI!")
     print(f"   Pasta: {pasta_saida}/")
+    return total
+
+
+# ===== EXPORTAÇÃO INCREMENTAL (MARCA D'ÁGUA) =====
+
+# Arquivo, dentro da pasta de saída, com a posição no diário da última exportação
+ARQUIVO_MARCA = '_marca_exportacao.json'
+
+# Colunas das abas de movimentação, na ordem dos campos do diário (diario.CAMPOS)
+COLUNAS_ABAS = {
+    'Entradas': ['Data da Entrada', 'Documento (Nota Fiscal / Nº de Compra)', 'Produto / Material',
+                 'Quantidade', 'Valor Unitário de Compra (R$)', 'Valor Total (R$)'],
+    'Saídas': ['Data da Saída', 'Produto / Material', 'Quantidade Retirada', 'Motivo da Saída'],
+}
+
+
+def _ler_marca(pasta_saida):
+    try:
+        with open(os.path.join(pasta_saida, ARQUIVO_MARCA), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _gravar_marca(pasta_saida, marca):
+    """Grava a marca d'água (escrita atômica: a exportação só conta depois disto)"""
+    arquivo = os.path.join(pasta_saida, ARQUIVO_MARCA)
+    with open(arquivo + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(marca, f, ensure_ascii=False)
+    os.replace(arquivo + '.tmp', arquivo)
+
+
+def _impressao_produto(produto):
+    """Resumo do cadastro de um produto, para detectar alterações entre exportações"""
+    return hashlib.blake2b(repr(produto.valores()).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _posicao_materializada(arquivo):
+    """(seq, offset) do diário já presentes na planilha (aba de controle)"""
+    import openpyxl
+    import diario
+    wb = openpyxl.load_workbook(arquivo, read_only=True)
+    try:
+        if diario.ABA_CONTROLE not in wb.sheetnames:
+            return 0, 0
+        linha = next(wb[diario.ABA_CONTROLE].iter_rows(min_row=2, max_row=2, values_only=True),
+                     (0, 0))
+        return int(linha[0] or 0), int(linha[1] or 0)
+    finally:
+        wb.close()
+
+
+def _estoque_inicial(arquivo, codigos):
+    """Coluna 'Estoque Inicial' da aba 'Estoque Atual' para os códigos informados"""
+    estoque = planilha.carregar(arquivo, ['Estoque Atual'])['Estoque Atual']
+    estoque = estoque[estoque['Produto / Material'].isin(codigos)]
+    iniciais = pd.to_numeric(estoque['Estoque Inicial'], errors='coerce').fillna(0)
+    return dict(zip(estoque['Produto / Material'], iniciais))
+
+
+def _linhas_csv(df):
+    """Linhas (listas de textos) que o DataFrame ocupa no CSV exportado, sem cabeçalho"""
+    texto = df.to_csv(index=False, header=False, sep=';', decimal=',')
+    return list(csv.reader(io.StringIO(texto), delimiter=';'))
+
+
+def _substituir_linhas(arquivo, novas, colunas_chave=1):
+    """Regrava o CSV trocando as linhas cuja chave (primeiras colunas) está em `novas`
+
+    Chaves que ainda não estavam no arquivo são acrescentadas no final. As
+    demais linhas são copiadas como texto, sem passar pelo pandas.
+    """
+    pendentes = {tuple(linha[:colunas_chave]): linha for linha in novas}
+    with open(arquivo, encoding='utf-8-sig', newline='') as origem, \
+            open(arquivo + '.tmp', 'w', encoding='utf-8-sig', newline='') as destino:
+        leitor = csv.reader(origem, delimiter=';')
+        escritor = csv.writer(destino, delimiter=';', lineterminator=os.linesep)
+        escritor.writerow(next(leitor))
+        for linha in leitor:
+            escritor.writerow(pendentes.pop(tuple(linha[:colunas_chave]), linha) if linha else linha)
+        escritor.writerows(pendentes.values())
+    os.replace(arquivo + '.tmp', arquivo)
+
+
+def exportar_para_power_bi_incremental(arquivo="Controle_Estoque.xlsx", pasta_saida='dados_power_bi'):
+    """
+    Exporta só o que mudou desde a última exportação (marca d'água no diário)
+    
+    Movimentações novas são acrescentadas em fato_movimentacoes.csv; fato_estoque_atual
+    e dim_produtos são regravadas apenas nas linhas dos produtos movimentados ou com
+    cadastro alterado, e os agregados apenas nas linhas dos dias e meses movimentados.
+    Sem marca d'água válida, faz a exportação completa.
+    Sempre em CSV (arquivos colunares não aceitam acréscimo no fim).
+    Retorna o número de movimentações exportadas.
+    """
+    import diario
+    import catalogo
+    import historico
+    import saldos
+    if CONFIG.get('backend') == 'sqlite':
+        raise ValueError("Exportação incremental usa o diário (backend 'excel'); "
+                         "com SQLite conecte o BI direto no banco")
+    
+    arquivo_diario = CONFIG.get('arquivo_diario', 'movimentacoes.jsonl')
+    tamanho_diario = os.path.getsize(arquivo_diario) if os.path.exists(arquivo_diario) else 0
+    fato_mov = os.path.join(pasta_saida, 'fato_movimentacoes.csv')
+    marca = _ler_marca(pasta_saida)
+    
+    if (marca is None or marca['offset'] > tamanho_diario
+            or not os.path.exists(fato_mov) or os.path.getsize(fato_mov) < marca['tamanho_fato']
+            or not all(os.path.exists(os.path.join(pasta_saida, f'{nome}.csv'))
+                       for nome in ('fato_movimentacoes', 'fato_estoque_atual', 'dim_produtos'))):
+        print("🔄 Sem exportação anterior válida: exportando tudo...")
+        # Planilha anterior ao diário: cria o diário já marcado como materializado
+        diario.importar_planilha(arquivo, arquivo_diario)
+        total = exportar_para_power_bi_em_blocos(arquivo, pasta_saida, formato='csv')
+        seq, offset = _posicao_materializada(arquivo)
+        _gravar_marca(pasta_saida, {
+            'seq': seq, 'offset': offset, 'tamanho_fato': os.path.getsize(fato_mov),
+            'produtos': {p.codigo: _impressao_produto(p)
+                         for p in catalogo.obter_catalogo().values()},
+        })
+        return total
+    
+    # Linhas acrescentadas por uma execução interrompida antes de gravar a marca
+    with open(fato_mov, 'r+b') as f:
+        f.truncate(marca['tamanho_fato'])
+    
+    # ===== MOVIMENTAÇÕES NOVAS =====
+    novas = {aba: [] for aba in COLUNAS_ABAS}
+    dias_tocados = set()  # (dia, código) com movimentação nova
+    seq, offset = marca['seq'], marca['offset']
+    for registro, offset in diario.ler(arquivo_diario, marca['offset']):
+        if registro['seq'] > seq:
+            novas[registro['aba']].append(diario.linha_planilha(registro))
+            dias_tocados.add((historico.dia_iso(registro['data']), registro['codigo']))
+            seq = registro['seq']
+    
+    movimentacoes = pd.concat([
+        _preparar_entradas(pd.DataFrame(novas['Entradas'], columns=COLUNAS_ABAS['Entradas'])),
+        _preparar_saidas(pd.DataFrame(novas['Saídas'], columns=COLUNAS_ABAS['Saídas']))
+    ], ignore_index=True)
+    movimentacoes = _adicionar_dimensoes_tempo(movimentacoes)
+    with open(fato_mov, 'a', encoding='utf-8', newline='') as f:
+        movimentacoes.to_csv(f, header=False, index=False, sep=';', decimal=',')
+    
+    # ===== PRODUTOS ALTERADOS =====
+    produtos = catalogo.obter_catalogo()
+    impressoes = {codigo: _impressao_produto(p) for codigo, p in produtos.items()}
+    cadastro_alterado = {c for c, h in impressoes.items() if marca['produtos'].get(c) != h}
+    movimentados = set(movimentacoes['Codigo_Produto'])
+    alterados = [c for c in produtos if c in cadastro_alterado or c in movimentados]
+    
+    if alterados:
+        base = pd.DataFrame([produtos[c].valores() for c in alterados],
+                            columns=list(catalogo.COLUNAS))
+        totais = saldos.carregar()
+        iniciais = _estoque_inicial(arquivo, set(alterados))
+        linhas_estoque = []
+        for codigo in alterados:
+            inicial = iniciais.get(codigo, 0)
+            entradas, saidas = totais.get(codigo, (0, 0))
+            linhas_estoque.append([codigo, inicial, entradas, saidas, inicial + entradas - saidas])
+        estoque = pd.DataFrame(linhas_estoque, columns=[
+            'Produto / Material', 'Estoque Inicial', 'Total de Entradas',
+            'Total de Saídas', 'Saldo Atual'])
+        
+        tabelas = _preparar_cadastro(base, estoque)
+        for nome in ('fato_estoque_atual', 'dim_produtos'):
+            _substituir_linhas(os.path.join(pasta_saida, f'{nome}.csv'),
+                               _linhas_csv(tabelas[nome]))
+    
+    if cadastro_alterado:
+        # Dimensões pequenas (valores distintos): regravadas inteiras
+        dim_fornecedores, dim_categorias = _preparar_fornecedores_categorias(
+            catalogo.para_dataframe())
+        _exportar_tabela(dim_fornecedores, pasta_saida, 'dim_fornecedores')
+        _exportar_tabela(dim_categorias, pasta_saida, 'dim_categorias')
+    
+    # Agregados: uma linha por produto e período; só as dos dias/meses movimentados mudam
+    arquivos_agg = {nome: os.path.join(pasta_saida, f'{nome}.csv')
+                    for nome in ('agg_movimentacoes_diarias', 'agg_movimentacoes_mensais')}
+    if not all(os.path.exists(caminho) for caminho in arquivos_agg.values()):
+        for nome, df in _preparar_agregados().items():
+            _exportar_tabela(df, pasta_saida, nome)
+    elif dias_tocados:
+        meses_tocados = {(dia[:7], codigo) for dia, codigo in dias_tocados}
+        tabelas = _preparar_agregados(dias_tocados, meses_tocados)
+        # chave: (Data_Movimentacao, Codigo_Produto) e (Ano, Mes, Codigo_Produto)
+        for nome, colunas_chave in (('agg_movimentacoes_diarias', 2), ('agg_movimentacoes_mensais', 3)):
+            _substituir_linhas(arquivos_agg[nome], _linhas_csv(tabelas[nome]), colunas_chave)
+    
+    _gravar_marca(pasta_saida, {'seq': seq, 'offset': offset,
+                                'tamanho_fato': os.path.getsize(fato_mov),
+                                'produtos': impressoes})
+    print(f"✅ {len(movimentacoes)} movimentação(ões) nova(s), "
+          f"{len(alterados)} produto(s) atualizado(s)")
+    return len(movimentacoes)
 
 
 def gerar_modelo_estrela_sql(dados):
@@ -218,6 +682,30 @@ CREATE TABLE fato_estoque_atual (
     FOREIGN KEY (codigo_produto) REFERENCES dim_produtos(codigo_produto)
 );
 
+-- TABELAS AGREGADAS: totais por produto, atualizados a cada movimentação
+CREATE TABLE agg_movimentacoes_diarias (
+    data_movimentacao DATE,
+    codigo_produto VARCHAR(20),
+    quantidade_entradas DECIMAL(10,2),
+    quantidade_saidas DECIMAL(10,2),
+    valor_entradas DECIMAL(10,2),
+    num_entradas INT,
+    num_saidas INT,
+    PRIMARY KEY (data_movimentacao, codigo_produto)
+);
+
+CREATE TABLE agg_movimentacoes_mensais (
+    ano INT,
+    mes INT,
+    codigo_produto VARCHAR(20),
+    quantidade_entradas DECIMAL(10,2),
+    quantidade_saidas DECIMAL(10,2),
+    valor_entradas DECIMAL(10,2),
+    num_entradas INT,
+    num_saidas INT,
+    PRIMARY KEY (ano, mes, codigo_produto)
+);
+
 -- ÍNDICES PARA PERFORMANCE
 CREATE INDEX idx_mov_data ON fato_movimentacoes(data_movimentacao);
 CREATE INDEX idx_mov_produto ON fato_movimentacoes(codigo_produto);
@@ -241,19 +729,33 @@ SELECT
 FROM fato_estoque_atual e
 JOIN dim_produtos p ON e.codigo_produto = p.codigo_produto;
 
--- View: Movimentações mensais
+-- View: Movimentações mensais (lê os agregados, não a tabela fato inteira)
 CREATE VIEW vw_movimentacoes_mensais AS
 SELECT 
-    m.ano,
-    m.mes,
-    m.tipo_movimentacao,
+    a.ano,
+    a.mes,
+    'Entrada' as tipo_movimentacao,
     p.categoria,
-    COUNT(*) as num_movimentacoes,
-    SUM(m.quantidade_movimento) as quantidade_total,
-    SUM(m.valor_total) as valor_total
-FROM fato_movimentacoes m
-JOIN dim_produtos p ON m.codigo_produto = p.codigo_produto
-GROUP BY m.ano, m.mes, m.tipo_movimentacao, p.categoria;
+    SUM(a.num_entradas) as num_movimentacoes,
+    SUM(a.quantidade_entradas) as quantidade_total,
+    SUM(a.valor_entradas) as valor_total
+FROM agg_movimentacoes_mensais a
+JOIN dim_produtos p ON a.codigo_produto = p.codigo_produto
+WHERE a.num_entradas > 0
+GROUP BY a.ano, a.mes, p.categoria
+UNION ALL
+SELECT 
+    a.ano,
+    a.mes,
+    'Saída' as tipo_movimentacao,
+    p.categoria,
+    SUM(a.num_saidas) as num_movimentacoes,
+    -SUM(a.quantidade_saidas) as quantidade_total,
+    NULL as valor_total
+FROM agg_movimentacoes_mensais a
+JOIN dim_produtos p ON a.codigo_produto = p.codigo_produto
+WHERE a.num_saidas > 0
+GROUP BY a.ano, a.mes, p.categoria;
 
 -- View: Top produtos movimentados
 CREATE VIEW vw_top_produtos_movimentados AS
@@ -291,17 +793,40 @@ ORDER BY deficit_estoque DESC;
 
 
 if __name__ == "__main__":
-    print("\n🔄 Preparando dados para BI...")
-    
-    dados = preparar_dados_para_bi()
-    
-    print("\n📊 Estrutura de dados preparada:")
-    for nome, df in dados.items():
-        print(f"   • {nome}: {len(df)} registros, {len(df.columns)} colunas")
+    import argparse
+    parser = argparse.ArgumentParser(description="Exporta o estoque para ferramentas de BI")
+    parser.add_argument('--blocos', action='store_true',
+                        help="processa as movimentações em blocos (históricos grandes)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="exporta só as movimentações e produtos alterados desde a última vez")
+    parser.add_argument('--formato', choices=list(FORMATOS_BI),
+                        help="formato dos arquivos (padrão: CONFIG['formato_bi'])")
+    args = parser.parse_args()
     
-    # Exportar para Power BI
-    print("\n📁 Exportando para Power BI...")
-    exportar_para_power_bi(dados)
+    if args.incremental:
+        print("\n📁 Exportando para Power BI (incremental)...")
+        try:
+            exportar_para_power_bi_incremental()
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        dados = {}
+    elif args.blocos:
+        print("\n📁 Exportando para Power BI em blocos...")
+        exportar_para_power_bi_em_blocos(formato=args.formato)
+        dados = {}
+    else:
+        print("\n🔄 Preparando dados para BI...")
+        
+        dados = preparar_dados_para_bi()
+        
+        print("\n📊 Estrutura de dados preparada:")
+        for nome, df in dados.items():
+            print(f"   • {nome}: {len(df)} registros, {len(df.columns)} colunas")
+        
+        # Exportar para Power BI
+        print("\n📁 Exportando para Power BI...")
+        exportar_para_power_bi(dados, formato=args.formato)
     
     # Gerar modelo SQL
     print("\n💾 Gerando modelo SQL...")
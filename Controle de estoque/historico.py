@@ -0,0 +1,270 @@
+"""
+Histórico de Saldos - Controle de Estoque
+Fotografias mensais dos saldos por produto e consultas de saldo em uma data passada
+
+Uso:
+    python3 historico.py 31/01/2026 [--codigo P001]
+
+O saldo numa data é o fechamento mensal mais próximo anterior a ela mais as
+movimentações desde então (por data da movimentação, não de registro); o
+fechamento de um mês é gravado quando chega a primeira movimentação de um mês
+posterior (ou, num mês já passado, a primeira movimentação retroativa nele).
+Assim, uma consulta de fechamento custa as movimentações desde o último
+fechamento, e não uma releitura de todo o histórico.
+
+Movimentações com data retroativa somam-se aos fechamentos dos meses seguintes,
+que continuam corretos. Os fechamentos e totais_em() guardam só as movimentações;
+saldo_em() soma a eles o 'Estoque Inicial' do cadastro (catalogo.py), como a aba
+'Estoque Atual', então o saldo em hoje é o mesmo da planilha.
+
+Com o backend Excel, os fechamentos e os totais diários são uma projeção do
+diário (projecoes.py); com o SQLite, ficam na tabela fato_estoque_mensal.
+O checkpoint da projeção tem um arquivo por mês em 'indices/historico/' (dias,
+totais e fechamento do mês) e um cabeçalho com a posição no diário: cada
+checkpoint regrava só os meses alterados desde o anterior, não o histórico todo.
+"""
+import argparse
+import bisect
+import json
+import os
+from datetime import datetime
+
+import projecoes
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'backend': 'excel', 'pasta_indices': 'indices'}
+
+NOME = 'historico'
+
+# Checkpoint em CONFIG['pasta_indices']: PASTA/AAAA-MM.json por mês e o cabeçalho
+PASTA_CHECKPOINT = 'historico'
+ARQUIVO_CABECALHO = '_posicao.json'
+
+
+def dia_iso(data):
+    """Data da movimentação como YYYY-MM-DD (aceita DD/MM/YYYY, ISO ou datetime)"""
+    if isinstance(data, datetime):
+        return data.strftime('%Y-%m-%d')
+    texto = str(data).strip()
+    if len(texto) >= 10 and texto[4] == '-':
+        return texto[:10]
+    return datetime.strptime(texto, '%d/%m/%Y').strftime('%Y-%m-%d')
+
+
+def estado_inicial():
+    # dias/meses: totais movimentados no período; fechamentos: acumulado até o fim do mês;
+    # alterados: meses a regravar no próximo checkpoint
+    return {'dias': {}, 'meses': {}, 'fechamentos': {}, 'mes_aberto': None, 'alterados': set()}
+
+
+def _somar(totais, codigo, entradas, saidas):
+    atual = totais.setdefault(codigo, [0, 0])
+    atual[0] += entradas
+    atual[1] += saidas
+
+
+def _somar_meses(estado, totais, depois_de, ate):
+    """Acumula em `totais` os meses em (depois_de, ate] (depois_de None = desde o início)"""
+    for mes in sorted(estado['meses']):
+        if (depois_de is None or mes > depois_de) and mes <= ate:
+            for codigo, (entradas, saidas) in estado['meses'][mes].items():
+                _somar(totais, codigo, entradas, saidas)
+
+
+def _fechamento_anterior(estado, mes):
+    """Mês do fechamento mais recente antes de `mes` (ou None)"""
+    meses = sorted(estado['fechamentos'])
+    i = bisect.bisect_left(meses, mes)
+    return meses[i - 1] if i else None
+
+
+def _fechar_mes(estado, mes):
+    anterior = _fechamento_anterior(estado, mes)
+    totais = {codigo: list(t) for codigo, t in estado['fechamentos'].get(anterior, {}).items()}
+    _somar_meses(estado, totais, anterior, mes)
+    estado['fechamentos'][mes] = totais
+    estado['alterados'].add(mes)
+
+
+def aplicar(estado, registro):
+    """Soma a movimentação no dia e no mês e mantém os fechamentos mensais"""
+    dia = dia_iso(registro['data'])
+    mes = dia[:7]
+    entradas, saidas = ((registro['quantidade'], 0) if registro['aba'] == 'Entradas'
+                        else (0, registro['quantidade']))
+    _somar(estado['dias'].setdefault(dia, {}), registro['codigo'], entradas, saidas)
+    _somar(estado['meses'].setdefault(mes, {}), registro['codigo'], entradas, saidas)
+    estado['alterados'].add(mes)
+
+    aberto = estado['mes_aberto']
+    if aberto is None or mes == aberto:
+        estado['mes_aberto'] = mes
+    elif mes > aberto:
+        _fechar_mes(estado, aberto)  # primeira movimentação de um mês novo: fecha o anterior
+        estado['mes_aberto'] = mes
+    else:
+        # Data retroativa: os fechamentos a partir desse mês já contam o passado
+        for fechado, totais in estado['fechamentos'].items():
+            if fechado >= mes:
+                _somar(totais, registro['codigo'], entradas, saidas)
+                estado['alterados'].add(fechado)
+        if mes not in estado['fechamentos']:
+            _fechar_mes(estado, mes)  # mês encerrado que ainda não tinha fechamento
+
+
+def _pasta_checkpoint():
+    return os.path.join(CONFIG.get('pasta_indices', 'indices'), PASTA_CHECKPOINT)
+
+
+def _ler_json(arquivo):
+    with open(arquivo, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _gravar_json(arquivo, dados):
+    temporario = f"{arquivo}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(temporario, arquivo)
+
+
+def ler_checkpoint(nome):
+    """Estado gravado por gravar_checkpoint, ou None (ausente ou gravação interrompida)"""
+    import travas
+    pasta = _pasta_checkpoint()
+    cabecalho = os.path.join(pasta, ARQUIVO_CABECALHO)
+    try:
+        with travas.travar(cabecalho):
+            posicao = _ler_json(cabecalho)
+            estado = estado_inicial()
+            estado['mes_aberto'] = posicao['mes_aberto']
+            for mes in posicao['meses']:
+                particao = _ler_json(os.path.join(pasta, f'{mes}.json'))
+                if particao['seq'] > posicao['seq']:
+                    return None  # mês gravado sem o cabeçalho correspondente: refaz do zero
+                estado['dias'].update(particao['dias'])
+                estado['meses'][mes] = particao['totais']
+                if particao['fechamento'] is not None:
+                    estado['fechamentos'][mes] = particao['fechamento']
+        return {'estado': estado, 'seq': posicao['seq'], 'offset': posicao['offset']}
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def gravar_checkpoint(nome, estado, seq, offset):
+    """Regrava os meses alterados e, por último, o cabeçalho com a posição no diário
+
+    Se outro processo já gravou uma posição mais adiante (no mesmo diário), nada
+    é gravado: os meses em disco continuam coerentes com o cabeçalho em disco.
+    """
+    import travas
+    pasta = _pasta_checkpoint()
+    cabecalho = os.path.join(pasta, ARQUIVO_CABECALHO)
+    os.makedirs(pasta, exist_ok=True)
+    arquivo_diario = CONFIG.get('arquivo_diario', 'movimentacoes.jsonl')
+    tamanho = os.path.getsize(arquivo_diario) if os.path.exists(arquivo_diario) else 0
+    with travas.travar(cabecalho):
+        try:
+            gravada = _ler_json(cabecalho)
+            if gravada['seq'] >= seq and gravada['offset'] <= tamanho:
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+        for mes in sorted(estado['alterados']):
+            dias = {}
+            for n in range(1, 32):
+                dia = f"{mes}-{n:02d}"
+                if dia in estado['dias']:
+                    dias[dia] = estado['dias'][dia]
+            _gravar_json(os.path.join(pasta, f'{mes}.json'), {
+                'seq': seq, 'dias': dias, 'totais': estado['meses'].get(mes, {}),
+                'fechamento': estado['fechamentos'].get(mes)})
+        _gravar_json(cabecalho, {'seq': seq, 'offset': offset, 'mes_aberto': estado['mes_aberto'],
+                                 'meses': sorted(estado['meses'])})
+    estado['alterados'].clear()
+    try:
+        os.remove(os.path.join(CONFIG.get('pasta_indices', 'indices'), f'{nome}.json'))
+    except FileNotFoundError:
+        pass  # checkpoint num arquivo só (versões anteriores): não é mais lido
+
+
+def carregar():
+    """Estado do histórico, em dia com o diário"""
+    import diario
+    diario.importar_planilha()  # planilhas anteriores ao diário: histórico passa a ser contado
+    return projecoes.atualizar(NOME, aplicar, estado_inicial,
+                               ler=ler_checkpoint, gravar=gravar_checkpoint)
+
+
+def totais_em(data, codigo=None):
+    """Dicionário codigo -> [entradas, saídas] acumuladas até o fim do dia `data`"""
+    dia = dia_iso(data)
+    mes = dia[:7]
+    if CONFIG.get('backend') == 'sqlite':
+        import banco_sqlite
+        return banco_sqlite.totais_em(dia, codigo)
+
+    estado = carregar()
+    anterior = _fechamento_anterior(estado, mes)
+    fechamento = estado['fechamentos'].get(anterior, {})
+    if codigo is not None:
+        fechamento = {codigo: fechamento[codigo]} if codigo in fechamento else {}
+    totais = {c: list(t) for c, t in fechamento.items()}
+
+    # Meses entre o fechamento e a data sem fechamento próprio (ex.: o mês aberto)
+    for intermediario in sorted(estado['meses']):
+        if (anterior is None or intermediario > anterior) and intermediario < mes:
+            for c, (entradas, saidas) in estado['meses'][intermediario].items():
+                if codigo is None or c == codigo:
+                    _somar(totais, c, entradas, saidas)
+
+    # Dias do próprio mês, até a data (no máximo 31 consultas)
+    for n in range(1, int(dia[8:10]) + 1):
+        for c, (entradas, saidas) in estado['dias'].get(f"{mes}-{n:02d}", {}).items():
+            if codigo is None or c == codigo:
+                _somar(totais, c, entradas, saidas)
+    return totais
+
+
+def saldo_em(data, codigo=None):
+    """Saldo de um produto no fim do dia `data` (ou dicionário codigo -> saldo)
+
+    Estoque Inicial + entradas − saídas até a data.
+    """
+    import catalogo
+    totais = totais_em(data, codigo)
+    if codigo is not None:
+        entradas, saidas = totais.get(codigo, (0, 0))
+        return catalogo.estoque_inicial(codigo) + entradas - saidas
+    saldos = dict(catalogo.estoques_iniciais())
+    for c, (entradas, saidas) in totais.items():
+        saldos[c] = saldos.get(c, 0) + entradas - saidas
+    return saldos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Saldo de estoque em uma data passada")
+    parser.add_argument('data', help="data de referência (DD/MM/YYYY)")
+    parser.add_argument('--codigo', help="apenas um produto")
+    args = parser.parse_args()
+
+    import catalogo
+    codigo = args.codigo.upper() if args.codigo else None
+    try:
+        totais = totais_em(args.data, codigo)
+    except ValueError:
+        print(f"❌ Data inválida: '{args.data}' (use DD/MM/YYYY)")
+        raise SystemExit(1)
+    iniciais = catalogo.estoques_iniciais()
+    codigos = set(totais) | ({codigo} & set(iniciais) if codigo else set(iniciais))
+
+    print(f"\n📅 Saldos em {args.data} (movimentações até o fim do dia)\n")
+    print(f"{'Cód':<10} {'Inicial':>10} {'Entradas':>10} {'Saídas':>10} {'Saldo':>10}")
+    print("-" * 55)
+    for c in sorted(codigos):
+        inicial = iniciais.get(c, 0)
+        entradas, saidas = totais.get(c, (0, 0))
+        print(f"{c:<10} {inicial:>10} {entradas:>10} {saidas:>10} {inicial + entradas - saidas:>10}")
+    print(f"\nTotal: {len(codigos)} produtos\n")
@@ -0,0 +1,176 @@
+"""
+Importação em Lote de Movimentações - Controle de Estoque
+Registra entradas e saídas a partir de um arquivo CSV ou JSON Lines, sem prompts
+
+Uso:
+    python3 importar_movimentos.py pedido.csv [--tipo entrada|saida] [--simular]
+
+Colunas aceitas (cabeçalho do CSV ou chaves do JSON):
+    tipo (entrada/saida), data (DD/MM/YYYY ou YYYY-MM-DD), codigo, quantidade,
+    valor_unitario e documento (entradas), motivo (saídas)
+
+O arquivo é lido em fluxo e validado contra o catálogo em uma única passada;
+as linhas rejeitadas vão para '<arquivo>_rejeitados.csv' e as válidas são
+gravadas de uma só vez (uma escrita no diário ou uma transação no SQLite).
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import time
+from datetime import datetime
+
+from utils import CONFIG, salvar_lote
+
+TIPOS = {'entrada': 'Entradas', 'entradas': 'Entradas',
+         'saida': 'Saídas', 'saída': 'Saídas', 'saidas': 'Saídas', 'saídas': 'Saídas'}
+
+
+def ler_linhas(arquivo):
+    """Gera (número da linha, dicionário) de um arquivo CSV ou JSON Lines"""
+    with open(arquivo, encoding='utf-8-sig', newline='') as f:
+        if arquivo.lower().endswith(('.jsonl', '.ndjson', '.json')):
+            for n, linha in enumerate(f, start=1):
+                if linha.strip():
+                    try:
+                        dados = json.loads(linha)
+                    except ValueError:
+                        yield n, {'_erro': 'JSON inválido'}
+                        continue
+                    yield n, dados if isinstance(dados, dict) else \
+                        {'_erro': 'esperado um objeto JSON'}
+            return
+
+        cabecalho = f.readline()
+        separador = ';' if cabecalho.count(';') >= cabecalho.count(',') else ','
+        campos = [c.strip().lower() for c in next(csv.reader([cabecalho], delimiter=separador))]
+        for n, valores in enumerate(csv.reader(f, delimiter=separador), start=2):
+            if any(v.strip() for v in valores):
+                yield n, dict(zip(campos, valores))
+
+
+def _numero(valor):
+    """Número finito (aceita vírgula decimal); ValueError para NaN, infinito e true/false"""
+    if isinstance(valor, bool):
+        raise ValueError(valor)
+    if not isinstance(valor, (int, float)):
+        valor = float(str(valor).strip().replace(',', '.'))
+    if not math.isfinite(valor):
+        raise ValueError(valor)
+    return valor
+
+
+def _data(valor):
+    """Normaliza a data para DD/MM/YYYY (formato da planilha)"""
+    texto = str(valor).strip()
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(texto, formato).strftime('%d/%m/%Y')
+        except ValueError:
+            continue
+    raise ValueError(f"data inválida '{texto}'")
+
+
+def validar(linha, produtos, tipo_padrao=None):
+    """Converte uma linha do arquivo em (aba, dados) ou levanta ValueError com o motivo"""
+    if not isinstance(linha, dict):
+        raise ValueError('esperado um objeto JSON')
+    if '_erro' in linha:
+        raise ValueError(linha['_erro'])
+
+    aba = TIPOS.get(str(linha.get('tipo') or tipo_padrao or '').strip().lower())
+    if aba is None:
+        raise ValueError(f"tipo inválido '{linha.get('tipo', '')}'")
+
+    codigo = str(linha.get('codigo') or '').strip().upper()
+    if codigo not in produtos:
+        raise ValueError(f"produto '{codigo}' não cadastrado")
+
+    data = _data(linha.get('data') or '')
+
+    try:
+        quantidade = _numero(linha.get('quantidade'))
+    except (TypeError, ValueError):
+        raise ValueError(f"quantidade inválida '{linha.get('quantidade')}'")
+    if quantidade <= 0 or quantidade != int(quantidade):
+        raise ValueError(f"quantidade deve ser inteira e maior que 0 ({quantidade})")
+    quantidade = int(quantidade)
+
+    if aba == 'Saídas':
+        return aba, [data, codigo, quantidade, str(linha.get('motivo') or 'Importação em lote')]
+
+    try:
+        valor = _numero(linha.get('valor_unitario'))
+    except (TypeError, ValueError):
+        raise ValueError(f"valor unitário inválido '{linha.get('valor_unitario')}'")
+    if valor < 0:
+        raise ValueError(f"valor unitário negativo ({valor})")
+    documento = str(linha.get('documento') or '').strip() or \
+        f"NF-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    return aba, [data, documento, codigo, quantidade, valor, round(quantidade * valor, 2)]
+
+
+def importar(arquivo, tipo_padrao=None, simular=False):
+    """Valida e grava as movimentações do arquivo; retorna (aceitas, rejeitadas)"""
+    import catalogo
+    produtos = catalogo.obter_catalogo()
+
+    aceitas, rejeitadas = [], []
+    for n, linha in ler_linhas(arquivo):
+        try:
+            aceitas.append(validar(linha, produtos, tipo_padrao))
+        except ValueError as e:
+            rejeitadas.append((n, linha, str(e)))
+
+    if rejeitadas:
+        salvar_rejeitadas(arquivo, rejeitadas)
+    if aceitas and not simular and not salvar_lote(aceitas):
+        return [], rejeitadas
+    return aceitas, rejeitadas
+
+
+def salvar_rejeitadas(arquivo, rejeitadas):
+    """Grava as linhas rejeitadas, com o motivo, ao lado do arquivo importado"""
+    destino = f"{os.path.splitext(arquivo)[0]}_rejeitados.csv"
+    campos = []
+    for _, linha, _ in rejeitadas:
+        campos.extend(c for c in linha if c not in campos and c != '_erro')
+    with open(destino, 'w', encoding=CONFIG.get('encoding', 'utf-8-sig'), newline='') as f:
+        escritor = csv.writer(f, delimiter=CONFIG.get('csv_separador', ';'))
+        escritor.writerow(['linha', 'motivo_rejeicao'] + campos)
+        for n, linha, motivo in rejeitadas:
+            escritor.writerow([n, motivo] + [linha.get(c, '') for c in campos])
+    return destino
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa entradas/saídas de um CSV ou JSON Lines")
+    parser.add_argument('arquivo', help="arquivo .csv ou .jsonl com as movimentações")
+    parser.add_argument('--tipo', choices=['entrada', 'saida'],
+                        help="tipo para linhas sem a coluna 'tipo'")
+    parser.add_argument('--simular', action='store_true',
+                        help="apenas valida, sem gravar nada")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.arquivo):
+        print(f"❌ Arquivo '{args.arquivo}' não encontrado!")
+        raise SystemExit(1)
+
+    print(f"\n🔄 Importando '{args.arquivo}'...")
+    inicio = time.perf_counter()
+    aceitas, rejeitadas = importar(args.arquivo, args.tipo, args.simular)
+    duracao = time.perf_counter() - inicio
+    total = len(aceitas) + len(rejeitadas)
+
+    acao = "validadas (simulação)" if args.simular else "gravadas"
+    print(f"✅ {len(aceitas)} movimentações {acao}")
+    if rejeitadas:
+        print(f"⚠️  {len(rejeitadas)} linhas rejeitadas:")
+        for n, _, motivo in rejeitadas[:10]:
+            print(f"   • linha {n}: {motivo}")
+        if len(rejeitadas) > 10:
+            print(f"   ... e mais {len(rejeitadas) - 10}")
+        print(f"   Detalhes em: {os.path.splitext(args.arquivo)[0]}_rejeitados.csv")
+    if duracao > 0:
+        print(f"⏱️  {total} linhas em {duracao:.2f}s ({total / duracao:,.0f} linhas/s)")
@@ -0,0 +1,307 @@
+"""
+Ingestão de Leituras - Controle de Estoque
+Recebe movimentações de vários leitores de código de barras ao mesmo tempo (asyncio)
+
+Uso:
+    python3 ingestao.py [--tcp 8766] [--fifo leituras.fifo] [--pasta entrada/] [--tipo saida]
+
+Fontes (qualquer combinação, todas no mesmo processo):
+    --tcp PORTA     conexões TCP, um evento por linha; cada linha recebe uma resposta JSON
+                    {"n": linha, "seq": ...} ou {"n": linha, "erro": ...} depois de gravada
+    --fifo CAMINHO  pipe nomeado (criado com mkfifo se não existir), um evento por linha
+    --pasta PASTA   arquivos .csv/.jsonl deixados na pasta (como em importar_movimentos.py);
+                    depois de gravados vão para PASTA/processados
+
+Um evento é um objeto JSON com os campos da importação em lote (codigo, quantidade,
+tipo, data, valor_unitario, documento, motivo) ou, como envia um leitor, só
+'CODIGO' ou 'CODIGO;QUANTIDADE' (tipo --tipo, quantidade 1, data de hoje).
+
+Cada evento é validado ao chegar, contra o catálogo em memória, e entra numa fila.
+O gravador grava de uma vez tudo o que acumulou na fila enquanto a gravação
+anterior acontecia (até CONFIG['ingestao_lote_maximo'] eventos): uma escrita com
+fsync no diário, ou uma transação no SQLite. Com mais tráfego os lotes crescem, e
+o tempo entre a leitura e o saldo gravado fica em poucos milissegundos.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+from collections import deque
+from datetime import datetime
+
+from utils import CONFIG, usar_sqlite
+
+# Extensões aceitas na pasta monitorada
+EXTENSOES_PASTA = ('.csv', '.jsonl', '.ndjson', '.json')
+
+# Intervalos (segundos): varredura da pasta, releitura do catálogo e relatório
+INTERVALO_PASTA = 0.2
+INTERVALO_CATALOGO = 1.0
+INTERVALO_RELATORIO = 10.0
+
+
+def interpretar(texto):
+    """Converte uma linha recebida em dicionário (JSON ou 'CODIGO[;QUANTIDADE]')"""
+    texto = texto.strip()
+    if texto.startswith('{'):
+        try:
+            linha = json.loads(texto)
+        except ValueError:
+            return {'_erro': 'JSON inválido'}
+        return linha if isinstance(linha, dict) else {'_erro': 'esperado um objeto JSON'}
+    partes = [p.strip() for p in texto.replace(',', ';').split(';')]
+    return {'codigo': partes[0], 'quantidade': partes[1] if len(partes) > 1 else 1,
+            'motivo': 'Leitura de código de barras'}
+
+
+def gravar(movimentos):
+    """Grava o lote no backend configurado; retorna os números de sequência (ou ids)"""
+    if usar_sqlite():
+        import banco_sqlite
+        return banco_sqlite.registrar_lote(movimentos)
+    import diario
+    import saldos
+    seqs = [registro['seq'] for registro in diario.registrar_lote(movimentos)]
+    saldos.carregar()  # projeção em dia: lê só o trecho recém-gravado do diário
+    return seqs
+
+
+class Ingestao:
+    """Fila de eventos validados e o gravador que a esvazia em lotes"""
+
+    def __init__(self, tipo_padrao='saida', lote_maximo=None):
+        self.tipo_padrao = tipo_padrao
+        self.lote_maximo = lote_maximo or CONFIG.get('ingestao_lote_maximo', 500)
+        self.fila = asyncio.Queue(maxsize=self.lote_maximo * 10)
+        self.produtos = {}
+        self.hoje = datetime.now().strftime('%d/%m/%Y')
+        # Estatísticas desde o último relatório
+        self.gravados = self.rejeitados = self.lotes = 0
+        self.latencias = deque(maxlen=10000)
+
+    async def recarregar_catalogo(self):
+        import catalogo
+        self.produtos = await asyncio.to_thread(catalogo.obter_catalogo)
+        self.hoje = datetime.now().strftime('%d/%m/%Y')
+
+    async def receber(self, linha):
+        """Valida e enfileira um evento; retorna um Future com o seq gravado
+
+        Levanta ValueError (sem enfileirar) se o evento for inválido, seja qual
+        for a fonte: um evento malformado nunca derruba a ingestão.
+        """
+        from importar_movimentos import validar
+        try:
+            if not isinstance(linha, dict):
+                raise ValueError('esperado um objeto JSON')
+            movimento = validar({'data': self.hoje, **linha}, self.produtos, self.tipo_padrao)
+        except ValueError:
+            self.rejeitados += 1
+            raise
+        except Exception as e:
+            self.rejeitados += 1
+            raise ValueError(f"evento inválido: {e}") from e
+        gravado = asyncio.get_running_loop().create_future()
+        await self.fila.put((movimento, time.perf_counter(), gravado))
+        return gravado
+
+    async def gravador(self):
+        """Grava, um lote por vez, tudo o que estiver na fila"""
+        while True:
+            lote = [await self.fila.get()]
+            while len(lote) < self.lote_maximo and not self.fila.empty():
+                lote.append(self.fila.get_nowait())
+
+            try:
+                seqs = await asyncio.to_thread(gravar, [movimento for movimento, _, _ in lote])
+            except Exception as e:
+                print(f"❌ Erro ao gravar lote de {len(lote)} eventos: {e}")
+                for _, _, gravado in lote:
+                    if not gravado.done():
+                        gravado.set_exception(e)
+                continue
+
+            agora = time.perf_counter()
+            for (_, recebido, gravado), seq in zip(lote, seqs):
+                self.latencias.append(agora - recebido)
+                if not gravado.done():
+                    gravado.set_result(seq)
+            self.gravados += len(lote)
+            self.lotes += 1
+
+    async def relatorio(self, intervalo=INTERVALO_RELATORIO):
+        """Imprime periodicamente vazão, tamanho médio do lote e latência"""
+        while True:
+            await asyncio.sleep(intervalo)
+            if not (self.gravados or self.rejeitados):
+                continue
+            latencias = sorted(self.latencias)
+            p99 = latencias[int(len(latencias) * 0.99)] * 1000 if latencias else 0
+            maxima = latencias[-1] * 1000 if latencias else 0
+            print(f"📊 {self.gravados / intervalo:,.0f} eventos/s | "
+                  f"{self.gravados / max(self.lotes, 1):.1f} por lote | "
+                  f"latência p99 {p99:.1f} ms (máx {maxima:.1f} ms) | "
+                  f"{self.rejeitados} rejeitados")
+            self.gravados = self.rejeitados = self.lotes = 0
+            self.latencias.clear()
+
+    async def manter_catalogo(self, intervalo=INTERVALO_CATALOGO):
+        """Relê o catálogo quando a origem muda (produtos cadastrados com o serviço no ar)"""
+        while True:
+            await asyncio.sleep(intervalo)
+            await self.recarregar_catalogo()
+
+
+# ==================== FONTES ====================
+
+def _responder(writer, n, gravado):
+    """Callback: envia ao leitor TCP o resultado da gravação da linha n"""
+    if writer.is_closing():
+        return
+    if gravado.cancelled():
+        return
+    erro = gravado.exception()
+    resposta = {'n': n, 'erro': str(erro)} if erro else {'n': n, 'seq': gravado.result()}
+    writer.write(json.dumps(resposta, ensure_ascii=False).encode('utf-8') + b'\n')
+
+
+async def _atender_tcp(ingestao, reader, writer):
+    n = 0
+    try:
+        while linha := await reader.readline():
+            if not linha.strip():
+                continue
+            n += 1
+            try:
+                gravado = await ingestao.receber(interpretar(linha.decode('utf-8', 'replace')))
+            except ValueError as e:
+                writer.write(json.dumps({'n': n, 'erro': str(e)}, ensure_ascii=False)
+                             .encode('utf-8') + b'\n')
+                continue
+            # Sem esperar a gravação: o leitor continua enviando e as respostas
+            # saem na ordem, porque os lotes são gravados na ordem da fila
+            gravado.add_done_callback(lambda f, n=n: _responder(writer, n, f))
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def fonte_tcp(ingestao, host, porta):
+    servidor = await asyncio.start_server(
+        lambda r, w: _atender_tcp(ingestao, r, w), host, porta)
+    print(f"   📡 TCP em {host}:{porta}")
+    async with servidor:
+        await servidor.serve_forever()
+
+
+async def fonte_fifo(ingestao, caminho):
+    if not hasattr(os, 'mkfifo'):
+        print("⚠️  Pipes nomeados não são suportados neste sistema; use --tcp ou --pasta")
+        return
+    if not os.path.exists(caminho):
+        os.mkfifo(caminho)
+    print(f"   📡 Pipe nomeado em {caminho}")
+
+    # O_RDWR: o próprio processo também conta como escritor, então a abertura não
+    # bloqueia esperando um leitor e o pipe não chega ao fim quando um leitor fecha
+    pipe = os.fdopen(os.open(caminho, os.O_RDWR | os.O_NONBLOCK), 'rb', buffering=0)
+    reader = asyncio.StreamReader()
+    transporte, _ = await asyncio.get_running_loop().connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    try:
+        while linha := await reader.readline():
+            if linha.strip():
+                try:
+                    await ingestao.receber(interpretar(linha.decode('utf-8', 'replace')))
+                except ValueError as e:
+                    print(f"⚠️  {caminho}: {e}")
+    finally:
+        transporte.close()
+
+
+async def _processar_arquivo(ingestao, arquivo, processados):
+    from importar_movimentos import ler_linhas, salvar_rejeitadas
+    linhas = await asyncio.to_thread(lambda: list(ler_linhas(arquivo)))
+    pendentes, rejeitadas = [], []
+    for n, linha in linhas:
+        try:
+            pendentes.append(await ingestao.receber(linha))
+        except ValueError as e:
+            rejeitadas.append((n, linha, str(e)))
+
+    resultados = await asyncio.gather(*pendentes, return_exceptions=True)
+    falhas = [r for r in resultados if isinstance(r, Exception)]
+    if falhas:
+        print(f"❌ '{os.path.basename(arquivo)}': {len(falhas)} eventos não gravados ({falhas[0]});"
+              " o arquivo fica na pasta")
+        return False
+    if rejeitadas:
+        salvar_rejeitadas(os.path.join(processados, os.path.basename(arquivo)), rejeitadas)
+    shutil.move(arquivo, os.path.join(processados, os.path.basename(arquivo)))
+    print(f"✅ '{os.path.basename(arquivo)}': {len(pendentes)} gravadas"
+          + (f", {len(rejeitadas)} rejeitadas" if rejeitadas else ""))
+    return True
+
+
+async def fonte_pasta(ingestao, pasta, intervalo=INTERVALO_PASTA):
+    """Monitora a pasta; o remetente deve gravar com outro nome e renomear ao terminar"""
+    processados = os.path.join(pasta, 'processados')
+    os.makedirs(processados, exist_ok=True)
+    print(f"   📂 Pasta monitorada: {pasta}")
+    falhados = set()
+    while True:
+        for entrada in sorted(os.scandir(pasta), key=lambda e: e.name):
+            if (entrada.is_file() and not entrada.name.startswith('.')
+                    and entrada.name.lower().endswith(EXTENSOES_PASTA)
+                    and entrada.path not in falhados):
+                try:
+                    processado = await _processar_arquivo(ingestao, entrada.path, processados)
+                except Exception as e:
+                    print(f"❌ '{entrada.name}': {e}; o arquivo fica na pasta")
+                    processado = False
+                if not processado:
+                    falhados.add(entrada.path)
+        await asyncio.sleep(intervalo)
+
+
+async def executar(args):
+    ingestao = Ingestao(args.tipo)
+    await ingestao.recarregar_catalogo()
+    print(f"\n📥 Ingestão de leituras ({len(ingestao.produtos)} produtos, "
+          f"backend: {'sqlite' if usar_sqlite() else 'diário'}) - Ctrl+C para encerrar")
+
+    tarefas = [ingestao.gravador(), ingestao.relatorio(), ingestao.manter_catalogo()]
+    if args.tcp:
+        tarefas.append(fonte_tcp(ingestao, args.host, args.tcp))
+    if args.fifo:
+        tarefas.append(fonte_fifo(ingestao, args.fifo))
+    if args.pasta:
+        tarefas.append(fonte_pasta(ingestao, args.pasta))
+    await asyncio.gather(*tarefas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestão assíncrona de leituras de estoque")
+    parser.add_argument('--host', default=CONFIG.get('servico_host', '127.0.0.1'))
+    parser.add_argument('--tcp', type=int, metavar='PORTA',
+                        help=f"porta TCP (ex.: {CONFIG.get('ingestao_porta', 8766)})")
+    parser.add_argument('--fifo', metavar='CAMINHO', help="pipe nomeado")
+    parser.add_argument('--pasta', metavar='PASTA', help="pasta monitorada")
+    parser.add_argument('--tipo', choices=['entrada', 'saida'], default='saida',
+                        help="tipo para eventos sem o campo 'tipo' (padrão: saida)")
+    args = parser.parse_args()
+
+    if not (args.tcp or args.fifo or args.pasta):
+        args.tcp = CONFIG.get('ingestao_porta', 8766)
+
+    try:
+        asyncio.run(executar(args))
+    except FileNotFoundError:
+        print(f"❌ Arquivo '{CONFIG['arquivo_excel']}' não encontrado!")
+        print("💡 Execute: python3 gerar_planilha.py")
+        raise SystemExit(1)
+    except KeyboardInterrupt:
+        print("\n👋 Ingestão encerrada.\n")
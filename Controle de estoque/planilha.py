@@ -0,0 +1,167 @@
+"""
+Leitura da Planilha - Controle de Estoque
+Carrega as abas do Excel em uma única leitura (openpyxl em modo read-only)
+
+O resultado fica em cache, em memória e em disco (CONFIG['pasta_indices']),
+identificado pela impressão digital do arquivo (mtime e tamanho). Dashboard,
+exportação para BI e catálogo compartilham a mesma leitura: a planilha só é
+relida quando muda, e não uma vez por aba em cada script.
+"""
+import os
+import pickle
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'arquivo_excel': 'Controle_Estoque.xlsx', 'pasta_indices': 'indices'}
+
+# Abas principais, na ordem em que os scripts de análise as recebem
+ABAS = ('Base', 'Entradas', 'Saídas', 'Estoque Atual', 'Estoque Crítico')
+
+# Arquivo de cache em disco (uma planilha por vez)
+ARQUIVO_CACHE = 'planilha.pkl'
+
+# caminho absoluto -> {'impressao', 'abas': {nome: DataFrame}, 'completa'}
+_cache = {}
+
+
+def impressao_digital(arquivo):
+    """(mtime, tamanho) da planilha; levanta FileNotFoundError se ela não existir"""
+    st = os.stat(arquivo)
+    return st.st_mtime_ns, st.st_size
+
+
+def _valor_celula(valor):
+    """Mesma conversão que pd.read_excel aplica às células numéricas"""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def _linhas(ws):
+    """Gera o cabeçalho e depois as linhas de dados da aba, já normalizadas
+
+    Linhas vazias no meio são mantidas e as do final descartadas, como no pd.read_excel.
+    """
+    linhas = ws.iter_rows(values_only=True)
+    cabecalho = list(next(linhas, ()))
+    yield cabecalho
+    vazias = []
+    for linha in linhas:
+        valores = [_valor_celula(v) for v in linha[:len(cabecalho)]]
+        valores += [None] * (len(cabecalho) - len(valores))
+        if all(v is None for v in valores):
+            vazias.append(valores)
+            continue
+        yield from vazias
+        vazias = []
+        yield valores
+
+
+def ler_em_blocos(arquivo, aba, tamanho_bloco):
+    """Gera DataFrames de até `tamanho_bloco` linhas de uma aba, sem carregá-la inteira"""
+    import openpyxl
+    import pandas as pd
+    wb = openpyxl.load_workbook(arquivo, read_only=True)
+    try:
+        linhas = _linhas(wb[aba])
+        cabecalho = next(linhas)
+        bloco = []
+        for valores in linhas:
+            bloco.append(valores)
+            if len(bloco) >= tamanho_bloco:
+                yield pd.DataFrame(bloco, columns=cabecalho)
+                bloco = []
+        if bloco:
+            yield pd.DataFrame(bloco, columns=cabecalho)
+    finally:
+        wb.close()
+
+
+def _ler_abas(arquivo, abas):
+    """Lê as abas pedidas (todas, se None) abrindo o arquivo uma única vez"""
+    import openpyxl
+    import pandas as pd
+    wb = openpyxl.load_workbook(arquivo, read_only=True)
+    try:
+        resultado = {}
+        for nome in (wb.sheetnames if abas is None else abas):
+            linhas = _linhas(wb[nome])
+            cabecalho = next(linhas)
+            dados = list(linhas)
+            if dados:
+                resultado[nome] = pd.DataFrame(dados, columns=cabecalho)
+            else:
+                # Só o cabeçalho: colunas de texto vazias, como no pd.read_excel
+                resultado[nome] = pd.DataFrame(columns=cabecalho, dtype=object)
+        return resultado
+    finally:
+        wb.close()
+
+
+def _arquivo_cache():
+    return os.path.join(CONFIG.get('pasta_indices', 'indices'), ARQUIVO_CACHE)
+
+
+def _ler_cache_disco(caminho, impressao):
+    """Entrada do cache gravada por outro processo, se for da mesma versão da planilha
+
+    DataFrames gravados por outra versão do pandas/numpy podem nem ser lidos:
+    qualquer erro na leitura conta como cache vazio.
+    """
+    import pandas as pd
+    try:
+        with open(_arquivo_cache(), 'rb') as f:
+            dados = pickle.load(f)
+        if (dados['arquivo'] == caminho and dados['impressao'] == impressao
+                and dados.get('pandas') == pd.__version__):
+            return {'impressao': impressao, 'abas': dados['abas'], 'completa': dados['completa']}
+    except Exception:
+        pass
+    return {'impressao': impressao, 'abas': {}, 'completa': False}
+
+
+def _gravar_cache_disco(caminho, entrada):
+    import pandas as pd
+    arquivo = _arquivo_cache()
+    try:
+        os.makedirs(os.path.dirname(arquivo) or '.', exist_ok=True)
+        temporario = f"{arquivo}.{os.getpid()}.tmp"  # processos simultâneos não colidem
+        with open(temporario, 'wb') as f:
+            pickle.dump({'arquivo': caminho, 'pandas': pd.__version__, **entrada}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, arquivo)
+    except OSError:
+        pass  # cache em disco é opcional
+
+
+def carregar(arquivo=None, abas=None):
+    """Dicionário aba -> DataFrame, lendo a planilha só se ela mudou desde a última vez
+
+    abas: nomes das abas desejadas (todas, se None). Cada chamada recebe cópias,
+    então o consumidor pode alterar os DataFrames sem afetar o cache.
+    """
+    arquivo = arquivo or CONFIG['arquivo_excel']
+    caminho = os.path.abspath(arquivo)
+    impressao = impressao_digital(arquivo)
+
+    entrada = _cache.get(caminho)
+    if entrada is None or entrada['impressao'] != impressao:
+        entrada = _cache[caminho] = _ler_cache_disco(caminho, impressao)
+
+    faltando = None if abas is None else [a for a in abas if a not in entrada['abas']]
+    if (abas is None and not entrada['completa']) or faltando:
+        entrada['abas'].update(_ler_abas(arquivo, faltando))
+        entrada['completa'] = entrada['completa'] or abas is None
+        _gravar_cache_disco(caminho, entrada)
+
+    nomes = entrada['abas'] if abas is None else abas
+    return {nome: entrada['abas'][nome].copy() for nome in nomes}
+
+
+def descartar(arquivo=None):
+    """Esquece o cache da planilha (ou de todas, se arquivo for None)"""
+    if arquivo is None:
+        _cache.clear()
+    else:
+        _cache.pop(os.path.abspath(arquivo), None)
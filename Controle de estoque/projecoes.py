@@ -0,0 +1,119 @@
+"""
+Projeções do Diário - Controle de Estoque
+Estados derivados das movimentações (saldos, custos, agregados...) mantidos de forma incremental
+
+Cada projeção é um dicionário atualizado registro a registro por uma função
+`aplicar(estado, registro)`. O estado fica em memória e é salvo periodicamente
+em disco (checkpoint) junto com a posição no diário; uma leitura só aplica as
+movimentações gravadas depois do checkpoint, nunca o histórico inteiro.
+
+O checkpoint padrão é um único JSON por projeção. Uma projeção que cresce com o
+histórico pode fornecer as próprias funções de leitura e gravação (historico.py
+grava um arquivo por mês e regrava só os meses alterados).
+"""
+import json
+import os
+import threading
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'pasta_indices': 'indices', 'intervalo_checkpoint': 1000}
+
+# nome -> {'estado', 'seq', 'offset', 'pendentes', 'gravar'}
+_projecoes = {}
+
+# Serializa a atualização entre threads (servico.py): um registro não pode ser aplicado duas vezes
+_trava = threading.RLock()
+
+
+def _arquivo_checkpoint(nome):
+    return os.path.join(CONFIG.get('pasta_indices', 'indices'), f'{nome}.json')
+
+
+def ler_json(nome):
+    """Checkpoint padrão: {'estado', 'seq', 'offset'} do JSON da projeção, ou None"""
+    try:
+        with open(_arquivo_checkpoint(nome), encoding='utf-8') as f:
+            dados = json.load(f)
+        return {'estado': dados['estado'], 'seq': dados['seq'], 'offset': dados['offset']}
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
+def gravar_json(nome, estado, seq, offset):
+    """Checkpoint padrão: estado e posição no diário num único JSON (escrita atômica)"""
+    import travas
+    arquivo = _arquivo_checkpoint(nome)
+    os.makedirs(os.path.dirname(arquivo) or '.', exist_ok=True)
+    temporario = arquivo + '.tmp'
+    with travas.travar(arquivo):
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({'seq': seq, 'offset': offset, 'estado': estado}, f, ensure_ascii=False)
+        os.replace(temporario, arquivo)
+
+
+def _ler_checkpoint(nome, estado_inicial, ler, gravar):
+    dados = ler(nome) or {'estado': estado_inicial(), 'seq': 0, 'offset': 0}
+    return {**dados, 'pendentes': 0, 'gravar': gravar}
+
+
+def salvar_checkpoint(nome):
+    """Grava o estado atual da projeção em disco (escrita atômica)"""
+    with _trava:
+        _salvar_checkpoint(nome)
+
+
+def _salvar_checkpoint(nome):
+    proj = _projecoes.get(nome)
+    if proj is None:
+        return
+    proj['gravar'](nome, proj['estado'], proj['seq'], proj['offset'])
+    proj['pendentes'] = 0
+
+
+def atualizar(nome, aplicar, estado_inicial=dict, arquivo_diario=None,
+              ler=ler_json, gravar=gravar_json):
+    """Retorna o estado da projeção `nome` em dia com o diário
+
+    Aplica apenas os registros posteriores à última posição conhecida. A cada
+    CONFIG['intervalo_checkpoint'] registros aplicados, o checkpoint é regravado.
+    `ler(nome)` e `gravar(nome, estado, seq, offset)` trocam o checkpoint padrão.
+    """
+    with _trava:
+        return _atualizar(nome, aplicar, estado_inicial, arquivo_diario, ler, gravar)
+
+
+def _atualizar(nome, aplicar, estado_inicial, arquivo_diario, ler, gravar):
+    import diario
+    arquivo_diario = arquivo_diario or CONFIG.get('arquivo_diario', 'movimentacoes.jsonl')
+    proj = _projecoes.get(nome)
+    if proj is None:
+        proj = _projecoes[nome] = _ler_checkpoint(nome, estado_inicial, ler, gravar)
+
+    tamanho = os.path.getsize(arquivo_diario) if os.path.exists(arquivo_diario) else 0
+    if tamanho < proj['offset']:
+        # Diário recriado: refaz a projeção do zero
+        proj.update(estado=estado_inicial(), seq=0, offset=0, pendentes=0)
+    if tamanho == proj['offset']:
+        return proj['estado']
+
+    for registro, offset in diario.ler(arquivo_diario, proj['offset']):
+        if registro['seq'] > proj['seq']:
+            aplicar(proj['estado'], registro)
+            proj['seq'] = registro['seq']
+            proj['pendentes'] += 1
+        proj['offset'] = offset
+
+    if proj['pendentes'] >= CONFIG.get('intervalo_checkpoint', 1000):
+        salvar_checkpoint(nome)
+    return proj['estado']
+
+
+def descartar(nome=None):
+    """Esquece o estado em memória (de uma projeção ou de todas)"""
+    with _trava:
+        if nome is None:
+            _projecoes.clear()
+        else:
+            _projecoes.pop(nome, None)
@@ -1,11 +1,13 @@
 """Sistema de Registro de Entradas - Controle de Estoque"""
 from datetime import datetime
-from utils import *
+from utils import (cadastrar_novo_produto, carregar_catalogo, confirmar, escolher_listagem,
+                   limpar_tela, listar_produtos_completo, obter_data, obter_numero, obter_produto,
+                   pausar, salvar_na_planilha)
 
 def registrar_entrada():
     """Registra uma nova entrada"""
-    df_base = carregar_produtos()
-    if df_base is None:
+    produtos = carregar_catalogo()
+    if produtos is None:
         return False
     
     print("\n" + "="*70)
@@ -15,14 +17,15 @@ def registrar_entrada():
     # Coletar dados
     data = obter_data()
     doc = input("\n📄 Documento/NF [Enter = auto]: ").strip() or f"NF-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    codigo = obter_produto(df_base)
+    codigo = obter_produto(produtos)
     qtd = obter_numero("📦 Quantidade", minimo=0)
     valor = obter_numero("💰 Valor unitário (R$)", permitir_decimal=True, minimo=-1)
     
     # Confirmar
     print("\n" + "-"*70)
     print(f"Data: {data} | Doc: {doc} | Produto: {codigo}")
-    print(f"Quantidade: {qtd} | Valor: R$ {valor:.2f} | Total: R$ {qtd*valor:.2f}")
+    total = round(qtd * valor, 2)
+    print(f"Quantidade: {qtd} | Valor: R$ {valor:.2f} | Total: R$ {total:.2f}")
     print("-"*70)
     
     if not confirmar("Confirmar registro"):
@@ -30,10 +33,10 @@ def registrar_entrada():
         return False
     
     # Salvar
-    formula = f"=D{qtd+2}*E{qtd+2}"  # Aproximação da linha
-    if salvar_na_planilha('Entradas', [data, doc, codigo, qtd, valor, formula]):
+    # Total gravado como valor: a linha da planilha só é conhecida na sincronização
+    if salvar_na_planilha('Entradas', [data, doc, codigo, qtd, valor, total]):
         print("\n✅ ENTRADA REGISTRADA!")
-        print(f"💵 Valor Total: R$ {qtd*valor:.2f}\n")
+        print(f"💵 Valor Total: R$ {total:.2f}\n")
         return True
     return False
 
@@ -52,13 +55,12 @@ def menu():
             registrar_entrada()
             pausar()
         elif op == '2':
-            df_base = carregar_produtos()
-            if df_base is not None:
-                from utils import cadastrar_novo_produto
-                cadastrar_novo_produto(df_base)
+            produtos = carregar_catalogo()
+            if produtos is not None:
+                cadastrar_novo_produto(produtos)
             pausar()
         elif op == '3':
-            listar_produtos_completo()
+            listar_produtos_completo(**escolher_listagem())
             pausar()
         elif op == '4':
             print("\n👋 Até logo!\n")
@@ -1,20 +1,23 @@
 """Sistema de Registro de Saídas - Controle de Estoque"""
-from utils import *
-import pandas as pd
+from utils import (carregar_catalogo, confirmar, escolher_listagem, limpar_tela,
+                   listar_produtos_completo, obter_data, obter_numero, obter_produto, pausar,
+                   salvar_na_planilha, usar_sqlite)
 
 def obter_estoque(codigo):
     """Obtém estoque atual do produto"""
     try:
-        df = pd.read_excel(CONFIG['arquivo_excel'], sheet_name='Estoque Atual')
-        prod = df[df['Produto / Material'] == codigo]
-        return prod['Saldo Atual'].values[0] if not prod.empty else 0
+        if usar_sqlite():
+            import banco_sqlite
+            return banco_sqlite.obter_saldo(codigo)
+        import saldos
+        return saldos.obter_saldo(codigo)
     except:
         return None
 
 def registrar_saida():
     """Registra uma nova saída"""
-    df_base = carregar_produtos()
-    if df_base is None:
+    produtos = carregar_catalogo()
+    if produtos is None:
         return False
     
     print("\n" + "="*70)
@@ -23,7 +26,7 @@ def registrar_saida():
     
     # Coletar dados
     data = obter_data()
-    codigo = obter_produto(df_base)
+    codigo = obter_produto(produtos)
     
     estoque = obter_estoque(codigo)
     if estoque is not None and estoque > 0:
@@ -79,7 +82,7 @@ def menu():
             registrar_saida()
             pausar()
         elif op == '2':
-            listar_produtos_completo(com_estoque=True)
+            listar_produtos_completo(com_estoque=True, **escolher_listagem(com_estoque=True))
             pausar()
         elif op == '3':
             print("\n👋 Até logo!\n")
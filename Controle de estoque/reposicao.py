@@ -0,0 +1,163 @@
+"""
+Reposição de Estoque - Controle de Estoque
+Ponto de pedido, dias de cobertura e sugestão de compra por fornecedor
+
+Uso:
+    python3 reposicao.py [--data DD/MM/YYYY] [--janela 90] [--fornecedor NOME] [--csv arquivo.csv]
+
+O consumo de cada produto é a média diária das saídas numa janela móvel que
+termina na data de referência (CONFIG['janela_consumo_dias']), e a variação
+dia a dia vira estoque de segurança para o prazo de entrega do fornecedor:
+
+    ponto de pedido = consumo × prazo + z × desvio × √prazo  (no mínimo o 'Estoque Mínimo')
+    sugestão        = ponto de pedido + consumo × dias de cobertura alvo − saldo
+
+As saídas da janela vêm dos totais diários por produto (agregados.py), que já
+são mantidos a cada movimentação: o cálculo lê só os dias da janela, nunca o
+histórico inteiro, e as contas são vetorizadas sobre todos os produtos.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'backend': 'excel', 'janela_consumo_dias': 90, 'prazo_entrega_dias': 7,
+              'prazo_entrega_fornecedor': {}, 'dias_cobertura_alvo': 30, 'nivel_servico_z': 1.65}
+
+COLUNAS = ['codigo', 'nome', 'fornecedor', 'saldo', 'estoque_minimo', 'consumo_diario',
+           'desvio_diario', 'prazo_dias', 'estoque_seguranca', 'ponto_pedido',
+           'dias_cobertura', 'quantidade_sugerida', 'valor_estimado']
+
+
+def saidas_na_janela(inicio, fim):
+    """(códigos, quantidades) das saídas diárias por produto entre `inicio` e `fim` (date, inclusivos)
+
+    Cada par (dia, produto) aparece uma vez, com o total do dia.
+    """
+    if CONFIG.get('backend') == 'sqlite':
+        import banco_sqlite
+        dias = banco_sqlite.carregar_agregados('dia', desde=inicio.isoformat(), ate=fim.isoformat())
+        dias = dias[dias['quantidade_saidas'] > 0]
+        return dias['codigo_produto'].tolist(), dias['quantidade_saidas'].to_numpy(float)
+
+    import agregados
+    estado = agregados.carregar()
+    codigos, quantidades = [], []
+    for n in range((fim - inicio).days + 1):
+        for codigo, totais in estado['dias'].get((inicio + timedelta(days=n)).isoformat(), {}).items():
+            if totais[1]:
+                codigos.append(codigo)
+                quantidades.append(totais[1])
+    return codigos, np.asarray(quantidades, dtype=float)
+
+
+def calcular(produtos, saldos, codigos_saidas, quantidades, janela):
+    """Indicadores de reposição de todos os produtos (DataFrame com COLUNAS)
+
+    produtos: catálogo codigo -> Produto; saldos: codigo -> saldo atual;
+    codigos_saidas/quantidades: saídas diárias da janela (saidas_na_janela).
+    """
+    import pandas as pd
+    tabela = pd.DataFrame.from_records(
+        [(p.codigo, p.nome, p.fornecedor, p.estoque_minimo, p.valor_unitario)
+         for p in produtos.values()],
+        columns=['codigo', 'nome', 'fornecedor', 'estoque_minimo', 'valor_unitario'])
+    tabela['fornecedor'] = tabela['fornecedor'].fillna('N/D')
+    n = len(tabela)
+    posicao = pd.Index(tabela['codigo'])
+
+    # Soma e soma dos quadrados das saídas diárias por produto, de uma vez
+    indices = posicao.get_indexer(pd.Index(codigos_saidas, dtype=object))
+    conhecidos = indices >= 0
+    indices, quantidades = indices[conhecidos], np.asarray(quantidades, dtype=float)[conhecidos]
+    soma = np.bincount(indices, weights=quantidades, minlength=n)
+    quadrados = np.bincount(indices, weights=quantidades ** 2, minlength=n)
+    consumo = soma / janela
+    desvio = np.sqrt(np.maximum(quadrados / janela - consumo ** 2, 0))
+
+    saldo = pd.Series(saldos, dtype=float).reindex(posicao).fillna(0).to_numpy(float)
+    minimo = pd.to_numeric(tabela['estoque_minimo'], errors='coerce').fillna(0).to_numpy(float)
+    valor = pd.to_numeric(tabela['valor_unitario'], errors='coerce').fillna(0).to_numpy(float)
+    por_fornecedor = CONFIG.get('prazo_entrega_fornecedor') or {}
+    prazo = tabela['fornecedor'].map(por_fornecedor).fillna(
+        CONFIG.get('prazo_entrega_dias', 7)).to_numpy(float)
+
+    seguranca = CONFIG.get('nivel_servico_z', 1.65) * desvio * np.sqrt(prazo)
+    ponto = np.maximum(np.ceil(consumo * prazo + seguranca), minimo)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cobertura = np.where(consumo > 0, saldo / consumo, np.inf)
+    alvo = ponto + consumo * CONFIG.get('dias_cobertura_alvo', 30)
+    sugerida = np.where(saldo <= ponto, np.maximum(np.ceil(alvo - saldo), 0), 0)
+
+    tabela = tabela.assign(
+        saldo=saldo, estoque_minimo=minimo, consumo_diario=consumo.round(3),
+        desvio_diario=desvio.round(3), prazo_dias=prazo, estoque_seguranca=np.ceil(seguranca),
+        ponto_pedido=ponto, dias_cobertura=cobertura.round(1), quantidade_sugerida=sugerida,
+        valor_estimado=(sugerida * valor).round(2))
+    return tabela[COLUNAS]
+
+
+def sugestoes(data=None, janela=None):
+    """Indicadores de reposição na data (datetime; padrão: hoje) para todo o catálogo"""
+    import catalogo
+    import utils
+    fim = (data or datetime.now()).date()
+    janela = janela or CONFIG.get('janela_consumo_dias', 90)
+    codigos, quantidades = saidas_na_janela(fim - timedelta(days=janela - 1), fim)
+    return calcular(catalogo.obter_catalogo(), utils.saldos_atuais(), codigos, quantidades, janela)
+
+
+def pedidos(tabela):
+    """Só os produtos a repor, agrupados por fornecedor: {fornecedor: DataFrame}"""
+    repor = tabela[tabela['quantidade_sugerida'] > 0].sort_values(['fornecedor', 'dias_cobertura'])
+    return {fornecedor: itens for fornecedor, itens in repor.groupby('fornecedor', sort=True)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sugestão de reposição por fornecedor")
+    parser.add_argument('--data', help="data de referência (DD/MM/YYYY; padrão: hoje)")
+    parser.add_argument('--janela', type=int, help="dias de histórico de saídas considerados")
+    parser.add_argument('--fornecedor', help="apenas um fornecedor")
+    parser.add_argument('--csv', help="grava as sugestões neste arquivo CSV")
+    args = parser.parse_args()
+
+    try:
+        data = datetime.strptime(args.data, '%d/%m/%Y') if args.data else None
+    except ValueError:
+        print(f"❌ Data inválida: '{args.data}' (use DD/MM/YYYY)")
+        raise SystemExit(1)
+
+    inicio = time.perf_counter()
+    tabela = sugestoes(data, args.janela)
+    duracao = time.perf_counter() - inicio
+    calculados = len(tabela)
+    if args.fornecedor:
+        tabela = tabela[tabela['fornecedor'] == args.fornecedor]
+    grupos = pedidos(tabela)
+
+    janela = args.janela or CONFIG.get('janela_consumo_dias', 90)
+    print(f"\n🛒 Sugestão de reposição (consumo dos últimos {janela} dias; "
+          f"{calculados} produtos calculados em {duracao * 1000:.0f} ms)\n")
+    if not grupos:
+        print("✅ Nenhum produto abaixo do ponto de pedido\n")
+    for fornecedor, itens in grupos.items():
+        print(f"🏭 {fornecedor} (prazo {itens['prazo_dias'].iloc[0]:.0f} dias): "
+              f"{len(itens)} produto(s), R$ {itens['valor_estimado'].sum():,.2f}")
+        print(f"   {'Cód':<8} {'Nome':<28} {'Saldo':>8} {'Consumo/dia':>12} {'Cobertura':>10} "
+              f"{'Ponto':>8} {'Pedir':>8}")
+        for item in itens.itertuples():
+            cobertura = '-' if np.isinf(item.dias_cobertura) else f"{item.dias_cobertura:.0f} d"
+            print(f"   {item.codigo:<8} {str(item.nome)[:28]:<28} {item.saldo:>8.0f} "
+                  f"{item.consumo_diario:>12.2f} {cobertura:>10} {item.ponto_pedido:>8.0f} "
+                  f"{item.quantidade_sugerida:>8.0f}")
+        print()
+
+    if args.csv:
+        repor = tabela[tabela['quantidade_sugerida'] > 0]
+        repor.to_csv(args.csv, index=False, sep=CONFIG.get('csv_separador', ';'),
+                     decimal=CONFIG.get('csv_decimal', ','), encoding=CONFIG.get('encoding', 'utf-8-sig'))
+        print(f"💾 {len(repor)} sugestões gravadas em {args.csv}\n")
@@ -0,0 +1,96 @@
+"""
+Saldos de Estoque - Controle de Estoque
+Saldo por produto mantido a cada entrada/saída, sem fórmulas SUMIF na planilha
+
+Com o backend Excel, os saldos são uma projeção do diário (projecoes.py);
+com o backend SQLite, ficam na tabela fato_estoque_atual (banco_sqlite.py).
+O valor comprado de cada produto é acumulado da mesma forma (projeção 'valores'),
+então avaliar o estoque não exige somar a coluna de totais da aba 'Entradas'.
+
+O saldo é 'Estoque Inicial' + entradas − saídas, como na aba 'Estoque Atual':
+o estoque inicial vem do cadastro em cache (catalogo.estoques_iniciais), já
+que não passa pelo diário.
+"""
+import diario
+import projecoes
+
+NOME = 'saldos'
+NOME_VALORES = 'valores'
+
+
+def aplicar(estado, registro):
+    """Acumula uma movimentação: estado[codigo] = [total_entradas, total_saidas]"""
+    totais = estado.setdefault(registro['codigo'], [0, 0])
+    if registro['aba'] == 'Entradas':
+        totais[0] += registro['quantidade']
+    else:
+        totais[1] += registro['quantidade']
+
+
+def carregar():
+    """Dicionário codigo -> [total_entradas, total_saidas], em dia com o diário"""
+    diario.importar_planilha()  # planilhas anteriores ao diário: histórico passa a ser contado
+    return projecoes.atualizar(NOME, aplicar)
+
+
+def obter_totais(codigo):
+    """(total de entradas, total de saídas, saldo) do produto"""
+    import catalogo
+    entradas, saidas = carregar().get(codigo, (0, 0))
+    return entradas, saidas, catalogo.estoque_inicial(codigo) + entradas - saidas
+
+
+def saldos_atuais():
+    """Dicionário codigo -> saldo (estoque inicial + entradas − saídas)"""
+    import catalogo
+    atuais = dict(catalogo.estoques_iniciais())
+    for codigo, (entradas, saidas) in carregar().items():
+        atuais[codigo] = atuais.get(codigo, 0) + entradas - saidas
+    return atuais
+
+
+def aplicar_valor(estado, registro):
+    """Acumula o custo das entradas: estado[codigo] = [quantidade_comprada, valor_comprado]"""
+    if registro['aba'] != 'Entradas':
+        return
+    totais = estado.setdefault(registro['codigo'], [0, 0])
+    totais[0] += registro['quantidade']
+    totais[1] = round(totais[1] + (diario.valor_total(registro) or 0), 2)
+
+
+def carregar_valores():
+    """Dicionário codigo -> [quantidade_comprada, valor_comprado], em dia com o diário"""
+    diario.importar_planilha()
+    return projecoes.atualizar(NOME_VALORES, aplicar_valor)
+
+
+def obter_valores(codigo):
+    """(quantidade comprada, valor comprado, custo médio de compra) do produto"""
+    quantidade, valor = carregar_valores().get(codigo, (0, 0))
+    return quantidade, valor, round(valor / quantidade, 4) if quantidade else 0
+
+
+def obter_saldo(codigo):
+    """Saldo atual do produto"""
+    return obter_totais(codigo)[2]
+
+
+def listar_criticos():
+    """Produtos do catálogo com saldo abaixo do estoque mínimo"""
+    import catalogo
+    totais = carregar()
+    iniciais = catalogo.estoques_iniciais()
+    criticos = []
+    for produto in catalogo.obter_catalogo().values():
+        entradas, saidas = totais.get(produto.codigo, (0, 0))
+        saldo = iniciais.get(produto.codigo, 0) + entradas - saidas
+        minimo = produto.estoque_minimo or 0
+        if saldo < minimo:
+            criticos.append({'codigo': produto.codigo, 'nome': produto.nome, 'saldo': saldo,
+                             'estoque_minimo': minimo, 'deficit': minimo - saldo})
+    return criticos
+
+
+def status(saldo, estoque_minimo):
+    """Texto de status usado na aba 'Estoque Crítico'"""
+    return "⚠️ REPOR" if saldo < (estoque_minimo or 0) else "✓ OK"
@@ -0,0 +1,224 @@
+"""
+Serviço HTTP/JSON - Controle de Estoque
+Expõe registro de movimentações e consultas de estoque para leitores e ERPs
+
+Uso:
+    python3 servico.py [--host 127.0.0.1] [--porta 8765]
+
+Rotas:
+    POST /entradas          {"codigo", "quantidade", "valor_unitario", "data"?, "documento"?}
+    POST /saidas            {"codigo", "quantidade", "motivo"?, "data"?}
+    GET  /saldo/<codigo>    totais de entradas/saídas e saldo do produto
+    GET  /criticos          produtos abaixo do estoque mínimo
+
+Os POSTs aceitam um objeto ou uma lista de objetos (gravados de uma só vez).
+O serviço mantém o armazenamento aberto: saldos e catálogo ficam em memória
+(projeção do diário) e, com SQLite, cada thread do pool reaproveita sua conexão.
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from utils import CONFIG, usar_sqlite
+
+# Rota de POST -> tipo de movimentação (importar_movimentos.TIPOS)
+ROTAS_MOVIMENTO = {'/entradas': 'entrada', '/saidas': 'saida'}
+
+# Maior corpo aceito em um POST (bytes)
+TAMANHO_MAXIMO = 1024 * 1024
+
+
+def registrar(tipo, itens):
+    """Valida e grava movimentações; retorna os números de sequência (ou ids no SQLite)
+
+    Levanta ValueError (com o número do item) se qualquer item for inválido:
+    o lote é gravado inteiro ou não é gravado. O tipo é o da rota; um "tipo"
+    diferente no corpo é rejeitado.
+    """
+    import catalogo
+    from importar_movimentos import TIPOS, validar
+    produtos = catalogo.obter_catalogo()
+    hoje = datetime.now().strftime('%d/%m/%Y')
+
+    movimentos = []
+    for n, item in enumerate(itens, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"item {n}: esperado um objeto JSON")
+        try:
+            informado = str(item.get('tipo') or '').strip().lower()
+            if informado and TIPOS.get(informado) != TIPOS[tipo]:
+                raise ValueError(f"tipo '{item['tipo']}' não corresponde à rota ({tipo})")
+            movimentos.append(validar({'data': hoje, **item, 'tipo': tipo}, produtos))
+        except ValueError as e:
+            raise ValueError(f"item {n}: {e}" if len(itens) > 1 else str(e))
+
+    if usar_sqlite():
+        import banco_sqlite
+        return banco_sqlite.registrar_lote(movimentos)
+    import diario
+    return [registro['seq'] for registro in diario.registrar_lote(movimentos)]
+
+
+def consultar_saldo(codigo):
+    """Totais do produto, ou None se o código não estiver cadastrado"""
+    import catalogo
+    produto = catalogo.buscar(codigo)
+    if produto is None:
+        return None
+    if usar_sqlite():
+        import banco_sqlite
+        entradas, saidas, saldo = banco_sqlite.obter_totais(codigo)
+    else:
+        import saldos
+        entradas, saidas, saldo = saldos.obter_totais(codigo)
+    minimo = produto.estoque_minimo or 0
+    return {'codigo': codigo, 'nome': produto.nome, 'entradas': entradas, 'saidas': saidas,
+            'saldo': saldo, 'estoque_minimo': minimo,
+            'status': 'Crítico' if saldo < minimo else 'Normal'}
+
+
+def listar_criticos():
+    """Produtos abaixo do mínimo, do backend configurado"""
+    if usar_sqlite():
+        import banco_sqlite
+        return banco_sqlite.listar_criticos()
+    import saldos
+    return saldos.listar_criticos()
+
+
+class Requisicao(BaseHTTPRequestHandler):
+    """Trata uma requisição HTTP (conexões persistentes, HTTP/1.1)"""
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ControleEstoque/1.0'
+    timeout = 15  # conexão ociosa é fechada e libera a thread do pool
+    disable_nagle_algorithm = True  # cabeçalho e corpo saem sem esperar o ACK do cliente
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _executar(self, acao):
+        """Executa a ação convertendo exceções em respostas de erro"""
+        try:
+            self._responder(*acao())
+        except ValueError as e:
+            self._responder(400, {'erro': str(e)})
+        except TimeoutError as e:
+            self._responder(503, {'erro': str(e)})
+        except Exception as e:
+            self.log_error("erro interno: %r", e)
+            self._responder(500, {'erro': 'erro interno'})
+
+    def do_GET(self):
+        def acao():
+            caminho = self.path.split('?', 1)[0].rstrip('/')
+            if caminho.startswith('/saldo/'):
+                codigo = caminho[len('/saldo/'):].strip().upper()
+                saldo = consultar_saldo(codigo)
+                if saldo is None:
+                    return 404, {'erro': f"produto '{codigo}' não cadastrado"}
+                return 200, saldo
+            if caminho == '/criticos':
+                criticos = listar_criticos()
+                return 200, {'total': len(criticos), 'produtos': criticos}
+            return 404, {'erro': 'rota inexistente'}
+        self._executar(acao)
+
+    def do_POST(self):
+        def acao():
+            tipo = ROTAS_MOVIMENTO.get(self.path.split('?', 1)[0].rstrip('/'))
+            tamanho = int(self.headers.get('Content-Length') or 0)
+            if tamanho > TAMANHO_MAXIMO:
+                return 413, {'erro': 'corpo da requisição muito grande'}
+            corpo = self.rfile.read(tamanho)
+            if tipo is None:
+                return 404, {'erro': 'rota inexistente'}
+            try:
+                itens = json.loads(corpo or b'null')
+            except ValueError:
+                raise ValueError('JSON inválido')
+            itens = itens if isinstance(itens, list) else [itens]
+            if not itens:
+                raise ValueError('nenhuma movimentação enviada')
+            ids = registrar(tipo, itens)
+            return 201, {'gravadas': len(ids), 'ids': ids}
+        self._executar(acao)
+
+    def log_message(self, formato, *args):
+        pass  # sem log por requisição (só erros, via log_error)
+
+    def log_error(self, formato, *args):
+        BaseHTTPRequestHandler.log_message(self, formato, *args)
+
+
+class ServidorEstoque(HTTPServer):
+    """Servidor HTTP com um pool fixo de threads
+
+    Com threads fixas, as conexões SQLite (uma por thread) são abertas uma vez
+    e reaproveitadas, em vez de uma thread e uma conexão novas por requisição.
+    """
+
+    def __init__(self, endereco, threads):
+        super().__init__(endereco, Requisicao)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='estoque')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._atender, request, client_address)
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def aquecer():
+    """Carrega catálogo e saldos antes da primeira requisição"""
+    import catalogo
+    inicio = time.perf_counter()
+    produtos = catalogo.obter_catalogo()
+    if not usar_sqlite():
+        import saldos
+        saldos.carregar()
+    return len(produtos), time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço HTTP/JSON do controle de estoque")
+    parser.add_argument('--host', default=CONFIG.get('servico_host', '127.0.0.1'))
+    parser.add_argument('--porta', type=int, default=CONFIG.get('servico_porta', 8765))
+    parser.add_argument('--threads', type=int, default=CONFIG.get('servico_threads', 8))
+    args = parser.parse_args()
+
+    try:
+        n, duracao = aquecer()
+    except FileNotFoundError:
+        print(f"❌ Arquivo '{CONFIG['arquivo_excel']}' não encontrado!")
+        print("💡 Execute: python3 gerar_planilha.py")
+        raise SystemExit(1)
+
+    servidor = ServidorEstoque((args.host, args.porta), args.threads)
+    print(f"\n🌐 Serviço de estoque em http://{args.host}:{args.porta}")
+    print(f"   {n} produtos carregados em {duracao * 1000:.0f} ms "
+          f"(backend: {'sqlite' if usar_sqlite() else 'diário'})")
+    print("   POST /entradas   POST /saidas   GET /saldo/<codigo>   GET /criticos")
+    print("   Ctrl+C para encerrar\n")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Serviço encerrado.\n")
+    finally:
+        servidor.server_close()
@@ -0,0 +1,54 @@
+"""
+Fixtures dos testes - Controle de Estoque
+
+Cada teste roda numa pasta temporária com uma planilha nova (gerar_planilha.py):
+diário, índices e caches em disco ficam nessa pasta, e os caches em memória dos
+módulos são descartados antes e depois do teste.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import catalogo  # noqa: E402
+import planilha  # noqa: E402
+import projecoes  # noqa: E402
+
+PRODUTOS = [
+    ('P001', 'Parafuso M6', 'Parafuso sextavado 6mm', 'Fixação', 100, 0.5, 'Parafusos Brasil', 'A1'),
+    ('P002', 'Tinta Branca 18L', 'Tinta acrílica branca', 'Pintura', 5, 85.0, 'Tintas Color', 'B3'),
+    ('P003', 'Lixa Grão 100', 'Lixa para madeira', 'Acabamento', 5, 2.3, 'Abrasivos Sul', 'C2'),
+]
+
+# Estoque inicial (coluna B da aba 'Estoque Atual')
+INICIAIS = {'P001': 0, 'P002': 0, 'P003': 8}
+
+
+def _descartar_caches():
+    banco = sys.modules.get('banco_sqlite')
+    if banco is not None:
+        for con in banco._local.__dict__.pop('conexoes', {}).values():
+            con.close()
+    projecoes.descartar()
+    planilha.descartar()
+    catalogo._cache.update(impressao=None, produtos={}, iniciais={})
+
+
+@pytest.fixture
+def estoque(tmp_path, monkeypatch):
+    """Pasta temporária com uma planilha cadastrada (PRODUTOS e INICIAIS)"""
+    import openpyxl
+    from gerar_planilha import criar_planilha_estoque
+    monkeypatch.chdir(tmp_path)
+    _descartar_caches()
+    criar_planilha_estoque()
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    for produto in PRODUTOS:
+        wb['Base'].append(produto)
+        inicial = INICIAIS[produto[0]]
+        wb['Estoque Atual'].append([produto[0], inicial, 0, 0, inicial])
+    wb.save('Controle_Estoque.xlsx')
+    yield tmp_path
+    _descartar_caches()
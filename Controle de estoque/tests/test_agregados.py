@@ -0,0 +1,41 @@
+"""Totais diários e mensais mantidos a cada movimentação (diário e SQLite)"""
+import pandas as pd
+
+import agregados
+import banco_sqlite
+import diario
+
+MOVIMENTOS = [('Entradas', ['05/01/2026', 'NF-1', 'P001', 10, 0.5, None]),
+              ('Entradas', ['05/01/2026', 'NF-2', 'P001', 4, 0.5, None]),
+              ('Saídas', ['06/01/2026', 'P003', 2, 'Uso']),
+              ('Saídas', ['07/02/2026', 'P001', 3, 'Uso'])]
+
+
+def test_totais_por_dia_e_mes(estoque):
+    diario.registrar_lote(MOVIMENTOS)
+
+    mensal = agregados.tabela('mes').set_index(['ano', 'mes', 'codigo_produto'])
+    assert list(mensal.loc[(2026, 1, 'P001')]) == [14, 0, 7.0, 2, 0]
+    assert list(mensal.loc[(2026, 2, 'P001')]) == [0, 3, 0, 0, 1]
+    assert len(agregados.tabela('dia')) == 3
+    assert list(agregados.por_produto().loc['P001']) == [14, 3, 7.0, 2, 1]
+
+
+def test_sqlite_igual_ao_diario_e_ao_recalculo(estoque, monkeypatch):
+    diario.registrar_lote(MOVIMENTOS)
+    esperado = {periodo: agregados.tabela(periodo) for periodo in ('dia', 'mes')}
+    categorias = agregados.por_categoria()
+
+    banco_sqlite.importar_planilha()
+    monkeypatch.setitem(agregados.CONFIG, 'backend', 'sqlite')
+    mantidos = {periodo: agregados.tabela(periodo) for periodo in ('dia', 'mes')}
+    banco_sqlite.recalcular_agregados(banco_sqlite.conectar())
+    for periodo in ('dia', 'mes'):
+        pd.testing.assert_frame_equal(mantidos[periodo], esperado[periodo], check_dtype=False)
+        pd.testing.assert_frame_equal(agregados.tabela(periodo), esperado[periodo],
+                                      check_dtype=False)
+
+    visao = pd.read_sql_query("SELECT * FROM vw_movimentacoes_mensais", banco_sqlite.conectar())
+    visao = visao.sort_values(['ano', 'mes', 'tipo_movimentacao', 'categoria'], ignore_index=True)
+    categorias['valor_total'] = categorias['valor_total'].astype(float)  # None das saídas -> NaN
+    pd.testing.assert_frame_equal(categorias, visao, check_dtype=False)
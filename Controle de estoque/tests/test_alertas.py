@@ -0,0 +1,69 @@
+"""Alertas de estoque mínimo: deduplicação, intervalo e limite sem perder alertas"""
+import time
+
+import pytest
+
+import alertas
+import diario
+
+
+@pytest.fixture
+def enviados(estoque, monkeypatch):
+    """Alertas entregues durante o teste (saída única em memória)"""
+    lista = []
+    monkeypatch.setitem(alertas.SAIDAS, 'teste', lista.append)
+    monkeypatch.setitem(alertas.CONFIG, 'saidas_alerta', ['teste'])
+    monkeypatch.setitem(alertas.CONFIG, 'alertas_ativos', True)
+    monkeypatch.setitem(alertas.CONFIG, 'intervalo_repeticao_alerta', 3600)
+    monkeypatch.setitem(alertas.CONFIG, 'alertas_por_minuto', 30)
+    monkeypatch.setattr(alertas, '_vencimento', [None])
+    return lista
+
+
+def tipos(lista):
+    return [(a['codigo'], a['tipo']) for a in lista]
+
+
+def test_alerta_barrado_pelo_intervalo_sai_depois(enviados, monkeypatch):
+    monkeypatch.setitem(alertas.CONFIG, 'intervalo_repeticao_alerta', 1)
+    diario.registrar('Saídas', ['05/01/2026', 'P003', 4, 'Uso'])              # 8 -> 4
+    diario.registrar('Entradas', ['05/01/2026', 'NF-1', 'P003', 2, 2.0, None])  # 4 -> 6
+    diario.registrar('Saídas', ['05/01/2026', 'P003', 2, 'Uso'])              # 6 -> 4
+    assert tipos(enviados) == [('P003', 'critico'), ('P003', 'normalizado')]
+
+    time.sleep(1.1)
+    diario.registrar('Saídas', ['06/01/2026', 'P002', 0, 'Uso'])  # qualquer gravação
+    assert tipos(enviados)[-1] == ('P003', 'critico')
+    assert enviados[-1]['saldo'] == 4
+
+
+def test_alerta_adiado_descartado_se_produto_volta(enviados):
+    diario.registrar('Saídas', ['05/01/2026', 'P003', 4, 'Uso'])
+    diario.registrar('Entradas', ['05/01/2026', 'NF-1', 'P003', 2, 2.0, None])
+    diario.registrar('Saídas', ['05/01/2026', 'P003', 2, 'Uso'])  # crítico adiado
+    diario.registrar('Entradas', ['05/01/2026', 'NF-2', 'P003', 2, 2.0, None])  # normalizado de novo
+
+    alertas._vencimento[0] = 0
+    assert alertas.notificar([]) == []
+    assert tipos(enviados) == [('P003', 'critico'), ('P003', 'normalizado')]
+
+
+def test_limite_por_minuto_adia_sem_perder(enviados, monkeypatch):
+    monkeypatch.setitem(alertas.CONFIG, 'alertas_por_minuto', 1)
+    diario.registrar('Entradas', ['05/01/2026', 'NF-1', 'P002', 10, 85.0, None])
+    diario.registrar_lote([('Saídas', ['05/01/2026', 'P003', 4, 'Uso']),
+                           ('Saídas', ['05/01/2026', 'P002', 6, 'Uso'])])
+    assert len(enviados) == 1
+
+    monkeypatch.setitem(alertas.CONFIG, 'alertas_por_minuto', 2)
+    alertas._vencimento[0] = 0
+    alertas.notificar([])
+    assert sorted(tipos(enviados)) == [('P002', 'critico'), ('P003', 'critico')]
+
+
+def test_cruzamento_mais_antigo_e_ignorado(enviados):
+    diario.registrar('Saídas', ['05/01/2026', 'P003', 4, 'Uso'])
+    atrasado = dict(enviados[0], tipo='normalizado', seq=enviados[0]['seq'] - 1)
+
+    assert alertas.notificar([atrasado]) == []
+    assert tipos(enviados) == [('P003', 'critico')]
@@ -0,0 +1,93 @@
+"""Dashboards sem tela: redesenhados só quando os dados mudam"""
+import os
+
+import pytest
+
+import analise_dashboard
+import diario
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('seaborn')
+
+
+@pytest.fixture
+def desenhos(estoque, monkeypatch):
+    """Dashboards desenhados durante o teste (arquivos de destino)"""
+    lista = []
+    original = analise_dashboard.desenhar_dashboard
+    monkeypatch.setattr(analise_dashboard, 'desenhar_dashboard',
+                        lambda paineis, arquivo, mostrar=False:
+                        lista.append(arquivo) or original(paineis, arquivo, mostrar))
+    return lista
+
+
+def test_dashboard_sem_tela_redesenhado_so_com_dados_novos(desenhos):
+    def gerar():
+        return analise_dashboard.gerar_dashboard(*analise_dashboard.carregar_dados(),
+                                                 arquivo='dashboard.png', mostrar=False)
+    gerar()
+    assert len(desenhos) == 1 and os.path.getsize('dashboard.png') > 0
+
+    gerar()
+    assert len(desenhos) == 1  # mesmos dados: imagem do cache
+
+    diario.registrar('Saídas', ['05/01/2026', 'P003', 1, 'Uso'])
+    gerar()
+    assert len(desenhos) == 2
+    assert os.path.samefile('dashboard.png', desenhos[-1])
+
+
+def test_dashboards_por_categoria_em_paralelo(estoque):
+    base, _, _, estoque_atual, critico = analise_dashboard.carregar_dados()
+
+    def gerar():
+        return analise_dashboard.gerar_dashboards_por_grupo(base, estoque_atual, critico,
+                                                            pasta='dashboards', processos=2)
+    assert gerar() == (3, 0)
+    assert sorted(os.listdir('dashboards/tipo_de_produto')) == [
+        'dashboard_acabamento.png', 'dashboard_fixacao.png', 'dashboard_pintura.png']
+    assert gerar() == (0, 3)
+
+
+def test_top_n_com_fatia_outros(estoque):
+    diario.registrar_lote([('Entradas', ['05/01/2026', 'NF-1', 'P001', 40, 0.5, None]),
+                           ('Entradas', ['05/01/2026', 'NF-2', 'P002', 2, 85.0, None])])
+    base, _, _, estoque_atual, critico = analise_dashboard.carregar_dados()
+    import agregados
+    paineis = analise_dashboard._paineis(base, estoque_atual, critico, agregados.por_produto(),
+                                         'teste', top=1)
+
+    assert paineis['produtos'] == ['Parafuso M6'] and paineis['saldos'] == [40]
+    assert paineis['produtos_valor'] == ['Tinta Branca 18L', 'Outros (2)']
+    assert paineis['valores'] == [170.0, pytest.approx(20.0 + 18.4)]
+    assert paineis['codigos'] == ['P001'] and len(paineis['grupos']) == 1
+
+
+def test_dashboards_por_localizacao_e_grupos_removidos(estoque):
+    import openpyxl
+
+    def gerar():
+        base, _, _, estoque_atual, critico = analise_dashboard.carregar_dados()
+        return analise_dashboard.gerar_dashboards_por_grupo(
+            base, estoque_atual, critico, 'Localização', pasta='dashboards', processos=1)
+    assert gerar() == (3, 0)
+
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    wb['Base']['H3'] = 'A1'  # P002 muda de B3 para A1
+    wb.save('Controle_Estoque.xlsx')
+    desenhados, em_cache = gerar()
+    assert (desenhados, em_cache) == (1, 1)  # só A1 mudou
+    assert sorted(os.listdir('dashboards/localizacao')) == ['dashboard_a1.png', 'dashboard_c2.png']
+
+
+def test_limpeza_do_cache_de_figuras(estoque):
+    analise_dashboard.gerar_dashboard(*analise_dashboard.carregar_dados(),
+                                      arquivo='dashboard.png', mostrar=False)
+    figuras = os.listdir('indices/figuras')
+    assert len(figuras) == 1
+    assert analise_dashboard.limpar_cache_figuras(dias=1) == 0
+
+    antiga = os.path.join('indices/figuras', figuras[0])
+    os.utime(antiga, (0, 0))
+    assert analise_dashboard.limpar_cache_figuras(dias=1) == 1
+    assert os.path.exists('dashboard.png')  # o dashboard publicado continua
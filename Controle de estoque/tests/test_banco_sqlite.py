@@ -0,0 +1,46 @@
+"""Importação da planilha/diário para o banco SQLite (banco_sqlite.importar_planilha)"""
+import json
+
+import pytest
+
+import banco_sqlite
+
+
+def _diario(registros):
+    with open('movimentacoes.jsonl', 'w', encoding='utf-8') as f:
+        for seq, registro in enumerate(registros, start=1):
+            f.write(json.dumps({'seq': seq, **registro}, ensure_ascii=False) + '\n')
+
+
+def test_importa_datas_iso_e_estoque_inicial(estoque):
+    # Diário importado de células de data do Excel (formato antigo) e no formato da planilha
+    _diario([{'aba': 'Entradas', 'data': '2026-01-05 00:00:00', 'documento': 'NF-1',
+              'codigo': 'P003', 'quantidade': 10, 'valor_unitario': 2.0, 'valor_total': 20.0},
+             {'aba': 'Saídas', 'data': '06/01/2026', 'codigo': 'P003', 'quantidade': 1,
+              'motivo': 'Uso'}])
+
+    assert banco_sqlite.importar_planilha() == (3, 2)
+    assert banco_sqlite.obter_totais('P003') == (10, 1, 17)  # 8 inicial + 10 - 1
+    assert banco_sqlite.obter_saldo('P001') == 0
+
+
+def test_importacao_com_erro_nao_deixa_banco_pela_metade(estoque):
+    _diario([{'aba': 'Saídas', 'data': 'ontem', 'codigo': 'P003', 'quantidade': 1,
+              'motivo': 'Uso'}])
+
+    with pytest.raises(ValueError):
+        banco_sqlite.importar_planilha()
+    con = banco_sqlite.conectar()
+    assert con.execute("SELECT COUNT(*) FROM dim_produtos").fetchone()[0] == 0
+    assert con.execute("SELECT COUNT(*) FROM fato_estoque_atual").fetchone()[0] == 0
+
+
+def test_valor_comprado_mantido_com_o_saldo(estoque):
+    # Registro antigo do diário com fórmula no total: recalculado na importação
+    _diario([{'aba': 'Entradas', 'data': '05/01/2026', 'documento': 'NF-1', 'codigo': 'P003',
+              'quantidade': 10, 'valor_unitario': 2.0, 'valor_total': '=D12*E12'}])
+    banco_sqlite.importar_planilha()
+    assert banco_sqlite.obter_valores('P003') == (10, 20.0, 2.0)
+
+    banco_sqlite.registrar_movimento('Entradas', ['06/01/2026', 'NF-2', 'P003', 10, 3.0, None])
+    assert banco_sqlite.obter_valores('P003') == (20, 50.0, 2.5)
@@ -0,0 +1,49 @@
+"""Busca por trigramas: sem acentos, tolerante a erros e sem remontar o índice à toa"""
+import openpyxl
+import pytest
+
+import busca
+import catalogo
+
+
+def codigos(texto):
+    return [produto.codigo for produto, _ in busca.buscar(texto)]
+
+
+@pytest.fixture
+def sem_reconstrucao(monkeypatch):
+    """Falha se o índice for montado do zero a partir daqui"""
+    def proibido(produtos=None):
+        raise AssertionError('índice de busca reconstruído')
+    monkeypatch.setattr(busca, 'construir', proibido)
+
+
+def test_busca_sem_acentos_e_com_erro_de_digitacao(estoque):
+    assert codigos('lixa grao')[0] == 'P003'
+    assert codigos('LIXA GRÃO')[0] == 'P003'
+    assert codigos('parafusso')[0] == 'P001'
+    assert codigos('tintas color')[0] == 'P002'  # fornecedor
+    assert codigos('p002')[0] == 'P002'
+    assert codigos('xyz') == []
+
+
+def test_produto_novo_entra_sem_reconstruir(estoque, request):
+    busca.buscar('parafuso')
+    request.getfixturevalue('sem_reconstrucao')
+
+    novo = ('P004', 'Cola Branca', 'Cola PVA', 'Adesivos', 2, 12.0, 'Colas SA', 'D1')
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    wb['Base'].append(novo)
+    wb.save('Controle_Estoque.xlsx')
+    catalogo.adicionar(catalogo.Produto(*novo))
+
+    assert codigos('cola branca')[0] == 'P004'
+
+
+def test_indice_em_disco_reaproveitado(estoque, request):
+    busca.buscar('parafuso')
+    busca._indice.update(produtos=None, tamanho=0, lista=[], gramas={})  # processo novo
+    catalogo._cache.update(impressao=None, produtos={}, iniciais={})
+    request.getfixturevalue('sem_reconstrucao')
+
+    assert codigos('lixa')[0] == 'P003'
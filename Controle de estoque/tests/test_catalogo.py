@@ -0,0 +1,34 @@
+"""Catálogo em memória: consulta por código e recarga só quando a origem muda"""
+import os
+
+import openpyxl
+
+import catalogo
+
+
+def test_busca_por_codigo(estoque):
+    assert list(catalogo.obter_catalogo()) == ['P001', 'P002', 'P003']
+    assert catalogo.buscar('P002').nome == 'Tinta Branca 18L'
+    assert catalogo.buscar('P999') is None
+    assert catalogo.estoques_iniciais() == {'P003': 8}
+
+
+def test_origem_inalterada_nao_e_relida(estoque, monkeypatch):
+    catalogo.obter_catalogo()
+
+    def proibido():
+        raise AssertionError('cadastro relido sem mudança na origem')
+    monkeypatch.setattr(catalogo, '_ler_origem', proibido)
+    assert catalogo.buscar('P001').estoque_minimo == 100
+    assert catalogo.estoque_inicial('P003') == 8
+
+
+def test_origem_alterada_e_relida(estoque):
+    catalogo.obter_catalogo()
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    wb['Base'].append(('P004', 'Cola Branca', 'Cola PVA', 'Adesivos', 2, 12.0, 'Colas SA', 'D1'))
+    wb.save('Controle_Estoque.xlsx')
+    st = os.stat('Controle_Estoque.xlsx')
+    os.utime('Controle_Estoque.xlsx', ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert catalogo.buscar('P004').nome == 'Cola Branca'
@@ -0,0 +1,42 @@
+"""Alocação de códigos: sequência persistida, sem repetir entre terminais"""
+import os
+import subprocess
+import sys
+
+import openpyxl
+
+import codigos
+
+PASTA_CODIGO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_continua_do_maior_codigo_cadastrado(estoque):
+    assert codigos.proximo() == 'P004'
+    assert codigos.reservar(3) == ['P005', 'P006', 'P007']
+    assert codigos.ultimo_alocado() == 7
+    assert codigos.proximo('X') == 'X001'
+
+
+def test_pula_codigo_digitado_na_planilha(estoque):
+    codigos.proximo()
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    wb['Base'].append(('P006', 'Manual', '', 'Outros', 0, 1.0, '', ''))
+    wb.save('Controle_Estoque.xlsx')
+
+    assert codigos.reservar(3) == ['P005', 'P007', 'P008']
+
+
+def test_numero_passa_da_largura(estoque):
+    os.makedirs('indices', exist_ok=True)
+    codigos._gravar(codigos._arquivo(), {'P': 999})
+    assert codigos.proximo() == 'P1000'
+
+
+def test_terminais_simultaneos_recebem_codigos_distintos(estoque):
+    script = "import codigos\nfor _ in range(10):\n    print(codigos.proximo())\n"
+    ambiente = dict(os.environ, PYTHONPATH=PASTA_CODIGO)
+    processos = [subprocess.Popen([sys.executable, '-c', script], cwd=estoque, env=ambiente,
+                                  stdout=subprocess.PIPE, text=True) for _ in range(4)]
+    alocados = [codigo for p in processos for codigo in p.communicate(timeout=60)[0].split()]
+
+    assert sorted(alocados) == [codigos.formatar(n) for n in range(4, 44)]
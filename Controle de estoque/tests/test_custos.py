@@ -0,0 +1,40 @@
+"""Custo médio ponderado e FIFO a partir das movimentações do diário"""
+import custos
+import diario
+
+
+def test_custo_medio_e_fifo(estoque):
+    diario.registrar_lote([('Entradas', ['05/01/2026', 'NF-1', 'P001', 10, 2.0, None]),
+                           ('Entradas', ['06/01/2026', 'NF-2', 'P001', 10, 4.0, None]),
+                           ('Saídas', ['07/01/2026', 'P001', 15, 'Uso'])])
+
+    # Médio: 5 × 3,00; FIFO: sobram 5 da camada de R$ 4,00
+    assert custos.avaliar('P001') == {'quantidade': 5, 'custo_medio': 3.0,
+                                      'valor_medio': 15.0, 'valor_fifo': 20.0}
+
+
+def test_saida_a_descoberto_coberta_pela_entrada_seguinte(estoque):
+    diario.registrar_lote([('Saídas', ['05/01/2026', 'P001', 5, 'Uso']),
+                           ('Entradas', ['06/01/2026', 'NF-1', 'P001', 8, 1.5, None])])
+
+    assert custos.avaliar('P001') == {'quantidade': 3, 'custo_medio': 1.5,
+                                      'valor_medio': 4.5, 'valor_fifo': 4.5}
+
+
+def test_camadas_consumidas_sao_compactadas(estoque):
+    diario.registrar_lote([('Entradas', ['05/01/2026', f'NF-{i}', 'P001', 1, float(i), None])
+                           for i in range(1, 201)])
+    diario.registrar_lote([('Saídas', ['06/01/2026', 'P001', 1, 'Uso'])] * 150)
+
+    assert custos.avaliar('P001')['valor_fifo'] == sum(range(151, 201))
+    produto = custos.carregar()['P001']
+    assert len(produto['camadas']) - produto['inicio'] == 50
+    assert len(produto['camadas']) < 200
+
+
+def test_estoque_inicial_avaliado_pelo_cadastro(estoque):
+    diario.registrar('Entradas', ['05/01/2026', 'NF-1', 'P003', 2, 3.0, None])
+
+    # P003: 8 unidades iniciais sem compra (R$ 2,30 do cadastro) + 2 a R$ 3,00
+    total = custos.avaliar_estoque(saldos={'P003': 10}, precos={'P003': 2.3})
+    assert total == {'medio': 24.4, 'fifo': 24.4, 'sem_custo': 8}
@@ -0,0 +1,88 @@
+"""Diário de movimentações: gravação, importação da planilha existente e sincronização"""
+from datetime import datetime
+
+import openpyxl
+
+import diario
+
+
+def test_registros_recebem_seq_crescente(estoque):
+    primeiro = diario.registrar('Saídas', ['05/01/2026', 'P003', 1, 'Uso'])
+    lote = diario.registrar_lote([('Entradas', ['05/01/2026', 'NF-1', 'P003', 2, 1.5, None]),
+                                  ('Saídas', ['06/01/2026', 'P003', 1, 'Uso'])])
+
+    assert [primeiro['seq']] + [r['seq'] for r in lote] == [1, 2, 3]
+    assert lote[0]['valor_total'] == 3.0
+    assert diario.ultimo_seq() == 3
+    registros = [registro for registro, _ in diario.ler()]
+    assert [r['seq'] for r in registros] == [1, 2, 3]
+
+
+def test_escrita_interrompida_e_descartada(estoque):
+    diario.registrar('Saídas', ['05/01/2026', 'P003', 1, 'Uso'])
+    with open('movimentacoes.jsonl', 'ab') as f:
+        f.write(b'{"seq": 2, "aba": "Sa')  # queda de energia no meio da linha
+
+    assert [r['seq'] for r, _ in diario.ler()] == [1]
+    assert diario.ultimo_seq() == 1
+    assert diario.registrar('Saídas', ['06/01/2026', 'P003', 1, 'Uso'])['seq'] == 2
+    assert [r['seq'] for r, _ in diario.ler()] == [1, 2]
+
+
+def test_leitura_retoma_do_offset(estoque):
+    diario.registrar('Saídas', ['05/01/2026', 'P003', 1, 'Uso'])
+    (_, offset), = diario.ler()
+    diario.registrar('Saídas', ['06/01/2026', 'P003', 2, 'Uso'])
+
+    assert [r['quantidade'] for r, _ in diario.ler(offset=offset)] == [2]
+
+
+def test_sincronizacao_materializa_na_planilha(estoque):
+    diario.registrar_lote([('Entradas', ['05/01/2026', 'NF-1', 'P003', 10, 2.0, None]),
+                           ('Saídas', ['06/01/2026', 'P003', 4, 'Uso'])])
+
+    assert diario.sincronizar_planilha() == 2
+    assert diario.sincronizar_planilha() == 0
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    assert list(wb['Entradas'].iter_rows(min_row=2, values_only=True))[0][:6] == \
+        ('05/01/2026', 'NF-1', 'P003', 10, 2.0, 20.0)
+    assert list(wb['Saídas'].iter_rows(min_row=2, values_only=True))[0][:4] == \
+        ('06/01/2026', 'P003', 4, 'Uso')
+
+
+def test_importacao_grava_datas_no_formato_da_planilha(estoque):
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    wb['Entradas'].append([datetime(2026, 1, 5), 'NF-1', 'P001', 10, 0.5, None])
+    wb['Saídas'].append(['06/01/2026', 'P001', 2, 'Uso'])
+    wb.save('Controle_Estoque.xlsx')
+
+    assert diario.importar_planilha() == 2
+    registrado = diario.registrar('Saídas', ['07/01/2026', 'P001', 1, 'Uso'])
+
+    datas = [registro['data'] for registro, _ in diario.ler()]
+    assert datas == ['05/01/2026', '06/01/2026', registrado['data']]
+
+
+def test_sincronizacao_sem_pendencias_nao_abre_a_planilha(estoque, monkeypatch):
+    diario.registrar('Saídas', ['05/01/2026', 'P003', 1, 'Uso'])
+    assert diario.sincronizar_planilha() == 1
+
+    def proibido(*args, **kwargs):
+        raise AssertionError('planilha aberta sem movimentações pendentes')
+    with monkeypatch.context() as m:
+        m.setattr(openpyxl, 'load_workbook', proibido)
+        assert diario.sincronizar_planilha() == 0
+
+    diario.registrar('Saídas', ['06/01/2026', 'P003', 1, 'Uso'])
+    assert diario.sincronizar_planilha() == 1
+    saidas = openpyxl.load_workbook('Controle_Estoque.xlsx')['Saídas']
+    assert saidas.max_row == 3
+
+
+def test_primeira_sincronizacao_de_planilha_anterior_ao_diario(estoque):
+    diario.sincronizar_planilha()
+
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    criticos = [linha[0] for linha in wb['Estoque Crítico'].iter_rows(min_row=2, values_only=True)]
+    assert criticos == ['Parafuso M6', 'Tinta Branca 18L', 'Lixa Grão 100']
+    assert diario.sincronizar_planilha() == 0
@@ -0,0 +1,119 @@
+"""Exportação incremental para BI: mesmo resultado da exportação completa"""
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import diario
+import exportar_para_BI
+
+
+def _ler(pasta, nome, chave):
+    df = pd.read_csv(pasta / f'{nome}.csv', sep=';', decimal=',', encoding='utf-8-sig')
+    return df.sort_values(chave).reset_index(drop=True)
+
+
+def test_agregados_incrementais_iguais_aos_completos(estoque):
+    diario.registrar_lote([('Entradas', ['05/01/2026', 'NF-1', 'P001', 10, 0.5, None]),
+                           ('Saídas', ['06/01/2026', 'P003', 2, 'Uso'])])
+    incremental = estoque / 'incremental'
+    incremental.mkdir()
+    exportar_para_BI.exportar_para_power_bi_incremental(pasta_saida=str(incremental))
+
+    diario.registrar_lote([('Saídas', ['06/01/2026', 'P003', 1, 'Uso']),   # dia já exportado
+                           ('Saídas', ['07/02/2026', 'P001', 4, 'Uso'])])  # dia e mês novos
+    assert exportar_para_BI.exportar_para_power_bi_incremental(pasta_saida=str(incremental)) == 2
+
+    completo = estoque / 'completo'
+    completo.mkdir()
+    exportar_para_BI.exportar_para_power_bi_em_blocos(pasta_saida=str(completo), formato='csv')
+
+    for nome, chave in (('agg_movimentacoes_diarias', ['Data_Movimentacao', 'Codigo_Produto']),
+                        ('agg_movimentacoes_mensais', ['Ano', 'Mes', 'Codigo_Produto'])):
+        esperado = _ler(completo, nome, chave)
+        obtido = _ler(incremental, nome, chave)
+        pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False)
+    assert _ler(incremental, 'agg_movimentacoes_diarias', ['Data_Movimentacao']).shape[0] == 3
+
+
+def test_exportacao_em_blocos_igual_a_completa(estoque):
+    diario.registrar_lote([('Entradas', ['05/01/2026', 'NF-1', 'P001', 10, 0.5, None]),
+                           ('Entradas', ['05/01/2026', 'NF-1', 'P002', 3, 85.0, None]),
+                           ('Saídas', ['06/01/2026', 'P003', 2, 'Uso']),
+                           ('Saídas', ['07/02/2026', 'P001', 4, 'Uso']),
+                           ('Saídas', ['08/02/2026', 'P002', 1, 'Perda'])])
+    completo = estoque / 'completo'
+    exportar_para_BI.exportar_para_power_bi(exportar_para_BI.preparar_dados_para_bi(),
+                                            pasta_saida=str(completo), formato='csv')
+
+    blocos = estoque / 'blocos'
+    assert exportar_para_BI.exportar_para_power_bi_em_blocos(
+        pasta_saida=str(blocos), tamanho_bloco=2, formato='csv') == 5
+
+    for arquivo in completo.iterdir():
+        assert (blocos / arquivo.name).read_bytes() == arquivo.read_bytes(), arquivo.name
+
+
+def test_exportacao_incremental_igual_a_completa(estoque):
+    diario.registrar_lote([('Entradas', ['05/01/2026', 'NF-1', 'P001', 10, 0.5, None]),
+                           ('Saídas', ['06/01/2026', 'P003', 2, 'Uso'])])
+    incremental = estoque / 'incremental'
+    incremental.mkdir()
+    assert exportar_para_BI.exportar_para_power_bi_incremental(pasta_saida=str(incremental)) == 2
+    assert exportar_para_BI.exportar_para_power_bi_incremental(pasta_saida=str(incremental)) == 0
+
+    diario.registrar_lote([('Entradas', ['07/01/2026', 'NF-2', 'P002', 3, 85.0, None]),
+                           ('Saídas', ['08/01/2026', 'P001', 4, 'Uso'])])
+    assert exportar_para_BI.exportar_para_power_bi_incremental(pasta_saida=str(incremental)) == 2
+
+    completo = estoque / 'completo'
+    completo.mkdir()
+    exportar_para_BI.exportar_para_power_bi_em_blocos(pasta_saida=str(completo), formato='csv')
+
+    for nome, chave in (('fato_movimentacoes', ['Data_Movimentacao', 'Codigo_Produto']),
+                        ('fato_estoque_atual', ['Codigo_Produto']),
+                        ('dim_produtos', ['Codigo_Produto'])):
+        pd.testing.assert_frame_equal(_ler(incremental, nome, chave), _ler(completo, nome, chave),
+                                      check_dtype=False)
+
+
+def test_status_deficit_igual_ao_calculo_por_linha():
+    fato_estoque = pd.DataFrame({'Saldo_Atual': [0, 5, 12, 3, -2],
+                                 'Estoque_Minimo': [10, 5, 4, np.nan, 0]})
+    status, deficit = exportar_para_BI._status_deficit(fato_estoque)
+
+    # Implementação anterior, linha a linha
+    assert list(status) == list(fato_estoque.apply(
+        lambda row: 'Crítico' if row['Saldo_Atual'] < row['Estoque_Minimo'] else 'Normal', axis=1))
+    assert list(deficit) == list(fato_estoque.apply(
+        lambda row: max(0, row['Estoque_Minimo'] - row['Saldo_Atual']), axis=1))
+
+    status, deficit = exportar_para_BI._status_deficit(fato_estoque.iloc[:0])
+    assert len(status) == len(deficit) == 0
+
+
+@pytest.mark.parametrize('formato', ['parquet', 'feather'])
+def test_formatos_colunares(estoque, formato):
+    pytest.importorskip('pyarrow')
+    diario.registrar_lote([('Entradas', ['05/01/2026', 'NF-1', 'P001', 10, 0.5, None]),
+                           ('Saídas', ['06/01/2026', 'P003', 2, 'Uso']),
+                           ('Saídas', ['07/02/2026', 'P001', 4, 'Uso'])])
+    pasta = estoque / formato
+    assert exportar_para_BI.exportar_para_power_bi_em_blocos(
+        pasta_saida=str(pasta), tamanho_bloco=2, formato=formato) == 3
+
+    ler = pd.read_parquet if formato == 'parquet' else pd.read_feather
+    fato = ler(pasta / f'fato_movimentacoes.{formato}')
+    assert list(fato['Quantidade_Movimento']) == [10, -2, -4]
+    assert pd.api.types.is_datetime64_any_dtype(fato['Data_Movimentacao'])
+    estoque_atual = ler(pasta / f'fato_estoque_atual.{formato}').set_index('Codigo_Produto')
+    assert estoque_atual.loc['P001', 'Saldo_Atual'] == 6
+    assert estoque_atual.loc['P001', 'Status_Estoque'] == 'Crítico'
+
+
+def test_formato_colunar_sem_pyarrow_volta_para_csv(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    assert exportar_para_BI._formato_bi('parquet') == 'csv'
+    with pytest.raises(ValueError):
+        exportar_para_BI._formato_bi('xlsx')
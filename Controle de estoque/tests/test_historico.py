@@ -0,0 +1,89 @@
+"""Saldo numa data: estoque inicial + movimentações até o fim do dia"""
+from datetime import datetime
+
+import banco_sqlite
+import diario
+import historico
+import saldos
+
+MOVIMENTOS = [('Entradas', ['05/01/2026', 'NF-1', 'P003', 10, 2.0, None]),
+              ('Saídas', ['06/02/2026', 'P003', 4, 'Uso'])]
+
+
+def test_saldo_em_inclui_estoque_inicial(estoque):
+    diario.registrar_lote(MOVIMENTOS)
+    hoje = datetime.now()
+
+    assert historico.saldo_em('31/01/2026', 'P003') == 18
+    assert historico.saldo_em(hoje, 'P003') == saldos.obter_saldo('P003') == 14
+    assert historico.saldo_em(hoje) == saldos.saldos_atuais()
+
+
+def test_saldo_em_com_sqlite(estoque, monkeypatch):
+    banco_sqlite.importar_planilha()
+    monkeypatch.setitem(historico.CONFIG, 'backend', 'sqlite')
+    banco_sqlite.registrar_lote(MOVIMENTOS)
+
+    assert historico.saldo_em('04/01/2026', 'P003') == 8
+    assert historico.saldo_em('31/01/2026', 'P003') == 18
+    assert historico.saldo_em(datetime.now(), 'P003') == banco_sqlite.obter_saldo('P003') == 14
+
+
+def test_consulta_sqlite_nao_grava(estoque):
+    banco_sqlite.importar_planilha()
+    banco_sqlite.registrar_lote(MOVIMENTOS)  # fevereiro encerra janeiro
+    con = banco_sqlite.conectar()
+    assert con.execute("SELECT DISTINCT ano_mes FROM fato_estoque_mensal").fetchall() == [('2026-01',)]
+
+    alteracoes = con.total_changes
+    assert banco_sqlite.totais_em('2026-02-28', 'P003') == {'P003': [10, 4]}
+    assert con.total_changes == alteracoes
+
+
+def _registrar_e_gravar(movimentos):
+    import projecoes
+    diario.registrar_lote(movimentos)
+    historico.carregar()
+    projecoes.salvar_checkpoint(historico.NOME)
+
+
+def test_checkpoint_regrava_so_os_meses_alterados(estoque, monkeypatch):
+    import os
+    _registrar_e_gravar(MOVIMENTOS)
+    pasta = estoque / 'indices' / 'historico'
+    assert sorted(f for f in os.listdir(pasta) if f.endswith('.json')) == [
+        '2026-01.json', '2026-02.json', '_posicao.json']
+
+    gravados = []
+    original = historico._gravar_json
+    monkeypatch.setattr(historico, '_gravar_json',
+                        lambda arquivo, dados: gravados.append(os.path.basename(arquivo))
+                        or original(arquivo, dados))
+    _registrar_e_gravar([('Saídas', ['10/02/2026', 'P003', 1, 'Uso'])])
+    assert gravados == ['2026-02.json', '_posicao.json']
+
+
+def test_checkpoint_relido_por_outro_processo(estoque):
+    import projecoes
+    _registrar_e_gravar(MOVIMENTOS + [('Saídas', ['03/01/2026', 'P003', 1, 'Uso'])])  # retroativa
+    esperado = {dia: historico.saldo_em(dia, 'P003')
+                for dia in ('02/01/2026', '05/01/2026', '31/01/2026', '28/02/2026')}
+
+    projecoes.descartar()
+    lido = historico.ler_checkpoint(historico.NOME)
+    assert lido['seq'] == 3
+    assert {dia: historico.saldo_em(dia, 'P003') for dia in esperado} == esperado == {
+        '02/01/2026': 8, '05/01/2026': 17, '31/01/2026': 17, '28/02/2026': 13}
+
+
+def test_gravacao_interrompida_refaz_a_projecao(estoque):
+    import json
+    import projecoes
+    _registrar_e_gravar(MOVIMENTOS)
+    mes = estoque / 'indices' / 'historico' / '2026-02.json'
+    particao = json.loads(mes.read_text(encoding='utf-8'))
+    mes.write_text(json.dumps({**particao, 'seq': particao['seq'] + 1}), encoding='utf-8')
+
+    projecoes.descartar()
+    assert historico.ler_checkpoint(historico.NOME) is None
+    assert historico.saldo_em('28/02/2026', 'P003') == 14
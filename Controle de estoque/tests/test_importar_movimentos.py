@@ -0,0 +1,27 @@
+"""Importação em lote: linhas malformadas viram rejeições com o número da linha"""
+import importar_movimentos
+import saldos
+
+
+def test_linhas_malformadas_sao_rejeitadas(estoque):
+    linhas = [
+        '{"data": "05/01/2026", "tipo": "saida", "codigo": "P003", "quantidade": 1}',
+        '[1, 2, 3]',
+        '"texto"',
+        '{"data": "05/01/2026", "tipo": "saida", "codigo": "P003", "quantidade": Infinity}',
+        '{"data": "05/01/2026", "tipo": "entrada", "codigo": "P003", "quantidade": NaN, "valor_unitario": 1}',
+        '{"data": "05/01/2026", "tipo": "entrada", "codigo": "P003", "quantidade": 2, "valor_unitario": NaN}',
+        '{"data": "05/01/2026", "tipo": "entrada", "codigo": "P003", "quantidade": 2, "valor_unitario": "inf"}',
+        '{"data": "05/01/2026", "tipo": "saida", "codigo": "P003", "quantidade": "1e400"}',
+        '{"data": "05/01/2026", "tipo": "saida", "codigo": "P003", "quantidade": true}',
+        '{"data": "05/01/2026", "tipo": "entrada", "codigo": "P003", "quantidade": 1, "valor_unitario": false}',
+    ]
+    arquivo = estoque / 'lote.jsonl'
+    arquivo.write_text('\n'.join(linhas) + '\n', encoding='utf-8')
+
+    aceitas, rejeitadas = importar_movimentos.importar(str(arquivo))
+
+    assert len(aceitas) == 1
+    assert [n for n, _, _ in rejeitadas] == [2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert saldos.obter_saldo('P003') == 7
+    assert (estoque / 'lote_rejeitados.csv').exists()
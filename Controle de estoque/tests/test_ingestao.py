@@ -0,0 +1,34 @@
+"""Ingestão pela pasta monitorada: eventos malformados não derrubam o ingestor"""
+import asyncio
+
+import ingestao
+import saldos
+
+
+def test_arquivo_com_linhas_malformadas(estoque):
+    pasta = estoque / 'entrada'
+    processados = pasta / 'processados'
+    processados.mkdir(parents=True)
+    arquivo = pasta / 'leituras.jsonl'
+    arquivo.write_text('\n'.join([
+        '{"data": "05/01/2026", "codigo": "P003", "quantidade": 2}',
+        '[1, 2]',
+        '{"data": "05/01/2026", "codigo": "P003", "quantidade": Infinity}',
+        '{"data": "05/01/2026", "codigo": "P003", "quantidade": 1}',
+    ]) + '\n', encoding='utf-8')
+
+    async def cenario():
+        servico = ingestao.Ingestao('saida')
+        await servico.recarregar_catalogo()
+        gravador = asyncio.create_task(servico.gravador())
+        try:
+            return await ingestao._processar_arquivo(servico, str(arquivo), str(processados)), servico
+        finally:
+            gravador.cancel()
+
+    processado, servico = asyncio.run(cenario())
+
+    assert processado
+    assert servico.rejeitados == 2
+    assert saldos.obter_saldo('P003') == 5
+    assert (processados / 'leituras_rejeitados.csv').exists()
@@ -0,0 +1,33 @@
+"""Inicialização dos terminais: catálogo do cache em disco, sem bibliotecas pesadas"""
+import json
+import os
+import subprocess
+import sys
+
+from benchmark_inicio import PESADAS
+
+PASTA_CODIGO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = f"""
+import json, sys
+import registrar_entrada, registrar_saida, utils
+produtos = utils.carregar_catalogo()
+print(json.dumps([sorted(produtos), [m for m in {PESADAS!r} if m in sys.modules]]))
+"""
+
+
+def _processo_novo(pasta):
+    saida = subprocess.run([sys.executable, '-c', SCRIPT], cwd=pasta, check=True,
+                           capture_output=True, text=True,
+                           env=dict(os.environ, PYTHONPATH=PASTA_CODIGO)).stdout
+    return json.loads(saida.splitlines()[-1])
+
+
+def test_catalogo_em_cache_sem_bibliotecas_pesadas(estoque):
+    codigos, _ = _processo_novo(estoque)  # 1ª execução: lê a planilha e grava o cache
+    assert codigos == ['P001', 'P002', 'P003']
+    assert os.path.exists(os.path.join('indices', 'catalogo.json'))
+
+    codigos, importadas = _processo_novo(estoque)
+    assert codigos == ['P001', 'P002', 'P003']
+    assert importadas == []
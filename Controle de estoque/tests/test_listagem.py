@@ -0,0 +1,47 @@
+"""Listagem de produtos em páginas, com filtros e ordem num único passo"""
+import pytest
+
+import utils
+from catalogo import Produto
+from conftest import PRODUTOS
+
+CATALOGO = {p[0]: Produto(*p) for p in PRODUTOS}
+SALDOS = {'P001': 120, 'P002': 1, 'P003': 4}
+
+
+def codigos(paginas):
+    """Códigos de cada página (com saldos, a linha começa pelo status)"""
+    return [[campos[1] if campos[0] in ('⚠️', '✓') else campos[0]
+             for campos in map(str.split, pagina)] for pagina in paginas]
+
+
+def test_paginas_e_filtros():
+    assert codigos(utils.paginas_produtos(CATALOGO, por_pagina=2)) == [['P001', 'P002'], ['P003']]
+    assert codigos(utils.paginas_produtos(CATALOGO, categoria='fixacao')) == [['P001']]
+    assert codigos(utils.paginas_produtos(CATALOGO, localizacao='b')) == [['P002']]
+    assert codigos(utils.paginas_produtos(CATALOGO, SALDOS, criticos=True)) == [['P002', 'P003']]
+    assert codigos(utils.paginas_produtos(CATALOGO, SALDOS, ordem='falta')) == [
+        ['P002', 'P003', 'P001']]
+    with pytest.raises(ValueError):
+        next(utils.paginas_produtos(CATALOGO, criticos=True))
+
+
+def test_primeira_pagina_sem_percorrer_o_catalogo():
+    lidos = []
+
+    class Catalogo(dict):
+        def values(self):
+            for produto in super().values():
+                lidos.append(produto.codigo)
+                yield produto
+
+    paginas = utils.paginas_produtos(Catalogo(CATALOGO), por_pagina=1)
+    assert codigos([next(paginas)]) == [['P001']]
+    assert lidos == ['P001']
+
+
+def test_listagem_filtrada_mostra_total(estoque, capsys):
+    utils.listar_produtos_completo(com_estoque=True, criticos=True)
+    saida = capsys.readouterr().out
+    assert 'P001' in saida and 'P002' in saida and 'P003' not in saida
+    assert 'Total: 2 de 3 produtos' in saida
@@ -0,0 +1,51 @@
+"""Leitura única da planilha: o cache em disco é opcional"""
+import pickle
+
+import planilha
+
+
+def test_cache_em_disco_ilegivel_e_ignorado(estoque, monkeypatch):
+    planilha.carregar(abas=['Base'])
+    planilha.descartar()
+
+    def incompativel(*args, **kwargs):
+        raise ModuleNotFoundError("No module named 'pandas.core.indexes.numeric'")
+    monkeypatch.setattr(pickle, 'load', incompativel)
+
+    assert list(planilha.carregar(abas=['Base'])['Base']['Código']) == ['P001', 'P002', 'P003']
+
+
+def test_cache_de_outra_versao_do_pandas_e_ignorado(estoque, monkeypatch):
+    import pandas as pd
+    planilha.carregar(abas=['Base'])
+    planilha.descartar()
+    monkeypatch.setattr(pd, '__version__', '0.0.0')
+
+    lidas = []
+    original = planilha._ler_abas
+    monkeypatch.setattr(planilha, '_ler_abas', lambda *a: lidas.append(a) or original(*a))
+    planilha.carregar(abas=['Base'])
+    assert lidas  # releu a planilha em vez de usar o cache
+
+
+def test_uma_leitura_ate_a_planilha_mudar(estoque, monkeypatch):
+    import os
+    import openpyxl
+    lidas = []
+    original = planilha._ler_abas
+    monkeypatch.setattr(planilha, '_ler_abas', lambda *a: lidas.append(a[1]) or original(*a))
+
+    abas = planilha.carregar(abas=['Base', 'Estoque Atual'])
+    abas['Base'].drop(abas['Base'].index, inplace=True)  # cópia: o cache não muda
+    assert len(planilha.carregar(abas=['Base'])['Base']) == 3
+    planilha.descartar()  # processo novo: vem do cache em disco
+    assert len(planilha.carregar(abas=['Estoque Atual'])['Estoque Atual']) == 3
+    assert lidas == [['Base', 'Estoque Atual']]
+
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    wb['Base'].append(('P004', 'Cola Branca', 'Cola PVA', 'Adesivos', 2, 12.0, 'Colas SA', 'D1'))
+    wb.save('Controle_Estoque.xlsx')
+    st = os.stat('Controle_Estoque.xlsx')
+    os.utime('Controle_Estoque.xlsx', ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert len(planilha.carregar(abas=['Base'])['Base']) == 4
+    assert lidas[-1] == ['Base']
@@ -0,0 +1,58 @@
+"""Reposição: ponto de pedido e sugestão de compra sobre a janela de consumo"""
+import math
+import statistics
+from datetime import datetime
+
+import pytest
+
+import diario
+import reposicao
+from catalogo import Produto
+from conftest import PRODUTOS
+
+CATALOGO = {p[0]: Produto(*p) for p in PRODUTOS}
+
+
+@pytest.fixture
+def parametros(monkeypatch):
+    for chave, valor in (('prazo_entrega_dias', 7), ('prazo_entrega_fornecedor', {'Tintas Color': 15}),
+                         ('dias_cobertura_alvo', 30), ('nivel_servico_z', 1.65)):
+        monkeypatch.setitem(reposicao.CONFIG, chave, valor)
+
+
+def _referencia(diarias, janela, prazo, saldo, minimo):
+    """Cálculo direto, produto a produto (dias sem saída contam como zero)"""
+    dias = diarias + [0] * (janela - len(diarias))
+    consumo, desvio = statistics.fmean(dias), statistics.pstdev(dias)
+    ponto = max(math.ceil(consumo * prazo + 1.65 * desvio * math.sqrt(prazo)), minimo)
+    sugerida = max(math.ceil(ponto + consumo * 30 - saldo), 0) if saldo <= ponto else 0
+    return ponto, sugerida
+
+
+def test_calculo_igual_ao_produto_a_produto(parametros):
+    saidas = {'P001': [30, 50, 10], 'P002': [1, 3], 'P003': []}
+    codigos = [c for c, dias in saidas.items() for _ in dias]
+    quantidades = [q for dias in saidas.values() for q in dias]
+    saldos = {'P001': 80, 'P002': 40, 'P003': 8}
+
+    tabela = reposicao.calcular(CATALOGO, saldos, codigos + ['P999'], quantidades + [5], 20)
+    tabela = tabela.set_index('codigo')
+    for codigo, prazo in (('P001', 7), ('P002', 15), ('P003', 7)):
+        esperado = _referencia(saidas[codigo], 20, prazo, saldos[codigo],
+                               CATALOGO[codigo].estoque_minimo)
+        obtido = tuple(tabela.loc[codigo, ['ponto_pedido', 'quantidade_sugerida']])
+        assert obtido == esperado, codigo
+    assert tabela.loc['P003', 'dias_cobertura'] == math.inf
+
+
+def test_sugestoes_por_fornecedor_na_janela(estoque, parametros):
+    diario.registrar_lote([('Entradas', ['01/03/2026', 'NF-1', 'P001', 200, 0.5, None]),
+                           ('Saídas', ['01/03/2026', 'P001', 500, 'Uso']),  # fora da janela
+                           ('Saídas', ['25/03/2026', 'P001', 60, 'Uso']),
+                           ('Saídas', ['30/03/2026', 'P002', 1, 'Uso'])])
+    tabela = reposicao.sugestoes(datetime(2026, 3, 31), janela=10).set_index('codigo')
+
+    assert tabela.loc['P001', 'consumo_diario'] == 6.0
+    grupos = reposicao.pedidos(tabela.reset_index())
+    assert sorted(grupos) == ['Parafusos Brasil', 'Tintas Color']
+    assert list(grupos['Tintas Color']['prazo_dias']) == [15]
@@ -0,0 +1,72 @@
+"""Saldos com o backend Excel: estoque inicial + entradas − saídas, como na aba 'Estoque Atual'"""
+import diario
+import saldos
+import utils
+
+
+def test_saldo_inclui_estoque_inicial(estoque):
+    diario.registrar('Saídas', ['05/01/2026', 'P003', 1, 'Uso'])
+
+    assert saldos.obter_saldo('P003') == 7
+    assert saldos.obter_totais('P003') == (0, 1, 7)
+    assert utils.saldos_atuais()['P003'] == 7
+
+
+def test_criticos_consideram_estoque_inicial(estoque):
+    diario.registrar('Saídas', ['05/01/2026', 'P003', 1, 'Uso'])
+
+    criticos = {c['codigo'] for c in saldos.listar_criticos()}
+    assert 'P003' not in criticos  # 7 >= mínimo 5
+    diario.registrar('Saídas', ['06/01/2026', 'P003', 3, 'Uso'])
+    assert 'P003' in {c['codigo'] for c in saldos.listar_criticos()}
+
+
+def test_saldo_igual_ao_da_planilha(estoque):
+    import openpyxl
+    diario.registrar_lote([('Entradas', ['05/01/2026', 'NF-1', 'P003', 10, 2.0, None]),
+                           ('Saídas', ['06/01/2026', 'P003', 4, 'Uso'])])
+    diario.sincronizar_planilha()
+
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    na_planilha = {linha[0]: linha[4] for linha in
+                   wb['Estoque Atual'].iter_rows(min_row=2, values_only=True)}
+    assert na_planilha['P003'] == saldos.obter_saldo('P003') == 14
+
+
+def test_planilha_anterior_ao_diario(estoque):
+    import os
+    import openpyxl
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    wb['Entradas'].append(['05/01/2026', 'NF-1', 'P003', 50, 2.0, 100.0])
+    wb['Saídas'].append(['06/01/2026', 'P003', 3, 'Uso'])
+    wb.save('Controle_Estoque.xlsx')
+    assert not os.path.exists('movimentacoes.jsonl')
+
+    assert saldos.obter_saldo('P003') == 55  # 8 inicial + 50 − 3
+    assert utils.saldos_atuais()['P003'] == 55
+    assert saldos.obter_valores('P003')[:2] == (50, 100.0)
+
+
+def test_planilha_sem_movimentacoes_importada_uma_vez(estoque, monkeypatch):
+    import openpyxl
+    assert saldos.obter_saldo('P003') == 8
+
+    def proibido(*args, **kwargs):
+        raise AssertionError('planilha relida a cada consulta de saldo')
+    monkeypatch.setattr(openpyxl, 'load_workbook', proibido)
+    assert saldos.obter_saldo('P003') == 8
+
+
+def test_total_de_entrada_gravado_como_valor(estoque):
+    import openpyxl
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    wb['Entradas'].append(['05/01/2026', 'NF-1', 'P003', 5, 2.0, '=D5*E5'])  # fórmula antiga
+    wb.save('Controle_Estoque.xlsx')
+    diario.registrar('Entradas', ['06/01/2026', 'NF-2', 'P002', 3, 85.0, None])
+    diario.sincronizar_planilha()
+
+    wb = openpyxl.load_workbook('Controle_Estoque.xlsx')
+    totais = [linha[5] for linha in wb['Entradas'].iter_rows(min_row=2, values_only=True)]
+    assert totais == [10.0, 255.0]
+    assert saldos.obter_valores('P003') == (5, 10.0, 2.0)
+    assert saldos.obter_valores('P002') == (3, 255.0, 85.0)
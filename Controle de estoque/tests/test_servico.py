@@ -0,0 +1,22 @@
+"""Registro de movimentações pelo serviço HTTP: o tipo vem da rota"""
+import pytest
+
+import saldos
+import servico
+
+
+def test_tipo_do_corpo_diferente_da_rota_e_rejeitado(estoque):
+    with pytest.raises(ValueError, match='não corresponde à rota'):
+        servico.registrar('entrada', [{'codigo': 'P003', 'quantidade': 5, 'tipo': 'saida'}])
+    assert saldos.obter_saldo('P003') == 8
+
+
+def test_tipo_igual_ao_da_rota_e_aceito(estoque):
+    servico.registrar('saida', [{'codigo': 'P003', 'quantidade': 2, 'tipo': 'Saídas'}])
+    assert saldos.obter_saldo('P003') == 6
+
+
+def test_quantidade_booleana_e_rejeitada(estoque):
+    with pytest.raises(ValueError, match='quantidade inválida'):
+        servico.registrar('saida', [{'codigo': 'P003', 'quantidade': True}])
+    assert saldos.obter_saldo('P003') == 8
@@ -0,0 +1,54 @@
+"""Travas entre processos: gravações simultâneas não se perdem nem se misturam"""
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import diario
+import travas
+
+PASTA_CODIGO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_reentrante_na_mesma_thread(tmp_path):
+    arquivo = str(tmp_path / 'recurso')
+    with travas.travar(arquivo):
+        with travas.travar(arquivo, tempo_limite=0):
+            pass
+    with travas.travar(arquivo, tempo_limite=0):  # liberada por quem travou primeiro
+        pass
+
+
+def test_trava_ocupada_esgota_tempo_limite(tmp_path):
+    arquivo = str(tmp_path / 'recurso')
+    travada, liberar = threading.Event(), threading.Event()
+
+    def segurar():
+        with travas.travar(arquivo):
+            travada.set()
+            liberar.wait(5)
+    outra = threading.Thread(target=segurar)
+    outra.start()
+    try:
+        travada.wait(5)
+        with pytest.raises(TimeoutError):
+            with travas.travar(arquivo, tempo_limite=0.1):
+                pass
+    finally:
+        liberar.set()
+        outra.join()
+
+
+def test_processos_simultaneos_nao_perdem_gravacoes(estoque):
+    script = ("import diario\n"
+              "for i in range(25):\n"
+              "    diario.registrar('Saídas', ['05/01/2026', 'P001', 1, 'Uso'])\n")
+    ambiente = dict(os.environ, PYTHONPATH=PASTA_CODIGO)
+    processos = [subprocess.Popen([sys.executable, '-c', script], cwd=estoque, env=ambiente)
+                 for _ in range(4)]
+    assert [p.wait(60) for p in processos] == [0] * 4
+
+    seqs = [registro['seq'] for registro, _ in diario.ler()]
+    assert seqs == list(range(1, 101))
@@ -0,0 +1,86 @@
+"""
+Travas de Arquivo - Controle de Estoque
+Exclusão mútua entre processos para que vários terminais gravem ao mesmo tempo
+
+Cada recurso (diário, planilha, checkpoint) é protegido por um arquivo
+'<recurso>.lock' travado com fcntl (Linux/macOS) ou msvcrt (Windows). Quem
+encontra a trava ocupada tenta de novo com espera crescente (backoff com
+variação aleatória) até CONFIG['tempo_limite_trava'] segundos. As seções
+travadas são curtas (um append no diário), então operadores simultâneos não
+perdem gravações e também não esperam por um save inteiro da planilha.
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {'tempo_limite_trava': 30}
+
+if os.name == 'nt':
+    import msvcrt
+
+    def _trancar(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+    def _destrancar(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _trancar(fd):
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _destrancar(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+# Espera inicial e máxima entre tentativas (segundos)
+_ESPERA_INICIAL = 0.005
+_ESPERA_MAXIMA = 0.25
+
+# Travas em poder de cada thread: {(caminho, thread)}
+_ativas = set()
+
+
+@contextmanager
+def travar(arquivo, tempo_limite=None):
+    """Trava exclusiva sobre `arquivo` enquanto o bloco `with` executa
+
+    Reentrante na mesma thread (funções travadas podem chamar umas às outras).
+    Levanta TimeoutError se a trava não for obtida dentro do tempo limite.
+    """
+    caminho = os.path.abspath(arquivo) + '.lock'
+    chave = (caminho, threading.get_ident())
+    if chave in _ativas:
+        yield  # já travado por esta thread: quem travou primeiro libera
+        return
+
+    if tempo_limite is None:
+        tempo_limite = CONFIG.get('tempo_limite_trava', 30)
+    fd = os.open(caminho, os.O_RDWR | os.O_CREAT, 0o666)
+    prazo = time.monotonic() + tempo_limite
+    espera = _ESPERA_INICIAL
+    while True:
+        try:
+            _trancar(fd)
+            break
+        except OSError:
+            if time.monotonic() >= prazo:
+                os.close(fd)
+                raise TimeoutError(f"'{arquivo}' está em uso por outro terminal "
+                                   f"(aguardado {tempo_limite}s)")
+            time.sleep(espera * random.uniform(0.5, 1.5))
+            espera = min(espera * 2, _ESPERA_MAXIMA)
+
+    _ativas.add(chave)
+    try:
+        yield
+    finally:
+        _ativas.discard(chave)
+        _destrancar(fd)
+        os.close(fd)
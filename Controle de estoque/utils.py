@@ -1,5 +1,8 @@
 """
 Funções utilitárias compartilhadas - Sistema de Controle de Estoque
+
+Só a biblioteca padrão é importada aqui: os menus dos terminais abrem sem
+carregar pandas ou openpyxl, que são importados apenas nas funções que os usam.
 """
 import os
 from datetime import datetime
@@ -51,56 +54,50 @@ def pausar():
     """Pausa até usuário pressionar Enter"""
     input("\nPressione Enter para continuar...")
 
-def carregar_produtos():
-    """Carrega lista de produtos da planilha"""
-    import pandas as pd
+def usar_sqlite():
+    """Indica se o armazenamento configurado é o banco SQLite"""
+    return CONFIG.get('backend') == 'sqlite'
+
+def carregar_catalogo():
+    """Dicionário codigo -> Produto do cadastro (planilha ou banco SQLite)
+
+    Usa o cache do catálogo (em memória e em disco): a origem só é lida de novo
+    quando o arquivo muda, e sem ela nem pandas nem openpyxl são carregados.
+    """
+    import catalogo
     arquivo = CONFIG['arquivo_excel']
     
-    if not os.path.exists(arquivo):
+    if not usar_sqlite() and not os.path.exists(arquivo):
         print(f"❌ Arquivo '{arquivo}' não encontrado!")
         print("💡 Execute: python3 gerar_planilha.py")
         return None
     
     try:
-        return pd.read_excel(arquivo, sheet_name='Base')
+        return catalogo.obter_catalogo()
     except Exception as e:
         print(f"❌ Erro ao ler produtos: {e}")
         return None
 
-def gerar_proximo_codigo(df_base):
-    """Gera o próximo código disponível automaticamente"""
-    if df_base.empty:
-        return 'P001'
-    
-    # Extrai números dos códigos existentes (assume formato P001, P002, etc)
-    codigos = df_base['Código'].values
-    numeros = []
-    for cod in codigos:
-        try:
-            # Remove 'P' e converte para int
-            num = int(''.join(filter(str.isdigit, str(cod))))
-            numeros.append(num)
-        except:
-            continue
-    
-    if not numeros:
-        return 'P001'
-    
-    proximo = max(numeros) + 1
-    return f'P{proximo:03d}'
+def carregar_produtos():
+    """Carrega lista de produtos como DataFrame (colunas da aba 'Base')"""
+    import catalogo
+    if carregar_catalogo() is None:
+        return None
+    return catalogo.para_dataframe()
 
-def cadastrar_novo_produto(df_base, codigo=None):
-    """Cadastra um novo produto na base"""
-    import openpyxl
+def cadastrar_novo_produto(produtos, codigo=None):
+    """Cadastra um novo produto na base (produtos: catálogo codigo -> Produto)"""
+    import catalogo
     
     print("\n" + "="*70)
     print("➕ CADASTRAR NOVO PRODUTO")
     print("="*70)
     
-    # Gerar código automaticamente
+    # Código automático só é alocado ao salvar (codigos.py): cancelar não gasta um número
     if codigo is None:
-        codigo = gerar_proximo_codigo(df_base)
-    print(f"\n🏷️  Código: {codigo} (gerado automaticamente)")
+        print("\n🏷️  Código: gerado automaticamente ao salvar")
+    else:
+        print(f"\n🏷️  Código: {codigo}")
     
     # Coletar dados
     nome = input("📦 Nome do Produto: ").strip()
@@ -117,7 +114,7 @@ def cadastrar_novo_produto(df_base, codigo=None):
     
     # Confirmar
     print("\n" + "-"*70)
-    print(f"Código: {codigo} | Nome: {nome}")
+    print(f"Código: {codigo or '(automático)'} | Nome: {nome}")
     print(f"Categoria: {categoria} | Valor: R$ {valor:.2f}")
     print(f"Estoque Mín: {est_min} | Fornecedor: {fornecedor}")
     print(f"Localização: {localizacao}")
@@ -127,42 +124,65 @@ def cadastrar_novo_produto(df_base, codigo=None):
         print("\n❌ Cancelado!")
         return None
     
+    if codigo is None:
+        import codigos
+        try:
+            codigo = codigos.proximo()
+        except TimeoutError as e:
+            print(f"\n❌ Erro ao gerar o código: {e}")
+            return None
+    
+    if usar_sqlite():
+        import banco_sqlite
+        try:
+            banco_sqlite.cadastrar_produto(codigo, nome, descricao, categoria, est_min, valor,
+                                           fornecedor, localizacao)
+            catalogo.adicionar(catalogo.Produto(codigo, nome, descricao, categoria, est_min,
+                                                valor, fornecedor, localizacao))
+            print(f"\n✅ Produto {codigo} cadastrado com sucesso!")
+            return codigo
+        except Exception as e:
+            print(f"\n❌ Erro ao cadastrar: {e}")
+            return None
+    
     # Salvar na aba Base
     try:
+        import openpyxl
+        import travas
         arquivo = CONFIG['arquivo_excel']
-        wb = openpyxl.load_workbook(arquivo)
-        ws_base = wb['Base']
-        proxima_linha = ws_base.max_row + 1
-        
-        ws_base.cell(row=proxima_linha, column=1, value=codigo)
-        ws_base.cell(row=proxima_linha, column=2, value=nome)
-        ws_base.cell(row=proxima_linha, column=3, value=descricao)
-        ws_base.cell(row=proxima_linha, column=4, value=categoria)
-        ws_base.cell(row=proxima_linha, column=5, value=est_min)
-        ws_base.cell(row=proxima_linha, column=6, value=valor)
-        ws_base.cell(row=proxima_linha, column=7, value=fornecedor)
-        ws_base.cell(row=proxima_linha, column=8, value=localizacao)
-        
-        # Adicionar fórmulas na aba Estoque Atual
-        ws_estoque = wb['Estoque Atual']
-        linha_estoque = ws_estoque.max_row + 1
-        ws_estoque.cell(row=linha_estoque, column=1, value=codigo)
-        ws_estoque.cell(row=linha_estoque, column=2, value=0)  # Estoque inicial
-        ws_estoque.cell(row=linha_estoque, column=3, value=f'=SUMIF(Entradas!C:C,A{linha_estoque},Entradas!D:D)')  # Total entradas
-        ws_estoque.cell(row=linha_estoque, column=4, value=f'=SUMIF(Saídas!B:B,A{linha_estoque},Saídas!C:C)')  # Total saídas
-        ws_estoque.cell(row=linha_estoque, column=5, value=f'=B{linha_estoque}+C{linha_estoque}-D{linha_estoque}')  # Saldo atual
-        
-        # Adicionar fórmulas na aba Estoque Crítico
-        ws_critico = wb['Estoque Crítico']
-        linha_critico = ws_critico.max_row + 1
-        ws_critico.cell(row=linha_critico, column=1, value=f'=Base!B{proxima_linha}')  # Nome do produto
-        ws_critico.cell(row=linha_critico, column=2, value=f'=VLOOKUP(Base!A{proxima_linha},"Estoque Atual"!A:E,5,FALSE)')  # Estoque atual
-        ws_critico.cell(row=linha_critico, column=3, value=f'=Base!E{proxima_linha}')  # Estoque mínimo
-        ws_critico.cell(row=linha_critico, column=4, value=f'=IF(B{linha_critico}<C{linha_critico},"⚠️ REPOR","✓ OK")')  # Status
-        
-        wb.save(arquivo)
+        with travas.travar(arquivo):
+            wb = openpyxl.load_workbook(arquivo)
+            ws_base = wb['Base']
+            
+            # Código informado à mão pode já ter sido cadastrado por outro terminal
+            existentes = {c for (c,) in ws_base.iter_rows(min_row=2, max_col=1, values_only=True)}
+            if codigo in existentes:
+                import codigos
+                codigo = codigos.proximo()
+                print(f"\n⚠️  Código já usado por outro terminal; cadastrando como {codigo}")
+            
+            proxima_linha = ws_base.max_row + 1
+            
+            ws_base.cell(row=proxima_linha, column=1, value=codigo)
+            ws_base.cell(row=proxima_linha, column=2, value=nome)
+            ws_base.cell(row=proxima_linha, column=3, value=descricao)
+            ws_base.cell(row=proxima_linha, column=4, value=categoria)
+            ws_base.cell(row=proxima_linha, column=5, value=est_min)
+            ws_base.cell(row=proxima_linha, column=6, value=valor)
+            ws_base.cell(row=proxima_linha, column=7, value=fornecedor)
+            ws_base.cell(row=proxima_linha, column=8, value=localizacao)
+            
+            # Saldos gravados como valores (mantidos pelo diário, sem SUMIF)
+            import saldos
+            entradas, saidas, saldo = saldos.obter_totais(codigo)
+            wb['Estoque Atual'].append([codigo, 0, entradas, saidas, saldo])
+            wb['Estoque Crítico'].append([nome, saldo, est_min, saldos.status(saldo, est_min)])
+            
+            wb.save(arquivo)
+        catalogo.adicionar(catalogo.Produto(codigo, nome, descricao, categoria, est_min,
+                                            valor, fornecedor, localizacao))
         print(f"\n✅ Produto {codigo} cadastrado com sucesso!")
-        print(f"   Fórmulas adicionadas automaticamente nas abas de estoque.")
+        print(f"   Abas de estoque atualizadas automaticamente.")
         return codigo
     except PermissionError:
         print(f"\n❌ Arquivo está aberto! Feche e tente novamente.")
@@ -171,98 +191,243 @@ def cadastrar_novo_produto(df_base, codigo=None):
         print(f"\n❌ Erro ao cadastrar: {e}")
         return None
 
-def obter_produto(df_base, permitir_novo=True):
-    """Obtém e valida código do produto ou cadastra novo"""
+def escolher_por_busca(texto, limite=10):
+    """Mostra os produtos mais parecidos com `texto` e retorna o código escolhido (ou None)"""
+    import busca
+    resultados = busca.buscar(texto, limite)
+    if not resultados:
+        print(f"   ❌ Nenhum produto parecido com '{texto}'!")
+        return None
+    
+    print()
+    for n, (p, _) in enumerate(resultados, start=1):
+        print(f"  {n:>2} - {p.codigo:<10} {str(p.nome)[:35]:<35} {str(p.fornecedor or '')[:20]}")
+    escolha = input("\n   Número do produto [Enter = nova busca]: ").strip()
+    if escolha.isdigit() and 1 <= int(escolha) <= len(resultados):
+        produto = resultados[int(escolha) - 1][0]
+        print(f"   ✓ {produto.codigo} - {produto.nome}")
+        return produto.codigo
+    return None
+
+def obter_produto(produtos, permitir_novo=True):
+    """Obtém e valida código do produto (pelo código ou por busca) ou cadastra novo"""
+    import catalogo
     while True:
         print("\n" + "-"*70)
-        print("1 - Selecionar produto existente")
+        print("1 - Selecionar produto (código ou parte do nome)")
         if permitir_novo:
             print("2 - Cadastrar novo produto")
-        print("3 - Ver lista completa")
+        print("3 - Buscar por nome, descrição ou fornecedor")
         print("-"*70)
         
         opcao = input("\nOpção: ").strip()
         
         if opcao == '1':
-            codigo = input("\n🏷️  Digite o código do produto: ").strip().upper()
-            if not codigo:
+            texto = input("\n🏷️  Digite o código ou o nome do produto: ").strip()
+            if not texto:
                 print("   ❌ Código obrigatório!")
                 continue
             
-            if codigo in df_base['Código'].values:
-                nome = df_base[df_base['Código'] == codigo]['Nome do Produto'].values[0]
-                print(f"   ✓ {nome}")
-                return codigo
+            produto = catalogo.buscar(texto.upper())
+            if produto is not None:
+                print(f"   ✓ {produto.nome}")
+                return produto.codigo
             
-            print(f"   ❌ Produto '{codigo}' não encontrado!")
+            # Não é um código: busca aproximada
+            codigo = escolher_por_busca(texto)
+            if codigo:
+                return codigo
         
         elif opcao == '2' and permitir_novo:
             # Cadastrar novo produto
-            novo_codigo = cadastrar_novo_produto(df_base)
+            novo_codigo = cadastrar_novo_produto(produtos)
             if novo_codigo:
-                # Recarregar base para incluir o novo produto
-                df_base_nova = carregar_produtos()
-                if df_base_nova is not None:
-                    return novo_codigo
+                return novo_codigo  # já incluído no catálogo por cadastrar_novo_produto
         
         elif opcao == '3':
-            print("\n" + "="*70)
-            for _, row in df_base.iterrows():
-                print(f"  {row['Código']:<10} - {row['Nome do Produto']}")
-            print("="*70)
+            texto = input("\n🔎 Buscar: ").strip()
+            if texto:
+                codigo = escolher_por_busca(texto)
+                if codigo:
+                    return codigo
         
         else:
             print("   ❌ Opção inválida!")
 
-def listar_produtos_completo(df_base=None, com_estoque=False):
-    """Lista produtos de forma formatada"""
-    if df_base is None:
-        df_base = carregar_produtos()
-    if df_base is None:
+# Ordens da listagem: chave de ordenação de (produto, saldo); None = ordem do cadastro
+ORDENS_LISTAGEM = {
+    'codigo': lambda p, saldo: str(p.codigo),
+    'nome': lambda p, saldo: str(p.nome or '').lower(),
+    'categoria': lambda p, saldo: (str(p.categoria or '').lower(), str(p.nome or '').lower()),
+    'estoque': lambda p, saldo: saldo,
+    'falta': lambda p, saldo: saldo - (p.estoque_minimo or 0),  # mais críticos primeiro
+}
+
+def saldos_atuais():
+    """Saldo atual por código (projeção dos saldos ou aba de estoque do SQLite)"""
+    if usar_sqlite():
+        import banco_sqlite
+        df_estoque = banco_sqlite.carregar_estoque()
+        return dict(zip(df_estoque['Produto / Material'], df_estoque['Saldo Atual']))
+    import saldos
+    return saldos.saldos_atuais()
+
+def paginas_produtos(produtos, saldos=None, criticos=False, categoria=None,
+                     localizacao=None, ordem=None, por_pagina=None):
+    """Gera a listagem em páginas: listas de linhas já formatadas
+    
+    Com `saldos` (codigo -> saldo) as linhas mostram estoque e mínimo; sem ele,
+    categoria e valor. Filtros (só críticos, parte do nome da categoria ou da
+    localização, sem acentos) e formatação são feitos num único passo sobre o
+    catálogo; sem `ordem` as páginas saem à medida que são montadas, e com ela
+    só os produtos filtrados são ordenados.
+    """
+    if criticos and saldos is None:
+        raise ValueError("filtro de críticos exige os saldos")
+    if categoria or localizacao:
+        from busca import normalizar
+        categoria = normalizar(categoria) if categoria else None
+        localizacao = normalizar(localizacao) if localizacao else None
+    por_pagina = por_pagina or CONFIG.get('itens_por_pagina', 50)
+    
+    def selecionados():
+        for p in produtos.values():
+            saldo = saldos.get(p.codigo, 0) if saldos is not None else 0
+            if criticos and saldo >= (p.estoque_minimo or 0):
+                continue
+            if categoria and categoria not in normalizar(p.categoria):
+                continue
+            if localizacao and localizacao not in normalizar(p.localizacao):
+                continue
+            yield p, saldo
+    
+    itens = selecionados()
+    if ordem is not None:
+        chave = ORDENS_LISTAGEM[ordem]
+        itens = sorted(itens, key=lambda item: chave(*item))
+    
+    pagina = []
+    for p, saldo in itens:
+        if saldos is not None:
+            minimo = p.estoque_minimo or 0
+            status = "⚠️" if saldo < minimo else "✓"
+            pagina.append(f"{status} {p.codigo:<6} {str(p.nome):<30} {saldo:<12.0f} {minimo:<10.0f}")
+        else:
+            pagina.append(f"{p.codigo:<10} {str(p.nome):<30} {str(p.categoria):<15} {p.valor_unitario or 0:<12.2f}")
+        if len(pagina) == por_pagina:
+            yield pagina
+            pagina = []
+    if pagina:
+        yield pagina
+
+def escolher_listagem(com_estoque=False):
+    """Pergunta filtro e ordem da listagem (argumentos para listar_produtos_completo)"""
+    opcoes = {}
+    print("\n🔎 Filtro: 1 - Todos  2 - Por categoria  3 - Por localização"
+          + ("  4 - Só críticos" if com_estoque else ""))
+    filtro = input("   Opção [Enter = todos]: ").strip()
+    if filtro == '2':
+        opcoes['categoria'] = input("   📂 Categoria (ou parte): ").strip() or None
+    elif filtro == '3':
+        opcoes['localizacao'] = input("   📍 Localização (ou parte): ").strip() or None
+    elif filtro == '4' and com_estoque:
+        opcoes['criticos'] = True
+    
+    ordens = ['codigo', 'nome', 'categoria'] + (['estoque', 'falta'] if com_estoque else [])
+    print("\n↕️  Ordem: " + "  ".join(f"{n} - {o}" for n, o in enumerate(ordens, 1)))
+    ordem = input("   Opção [Enter = ordem do cadastro]: ").strip()
+    if ordem.isdigit() and 1 <= int(ordem) <= len(ordens):
+        opcoes['ordem'] = ordens[int(ordem) - 1]
+    return opcoes
+
+def listar_produtos_completo(produtos=None, com_estoque=False, criticos=False, categoria=None,
+                             localizacao=None, ordem=None, por_pagina=None):
+    """Lista produtos de forma formatada, página por página
+    
+    Num terminal, pergunta antes de cada página seguinte (Enter = próxima, q = parar).
+    """
+    import sys
+    if produtos is None:
+        produtos = carregar_catalogo()
+    if produtos is None:
         return
     
     print("\n" + "="*70)
     print("📦 PRODUTOS CADASTRADOS")
     print("="*70)
     
-    if com_estoque:
-        import pandas as pd
+    saldos = None
+    if com_estoque or criticos:
         try:
-            df_estoque = pd.read_excel(CONFIG['arquivo_excel'], sheet_name='Estoque Atual')
-            print(f"\n{'Cód':<8} {'Nome':<30} {'Estoque':<12} {'Mín.':<10}")
-            print("-"*70)
-            for _, row in df_base.iterrows():
-                est = df_estoque[df_estoque['Produto / Material'] == row['Código']]
-                saldo = est['Saldo Atual'].values[0] if not est.empty else 0
-                status = "⚠️" if saldo < row['Estoque Mínimo'] else "✓"
-                print(f"{status} {row['Código']:<6} {row['Nome do Produto']:<30} {saldo:<12.0f} {row['Estoque Mínimo']:<10.0f}")
-        except:
-            com_estoque = False
+            saldos = saldos_atuais()
+        except Exception as e:
+            print(f"\n⚠️  Estoque indisponível ({e}); listando só o cadastro")
+            criticos = False
     
-    if not com_estoque:
-        print(f"\n{'Código':<10} {'Nome':<30} {'Categoria':<15} {'Valor (R$)':<12}")
-        print("-"*70)
-        for _, row in df_base.iterrows():
-            print(f"{row['Código']:<10} {row['Nome do Produto']:<30} {row['Tipo de Produto']:<15} {row['Valor Unitário (R$)']:<12.2f}")
+    if saldos is not None:
+        cabecalho = f"\n{'Cód':<8} {'Nome':<30} {'Estoque':<12} {'Mín.':<10}"
+    else:
+        cabecalho = f"\n{'Código':<10} {'Nome':<30} {'Categoria':<15} {'Valor (R$)':<12}"
+    print(cabecalho)
+    print("-"*70)
+    
+    interativo = sys.stdin.isatty()
+    listados = 0
+    for numero, pagina in enumerate(paginas_produtos(produtos, saldos, criticos, categoria,
+                                                     localizacao, ordem, por_pagina), 1):
+        if numero > 1 and interativo:
+            if input(f"-- mais produtos ({listados} listados) | Enter = próxima página, q = parar: ").strip().lower() == 'q':
+                break
+        print("\n".join(pagina))
+        listados += len(pagina)
     
     print("-"*70)
-    print(f"Total: {len(df_base)} produtos\n")
+    filtrada = criticos or categoria or localizacao
+    print(f"Total: {listados} de {len(produtos)} produtos\n" if filtrada or listados < len(produtos)
+          else f"Total: {len(produtos)} produtos\n")
 
 def salvar_na_planilha(aba, dados, arquivo=None):
-    """Salva dados em uma aba da planilha"""
-    import openpyxl
+    """Salva dados em uma aba da planilha
+
+    Entradas e Saídas são gravadas no diário de movimentações (diario.py),
+    que é o registro oficial; a planilha é atualizada a partir dele sob demanda.
+    Com o backend SQLite, vão direto para fato_movimentacoes.
+    """
+    if arquivo is None and usar_sqlite():
+        import banco_sqlite
+        try:
+            banco_sqlite.registrar_movimento(aba, dados)
+            return True
+        except Exception as e:
+            print(f"\n❌ Erro ao salvar: {e}")
+            return False
+    
     if arquivo is None:
+        import diario
+        if aba in diario.CAMPOS:
+            try:
+                diario.registrar(aba, dados)
+                return True
+            except PermissionError:
+                print(f"\n❌ Sem permissão para gravar o diário '{CONFIG.get('arquivo_diario')}'!")
+                return False
+            except Exception as e:
+                print(f"\n❌ Erro ao salvar: {e}")
+                return False
         arquivo = CONFIG['arquivo_excel']
-    
+
+    import openpyxl
+    import travas
     try:
-        wb = openpyxl.load_workbook(arquivo)
-        ws = wb[aba]
-        proxima_linha = ws.max_row + 1
-        
-        for col, valor in enumerate(dados, start=1):
-            ws.cell(row=proxima_linha, column=col, value=valor)
-        
-        wb.save(arquivo)
+        with travas.travar(arquivo):
+            wb = openpyxl.load_workbook(arquivo)
+            ws = wb[aba]
+            proxima_linha = ws.max_row + 1
+            
+            for col, valor in enumerate(dados, start=1):
+                ws.cell(row=proxima_linha, column=col, value=valor)
+            
+            wb.save(arquivo)
         return True
     except PermissionError:
         print(f"\n❌ Arquivo '{arquivo}' está aberto! Feche e tente novamente.")
@@ -270,3 +435,24 @@ def salvar_na_planilha(aba, dados, arquivo=None):
     except Exception as e:
         print(f"\n❌ Erro ao salvar: {e}")
         return False
+
+def salvar_lote(movimentos):
+    """Grava várias movimentações [(aba, dados), ...] de uma só vez
+
+    Uma única escrita no diário (ou uma única transação no SQLite), em vez de
+    uma gravação por linha. Retorna True se o lote inteiro foi gravado.
+    """
+    try:
+        if usar_sqlite():
+            import banco_sqlite
+            banco_sqlite.registrar_lote(movimentos)
+        else:
+            import diario
+            diario.registrar_lote(movimentos)
+        return True
+    except PermissionError:
+        print(f"\n❌ Sem permissão para gravar o diário '{CONFIG.get('arquivo_diario')}'!")
+        return False
+    except Exception as e:
+        print(f"\n❌ Erro ao salvar lote: {e}")
+        return False